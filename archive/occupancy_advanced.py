@@ -6,7 +6,23 @@ from collections import defaultdict, Counter
 from typing import Dict, List, Set
 from datetime import datetime
 import json
-import psycopg2
+import os
+
+from db_pool import ConnectionPool, db_cursor
+
+
+# The *_db challenges query the event_venue database (EVENT_VENUE_DSN);
+# setup/populate use the shared pool (occupancy_db_learning2 unless
+# OCCUPANCY_DSN says otherwise).
+EVENT_VENUE_DSN = os.environ.get('EVENT_VENUE_DSN', 'dbname=event_venue user=tomfyfe')
+_event_venue_pool = None
+
+
+def _event_venue_cursor():
+    global _event_venue_pool
+    if _event_venue_pool is None:
+        _event_venue_pool = ConnectionPool.from_dsn(EVENT_VENUE_DSN)
+    return _event_venue_pool.cursor()
 
 
 # ===========================================================================
@@ -85,58 +101,54 @@ def setup_database():
     Create the 3-table schema for event occupancy tracking.
     Run this ONCE to set up your database.
     """
-    conn = psycopg2.connect("dbname=occupancy_db_learning2 user=tomfyfe")
-    cursor = conn.cursor()
-
-    # Drop existing tables (fresh start)
-    cursor.execute("DROP TABLE IF EXISTS scans CASCADE")
-    cursor.execute("DROP TABLE IF EXISTS tickets CASCADE")
-    cursor.execute("DROP TABLE IF EXISTS users CASCADE")
-
-    # Create users table
-    cursor.execute("""
-        CREATE TABLE users (
-            user_id VARCHAR(10) PRIMARY KEY,
-            email VARCHAR(100) UNIQUE NOT NULL,
-            phone VARCHAR(20),
-            name VARCHAR(100),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Create tickets table with foreign key to users
-    cursor.execute("""
-        CREATE TABLE tickets (
-            ticket_id VARCHAR(10) PRIMARY KEY,
-            user_id VARCHAR(10) NOT NULL,
-            ticket_type VARCHAR(20) NOT NULL,
-            price DECIMAL(10, 2),
-            purchase_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            is_valid BOOLEAN DEFAULT true,
-            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
-        )
-    """)
-
-    # Create scans table with foreign key to tickets
-    cursor.execute("""
-        CREATE TABLE scans (
-            scan_id SERIAL PRIMARY KEY,
-            ticket_id VARCHAR(10) NOT NULL,
-            gate VARCHAR(1) NOT NULL,
-            scan_type VARCHAR(5) NOT NULL CHECK (scan_type IN ('entry', 'exit')),
-            scan_time TIMESTAMP NOT NULL,
-            flagged_suspicious BOOLEAN DEFAULT false,
-            FOREIGN KEY (ticket_id) REFERENCES tickets(ticket_id) ON DELETE CASCADE
-        )
-    """)
+    with db_cursor() as cursor:
+        # Drop existing tables (fresh start)
+        cursor.execute("DROP TABLE IF EXISTS scans CASCADE")
+        cursor.execute("DROP TABLE IF EXISTS tickets CASCADE")
+        cursor.execute("DROP TABLE IF EXISTS users CASCADE")
+
+        # Create users table
+        cursor.execute("""
+            CREATE TABLE users (
+                user_id VARCHAR(10) PRIMARY KEY,
+                email VARCHAR(100) UNIQUE NOT NULL,
+                phone VARCHAR(20),
+                name VARCHAR(100),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
 
-    # Create indexes for performance
-    cursor.execute("CREATE INDEX idx_scans_ticket_time ON scans(ticket_id, scan_time)")
-    cursor.execute("CREATE INDEX idx_scans_gate ON scans(gate)")
-    cursor.execute("CREATE INDEX idx_tickets_user ON tickets(user_id)")
+        # Create tickets table with foreign key to users
+        cursor.execute("""
+            CREATE TABLE tickets (
+                ticket_id VARCHAR(10) PRIMARY KEY,
+                user_id VARCHAR(10) NOT NULL,
+                ticket_type VARCHAR(20) NOT NULL,
+                price DECIMAL(10, 2),
+                purchase_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                is_valid BOOLEAN DEFAULT true,
+                FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+            )
+        """)
+
+        # Create scans table with foreign key to tickets
+        cursor.execute("""
+            CREATE TABLE scans (
+                scan_id SERIAL PRIMARY KEY,
+                ticket_id VARCHAR(10) NOT NULL,
+                gate VARCHAR(1) NOT NULL,
+                scan_type VARCHAR(5) NOT NULL CHECK (scan_type IN ('entry', 'exit')),
+                scan_time TIMESTAMP NOT NULL,
+                flagged_suspicious BOOLEAN DEFAULT false,
+                FOREIGN KEY (ticket_id) REFERENCES tickets(ticket_id) ON DELETE CASCADE
+            )
+        """)
+
+        # Create indexes for performance
+        cursor.execute("CREATE INDEX idx_scans_ticket_time ON scans(ticket_id, scan_time)")
+        cursor.execute("CREATE INDEX idx_scans_gate ON scans(gate)")
+        cursor.execute("CREATE INDEX idx_tickets_user ON tickets(user_id)")
 
-    conn.commit()
-    conn.close()
     print("✅ Database schema created successfully!")
     
 
@@ -145,38 +157,34 @@ def populate_database():
     Populate all 3 tables with mock data.
     Run this AFTER setup_database().
     """
-    conn = psycopg2.connect("dbname=occupancy_db_learning2 user=tomfyfe")
-    cursor = conn.cursor()
-
-    # Clear existing data
-    cursor.execute("DELETE FROM scans")
-    cursor.execute("DELETE FROM tickets")
-    cursor.execute("DELETE FROM users")
+    with db_cursor() as cursor:
+        # Clear existing data
+        cursor.execute("DELETE FROM scans")
+        cursor.execute("DELETE FROM tickets")
+        cursor.execute("DELETE FROM users")
+
+        # Insert users
+        for user in get_mock_users():
+            cursor.execute("""
+                INSERT INTO users (user_id, email, phone, name)
+                VALUES (%s, %s, %s, %s)
+            """, (user['user_id'], user['email'], user['phone'], user['name']))
+
+        # Insert tickets
+        for ticket in get_mock_tickets():
+            cursor.execute("""
+                INSERT INTO tickets (ticket_id, user_id, ticket_type, price)
+                VALUES (%s, %s, %s, %s)
+            """, (ticket['ticket_id'], ticket['user_id'], ticket['ticket_type'], ticket['price']))
+
+        # Insert scans
+        for event_json in mock_scan_stream():
+            scan = json.loads(event_json)  # Parse JSON string
+            cursor.execute("""
+                INSERT INTO scans (ticket_id, gate, scan_type, scan_time)
+                VALUES (%s, %s, %s, %s)
+            """, (scan['ticket_id'], scan['gate'], scan['scan_type'], scan['timestamp']))
 
-    # Insert users
-    for user in get_mock_users():
-        cursor.execute("""
-            INSERT INTO users (user_id, email, phone, name)
-            VALUES (%s, %s, %s, %s)
-        """, (user['user_id'], user['email'], user['phone'], user['name']))
-
-    # Insert tickets
-    for ticket in get_mock_tickets():
-        cursor.execute("""
-            INSERT INTO tickets (ticket_id, user_id, ticket_type, price)
-            VALUES (%s, %s, %s, %s)
-        """, (ticket['ticket_id'], ticket['user_id'], ticket['ticket_type'], ticket['price']))
-
-    # Insert scans
-    for event_json in mock_scan_stream():
-        scan = json.loads(event_json)  # Parse JSON string
-        cursor.execute("""
-            INSERT INTO scans (ticket_id, gate, scan_type, scan_time)
-            VALUES (%s, %s, %s, %s)
-        """, (scan['ticket_id'], scan['gate'], scan['scan_type'], scan['timestamp']))
-
-    conn.commit()
-    conn.close()
     print("✅ Database populated with mock data!")
 
 
@@ -384,25 +392,22 @@ def count_current_occupancy_db() -> int:
 
     Hint: Use DISTINCT ON or window functions
     """
-    conn = psycopg2.connect("dbname=event_venue user=tomfyfe")
-    cursor = conn.cursor()
-
-    query = """
-    WITH last_scan AS (
-        SELECT DISTINCT ON(ticket_id)
-            ticket_id,
-            scan_type
-        FROM scans
-        ORDER BY ticket_id, scan_time DESC
-        )
-    SELECT COUNT(*)
-    FROM last_scan
-    WHERE scan_type = 'entry';
-    """
+    with _event_venue_cursor() as cursor:
+        query = """
+        WITH last_scan AS (
+            SELECT DISTINCT ON(ticket_id)
+                ticket_id,
+                scan_type
+            FROM scans
+            ORDER BY ticket_id, scan_time DESC
+            )
+        SELECT COUNT(*)
+        FROM last_scan
+        WHERE scan_type = 'entry';
+        """
 
-    cursor.execute(query)
-    result = cursor.fetchone()
-    conn.close()
+        cursor.execute(query)
+        result = cursor.fetchone()
 
     return result[0] if result else 0
 
@@ -645,16 +650,13 @@ def get_occupancy_at_time_db(target_time: str) -> int:
 
     Bonus: Join with users table to get names of people inside!
     """
-    conn = psycopg2.connect("dbname=event_venue user=tomfyfe")
-    cursor = conn.cursor()
-
-    query = """
-    -- TODO: Write query with timestamp filter
-    """
+    with _event_venue_cursor() as cursor:
+        query = """
+        -- TODO: Write query with timestamp filter
+        """
 
-    cursor.execute(query, (target_time,))
-    result = cursor.fetchone()
-    conn.close()
+        cursor.execute(query, (target_time,))
+        result = cursor.fetchone()
 
     return result[0] if result else 0
 
@@ -951,12 +953,8 @@ def track_occupancy_with_details_db() -> Dict:
 
     Bonus: Return as JSON directly from PostgreSQL!
     """
-    conn = psycopg2.connect("dbname=event_venue user=tomfyfe")
-    cursor = conn.cursor()
-
     # TODO: Write multiple queries or one complex query
 
-    conn.close()
     return {}
 
 
@@ -1320,12 +1318,8 @@ def detect_scan_anomalies_db() -> Dict[str, List[str]]:
 
     Bonus: Create a VIEW for the security team to monitor!
     """
-    conn = psycopg2.connect("dbname=event_venue user=tomfyfe")
-    cursor = conn.cursor()
-
     # TODO: Implement using window functions
 
-    conn.close()
     return {}
 
 
@@ -1744,12 +1738,8 @@ def manage_capacity_realtime_db(max_capacity: int = 6) -> Dict:
 
     This is production-level complexity!
     """
-    conn = psycopg2.connect("dbname=event_venue user=tomfyfe")
-    cursor = conn.cursor()
-
     # TODO: Implement capacity management system
 
-    conn.close()
     return {}
 
 
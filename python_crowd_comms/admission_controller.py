@@ -0,0 +1,217 @@
+# Turnstile Admission Controller
+# ==============================
+# manage_capacity_realtime() answers "what happened?" after the stream ends.
+# A turnstile needs "let this person in?" NOW, for every scan, within a few
+# milliseconds or it times out and the gate falls back to manual.
+#
+# AdmissionController keeps the Q5 capacity counters incrementally and returns
+# a decision per scan:
+#
+#   scan ──> decide() ──> Decision(allowed=True,  reason='admitted')
+#                         Decision(allowed=True,  reason='vip_override')
+#                         Decision(allowed=False, reason='at_capacity')
+#                         Decision(allowed=False, reason='already_inside')
+#                         Decision(allowed=True,  reason='exited')
+#                         Decision(allowed=True,  reason='exit_without_entry')
+#
+# Every decision is O(1): two set lookups, one dict lookup, a few int updates.
+# The Decision objects are module-level constants, so deciding builds no new
+# containers - nothing for the garbage collector to pause on mid-rush.
+
+import gc
+import sys
+import time
+from array import array
+from typing import Dict, NamedTuple, Optional
+
+from scan_decoder import ScanEvent, to_scan_event
+from ticket_registry import mock_registry
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    reason: str
+
+
+ADMITTED = Decision(True, 'admitted')
+VIP_OVERRIDE = Decision(True, 'vip_override')
+AT_CAPACITY = Decision(False, 'at_capacity')
+ALREADY_INSIDE = Decision(False, 'already_inside')
+EXITED = Decision(True, 'exited')
+EXIT_WITHOUT_ENTRY = Decision(True, 'exit_without_entry')
+
+
+class AdmissionController:
+    """
+    Per-scan allow/deny at the gate, with the same capacity rules as
+    OccupancyTracker (Q5):
+
+    - General tickets are denied once admitted occupancy hits max_capacity
+    - VIP tickets always get in (counted in vip_override_count)
+    - A ticket already inside is denied (passback), like a duplicate entry
+    - Exits are always allowed - we never hold people in
+
+    would_be_occupancy counts every ticket that tried to enter and hasn't
+    left, admitted or not (a retry isn't counted twice). Every denied scan
+    counts towards rejected_count - including retries - rather than being
+    listed, so memory doesn't grow with a long queue outside.
+
+    Example:
+        >>> gate = AdmissionController(max_capacity=6)
+        >>> gate.decide(scan)
+        Decision(allowed=True, reason='admitted')
+    """
+
+    def __init__(self, ticket_types: Optional[Dict[str, str]] = None, max_capacity: int = 6):
+        if ticket_types is None:
+            ticket_types = mock_registry()
+        self.ticket_types = ticket_types
+        self.max_capacity = max_capacity
+
+        self.inside = set()     # tried to enter, not left (would-be occupancy)
+        self.admitted = set()   # actually let through - the passback check
+        self.times_at_capacity = 0
+        self.rejected_count = 0
+        self.vip_override_count = 0
+        self._at_capacity = False
+
+    def decide(self, scan) -> Decision:
+        """Allow or deny one scan (ScanEvent, dict or JSON string). O(1)."""
+        if scan.__class__ is not ScanEvent:
+            scan = to_scan_event(scan)
+        ticket_id = scan.ticket_id
+
+        if scan.scan_type == 'entry':
+            admitted = self.admitted
+            # Passback is judged on who actually got through - a ticket
+            # turned away at capacity can try again once there's room
+            if ticket_id in admitted:
+                return ALREADY_INSIDE
+            self.inside.add(ticket_id)
+
+            decision = ADMITTED
+            if len(admitted) >= self.max_capacity:
+                if self.ticket_types.get(ticket_id) != 'VIP':
+                    self.rejected_count += 1
+                    return AT_CAPACITY
+                self.vip_override_count += 1
+                decision = VIP_OVERRIDE
+
+            admitted.add(ticket_id)
+            if len(admitted) >= self.max_capacity and not self._at_capacity:
+                self.times_at_capacity += 1
+                self._at_capacity = True
+            return decision
+
+        self.inside.discard(ticket_id)
+        if ticket_id not in self.admitted:
+            return EXIT_WITHOUT_ENTRY
+        self.admitted.discard(ticket_id)
+        if len(self.admitted) < self.max_capacity:
+            self._at_capacity = False
+        return EXITED
+
+    @property
+    def occupancy(self) -> int:
+        return len(self.admitted)
+
+    @property
+    def would_be_occupancy(self) -> int:
+        return len(self.inside)
+
+    def counters(self) -> Dict:
+        """manage_capacity_realtime() shape, with rejections as a count."""
+        return {
+            'final_occupancy': self.occupancy,
+            'times_at_capacity': self.times_at_capacity,
+            'rejected_count': self.rejected_count,
+            'would_be_occupancy': self.would_be_occupancy,
+            'vip_override_count': self.vip_override_count,
+        }
+
+
+# ===========================================================================
+# LATENCY HARNESS
+# ===========================================================================
+
+def _percentile(sorted_ns, fraction: float) -> float:
+    index = min(len(sorted_ns) - 1, int(fraction * len(sorted_ns)))
+    return sorted_ns[index] / 1000
+
+
+def latency_benchmark(rate: int = 5_000, seconds: float = 10.0, max_capacity: int = 5_000,
+                      seed: int = 42, disable_gc: bool = False) -> Dict:
+    """
+    Feed synthetic scans at a fixed rate (open loop, like real turnstiles -
+    scans keep coming whether or not we're keeping up) and time each decide().
+
+    Reports percentiles in microseconds for:
+      decide_*   - time inside decide() itself
+      response_* - from the scan's scheduled arrival to its decision,
+                   so any backlog from slow decisions shows up here
+
+    Scans are pre-generated as ScanEvents so generation doesn't eat into the
+    pacing budget.
+    """
+    from scan_generator import generate_scan_stream, ticket_type_lookup
+
+    total = int(rate * seconds)
+    n_tickets = max(1_000, total)
+    scans = [s for _, s in zip(range(total), generate_scan_stream(
+        n_tickets=n_tickets, seed=seed, duration_hours=1, output='event'))]
+    total = len(scans)
+    gate = AdmissionController(ticket_type_lookup(n_tickets, seed=seed), max_capacity=max_capacity)
+
+    decide_ns = array('q', bytes(8 * total))
+    response_ns = array('q', bytes(8 * total))
+    interval_ns = 1_000_000_000 // rate
+    clock = time.perf_counter_ns
+    decide = gate.decide
+
+    gc_was_enabled = gc.isenabled()
+    if disable_gc:
+        gc.disable()
+    try:
+        start = clock()
+        for i, scan in enumerate(scans):
+            due = start + i * interval_ns
+            now = clock()
+            if due - now > 1_000_000:
+                time.sleep((due - now - 500_000) / 1e9)   # coarse wait, then spin
+            while clock() < due:
+                pass
+            before = clock()
+            decide(scan)
+            after = clock()
+            decide_ns[i] = after - before
+            response_ns[i] = after - due
+        elapsed = (clock() - start) / 1e9
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    decide_sorted = sorted(decide_ns)
+    response_sorted = sorted(response_ns)
+    return {
+        'scans': total,
+        'target_rate': rate,
+        'achieved_rate': round(total / elapsed),
+        'decide_p50_us': _percentile(decide_sorted, 0.50),
+        'decide_p99_us': _percentile(decide_sorted, 0.99),
+        'decide_p999_us': _percentile(decide_sorted, 0.999),
+        'decide_max_us': decide_sorted[-1] / 1000,
+        'response_p50_us': _percentile(response_sorted, 0.50),
+        'response_p99_us': _percentile(response_sorted, 0.99),
+        'response_p999_us': _percentile(response_sorted, 0.999),
+        'response_max_us': response_sorted[-1] / 1000,
+        'rejected': gate.rejected_count,
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python admission_controller.py [rate] [seconds]
+    rate = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    print(f"Deciding {rate:,} scans/sec for {seconds}s:")
+    for key, value in latency_benchmark(rate, seconds).items():
+        print(f"  {key}: {value}")
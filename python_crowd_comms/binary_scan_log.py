@@ -0,0 +1,313 @@
+# Binary Scan Log (mmap + NumPy)
+# ==============================
+# A mock_scan_stream() line is ~95 bytes of JSON, and every read of the log
+# pays for json.loads / decode_scan plus timestamp parsing again. The same
+# scan fits in 14 bytes:
+#
+#   offset  0       4     5       6                    14
+#           ┌───────┬─────┬───────┬────────────────────┐
+#           │ticket │gate │ type  │ epoch              │   '<IBBq'
+#           │ u32   │ u8  │ u8    │ i64                │
+#           └───────┴─────┴───────┴────────────────────┘
+#
+# Ticket IDs and gate names are interned: the record holds an index, the
+# sidecar files hold the strings.
+#
+#   scans.bin               fixed-width records, nothing else
+#   scans.bin.meta.json     {"record": "<IBBq", "gates": [...], "count": n}
+#   scans.bin.tickets       ticket ID per line (line number = u32 index)
+#
+# Readers mmap the file and view it as a NumPy structured array - no copy,
+# no parsing. reader.epoch, reader.gate etc. are strided views straight onto
+# the mapped pages, so the vectorised queries below touch each column once
+# in C instead of decoding millions of Python objects.
+#
+# scan_generator.write_scan_log(path, output='binary') writes this format too.
+
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from compact_occupancy import TicketInterner
+from scan_decoder import ScanEvent, decode_scan
+from scan_timestamps import from_epoch, to_epoch
+
+try:
+    import numpy as np
+except ImportError:   # converter + pure-Python reads still work without it
+    np = None
+
+
+RECORD = struct.Struct('<IBBq')
+RECORD_FORMAT = '<IBBq'
+SCAN_TYPES = ('entry', 'exit')
+_SCAN_TYPE_CODES = {'entry': 0, 'exit': 1}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("NumPy is required for the vectorised scan-log queries")
+
+
+def record_dtype():
+    _require_numpy()
+    return np.dtype([('ticket', '<u4'), ('gate', 'u1'), ('scan_type', 'u1'), ('epoch', '<i8')])
+
+
+# ===========================================================================
+# WRITING
+# ===========================================================================
+
+def write_sidecars(path: str, gates: Sequence[str], ticket_ids, count: int) -> None:
+    """Write the .meta.json and .tickets files that go with a records file."""
+    with open(path + '.tickets', 'w', encoding='utf-8', buffering=1 << 20) as f:
+        for ticket_id in ticket_ids:
+            f.write(ticket_id)
+            f.write('\n')
+    with open(path + '.meta.json', 'w', encoding='utf-8') as f:
+        json.dump({'record': RECORD_FORMAT, 'gates': list(gates),
+                   'scan_types': list(SCAN_TYPES), 'count': count}, f)
+
+
+def convert_jsonl(src: str, dst: str) -> int:
+    """
+    Convert a JSON-lines scan log (mock_scan_stream() layout) to the binary
+    format. Streams both files; memory is the intern tables only.
+
+    Returns:
+        int: Number of records written
+    """
+    tickets = TicketInterner()
+    gates: Dict[str, int] = {}
+    pack = RECORD.pack
+    count = 0
+
+    with open(src, encoding='utf-8') as f_in, open(dst, 'wb', buffering=1 << 20) as f_out:
+        for line in f_in:
+            line = line.strip()
+            if not line:
+                continue
+            scan = decode_scan(line)
+            gate = gates.get(scan.gate)
+            if gate is None:
+                if len(gates) == 256:
+                    raise ValueError("The binary format supports at most 256 gates")
+                gate = gates[scan.gate] = len(gates)
+            f_out.write(pack(tickets.intern(scan.ticket_id), gate,
+                             _SCAN_TYPE_CODES[scan.scan_type], to_epoch(scan.timestamp)))
+            count += 1
+
+    gate_names = sorted(gates, key=gates.get)
+    write_sidecars(dst, gate_names, (tickets.ticket(i) for i in range(len(tickets))), count)
+    return count
+
+
+# ===========================================================================
+# READING
+# ===========================================================================
+
+class BinaryScanLog:
+    """
+    Memory-mapped reader.
+
+    Example:
+        >>> with BinaryScanLog('scans.bin') as log:
+        ...     log.count_current_occupancy()
+        ...     log.occupancy_at_time('2025-09-30T11:30:00')
+        ...     log.gate_tallies()
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path + '.meta.json', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['record'] != RECORD_FORMAT:
+            raise ValueError(f"Unsupported record format {meta['record']!r}")
+        self.gates: List[str] = meta['gates']
+        self._ticket_ids: Optional[List[str]] = None
+        self._sorted: Optional[bool] = None
+
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size % RECORD.size:
+            raise ValueError(f"{path} is not a whole number of {RECORD.size}-byte records")
+        self.count = size // RECORD.size
+        # mmap can't map an empty file
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._records = None
+
+    def close(self) -> None:
+        # Views must go before the map can close
+        self._records = None
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def ticket_ids(self) -> List[str]:
+        if self._ticket_ids is None:
+            with open(self.path + '.tickets', encoding='utf-8') as f:
+                self._ticket_ids = f.read().splitlines()
+        return self._ticket_ids
+
+    # -----------------------------------------------------------------------
+    # Zero-copy NumPy views
+    # -----------------------------------------------------------------------
+
+    @property
+    def records(self):
+        """Structured array over the mapped file (no copy)."""
+        if self._records is None:
+            dtype = record_dtype()
+            if self._mmap is None:
+                self._records = np.empty(0, dtype=dtype)
+            else:
+                self._records = np.frombuffer(self._mmap, dtype=dtype, count=self.count)
+        return self._records
+
+    @property
+    def ticket(self):
+        return self.records['ticket']
+
+    @property
+    def gate(self):
+        return self.records['gate']
+
+    @property
+    def scan_type(self):
+        return self.records['scan_type']
+
+    @property
+    def epoch(self):
+        return self.records['epoch']
+
+    # -----------------------------------------------------------------------
+    # Pure-Python iteration (no NumPy needed)
+    # -----------------------------------------------------------------------
+
+    def __iter__(self) -> Iterator[ScanEvent]:
+        """Decode back to ScanEvents - for feeding the existing consumers."""
+        if self._mmap is None:
+            return
+        ticket_ids = self.ticket_ids
+        gates = self.gates
+        for ticket, gate, scan_type, epoch in RECORD.iter_unpack(self._mmap):
+            yield ScanEvent(ticket_ids[ticket], gates[gate], from_epoch(epoch), SCAN_TYPES[scan_type])
+
+    # -----------------------------------------------------------------------
+    # Vectorised queries
+    # -----------------------------------------------------------------------
+
+    def _is_time_sorted(self) -> bool:
+        if self._sorted is None:
+            epoch = self.epoch
+            self._sorted = bool(np.all(epoch[1:] >= epoch[:-1])) if len(epoch) > 1 else True
+        return self._sorted
+
+    @staticmethod
+    def _inside_after(tickets, scan_types) -> int:
+        """
+        count_current_occupancy() rule: entry adds, exit discards, so a ticket
+        is inside iff its LAST scan is an entry.
+        """
+        if len(tickets) == 0:
+            return 0
+        order = np.argsort(tickets, kind='stable')
+        sorted_tickets = tickets[order]
+        # Last position of each ticket's run in the stable sort = its last scan
+        is_last = np.empty(len(order), dtype=bool)
+        is_last[:-1] = sorted_tickets[1:] != sorted_tickets[:-1]
+        is_last[-1] = True
+        return int(np.count_nonzero(scan_types[order[is_last]] == 0))
+
+    def count_current_occupancy(self) -> int:
+        """Same answer as count_current_occupancy() over the whole log."""
+        return self._inside_after(self.ticket, self.scan_type)
+
+    def occupancy_at_time(self, target_time) -> int:
+        """
+        Same answer as get_occupancy_at_time() (scans AT the target count).
+        target_time: ISO string or epoch seconds.
+        """
+        target = to_epoch(target_time) if isinstance(target_time, str) else target_time
+        if self._is_time_sorted():
+            end = int(np.searchsorted(self.epoch, target, side='right'))
+            return self._inside_after(self.ticket[:end], self.scan_type[:end])
+        mask = self.epoch <= target
+        return self._inside_after(self.ticket[mask], self.scan_type[mask])
+
+    def gate_tallies(self) -> Dict[str, Dict[str, int]]:
+        """
+        Scans per gate split by type:
+            {'A': {'entry': 5, 'exit': 2, 'total': 7}, ...}
+        """
+        n_gates = len(self.gates)
+        gate = self.gate
+        entries = np.bincount(gate[self.scan_type == 0], minlength=n_gates)
+        totals = np.bincount(gate, minlength=n_gates)
+        return {
+            name: {'entry': int(entries[i]), 'exit': int(totals[i] - entries[i]),
+                   'total': int(totals[i])}
+            for i, name in enumerate(self.gates) if totals[i]
+        }
+
+
+# ===========================================================================
+# BENCHMARK
+# ===========================================================================
+
+def benchmark(n_tickets: int = 1_000_000) -> Dict:
+    """JSON log + Python functions vs binary log + vectorised queries."""
+    import tempfile
+    from python_occupancy_practice import count_current_occupancy
+    from scan_generator import write_scan_log
+
+    with tempfile.TemporaryDirectory(prefix='scanlog_') as tmp:
+        json_path = os.path.join(tmp, 'scans.jsonl')
+        bin_path = os.path.join(tmp, 'scans.bin')
+        events = write_scan_log(json_path, n_tickets=n_tickets)
+
+        start = time.perf_counter()
+        convert_jsonl(json_path, bin_path)
+        convert_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(json_path, encoding='utf-8') as f:
+            python_count = count_current_occupancy(line.rstrip('\n') for line in f)
+        python_s = time.perf_counter() - start
+
+        with BinaryScanLog(bin_path) as log:
+            start = time.perf_counter()
+            numpy_count = log.count_current_occupancy()
+            numpy_s = time.perf_counter() - start
+        assert numpy_count == python_count
+
+        return {
+            'events': events,
+            'json_bytes_per_event': round(os.path.getsize(json_path) / events, 1),
+            'binary_bytes_per_event': RECORD.size,
+            'convert_s': round(convert_s, 2),
+            'python_count_s': round(python_s, 3),
+            'numpy_count_s': round(numpy_s, 3),
+            'speedup': round(python_s / numpy_s, 1),
+        }
+
+
+if __name__ == "__main__":
+    # Usage: python binary_scan_log.py [n_tickets]
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    for key, value in benchmark(n).items():
+        print(f"{key}: {value}")
@@ -0,0 +1,174 @@
+# Single-Statement Occupancy Breakdown
+# ====================================
+# get_detailed_breakdown_sql() runs three queries, and each one re-derives
+# "last scan per ticket" with its own DISTINCT ON sort over the whole scans
+# table (the third one joining tickets first, so it sorts the join):
+#
+#   total          -> DISTINCT ON scans ─> COUNT
+#   by_gate        -> DISTINCT ON scans ─> GROUP BY gate
+#   by_ticket_type -> DISTINCT ON (scans ⋈ tickets) ─> GROUP BY ticket_type
+#
+# Here it's one statement: the last scan per ticket is computed ONCE, tickets
+# are joined ONCE (only for the people inside), and GROUPING SETS produces all
+# three breakdowns from that single pass:
+#
+#   last_scans ─> inside (⋈ tickets) ─> GROUP BY GROUPING SETS ((), (gate), (ticket_type))
+#
+#   no_gate no_type gate ticket_type count
+#      1       1    NULL   NULL        4     <- () = total
+#      0       1    'A'    NULL        1     <- (gate)
+#      1       0    NULL   'VIP'       1     <- (ticket_type)
+#
+# GROUPING(col) is 1 when a row is NOT grouped by col - that's how
+# decode_breakdown() tells the three kinds of row apart.
+#
+# SQLite has neither DISTINCT ON nor GROUPING SETS, so the stand-in gets the
+# same row shape from ROW_NUMBER() and a UNION ALL over a materialised CTE.
+#
+# The query is @cached_query (see query_cache.py).
+
+import sys
+import time
+from typing import Dict, Iterable, Optional
+
+from db_pool import ConnectionPool, get_pool
+from query_cache import cached_query
+
+
+BREAKDOWN_SQL = {
+    'postgres': """
+        WITH last_scans AS (
+            SELECT DISTINCT ON (ticket_id)
+                ticket_id,
+                gate,
+                scan_type
+            FROM scans
+            ORDER BY ticket_id, scan_time DESC
+        ),
+        inside AS (
+            SELECT l.gate, t.ticket_type
+            FROM last_scans l
+            LEFT JOIN tickets t ON t.ticket_id = l.ticket_id
+            WHERE l.scan_type = 'entry'
+        )
+        SELECT GROUPING(gate), GROUPING(ticket_type), gate, ticket_type, COUNT(*)
+        FROM inside
+        GROUP BY GROUPING SETS ((), (gate), (ticket_type));
+    """,
+    'sqlite': """
+        WITH last_scans AS (
+            SELECT
+                ticket_id,
+                gate,
+                scan_type,
+                ROW_NUMBER() OVER (PARTITION BY ticket_id ORDER BY scan_time DESC) AS rn
+            FROM scans
+        ),
+        inside AS MATERIALIZED (
+            SELECT l.gate, t.ticket_type
+            FROM last_scans l
+            LEFT JOIN tickets t ON t.ticket_id = l.ticket_id
+            WHERE l.rn = 1 AND l.scan_type = 'entry'
+        )
+        SELECT 1, 1, NULL, NULL, COUNT(*) FROM inside
+        UNION ALL
+        SELECT 0, 1, gate, NULL, COUNT(*) FROM inside GROUP BY gate
+        UNION ALL
+        SELECT 1, 0, NULL, ticket_type, COUNT(*) FROM inside GROUP BY ticket_type;
+    """,
+}
+
+
+def decode_breakdown(rows: Iterable[tuple]) -> Dict:
+    """
+    (no_gate, no_type, gate, ticket_type, count) rows -> the
+    get_detailed_breakdown_sql() dict.
+
+    Tickets missing from the tickets table count towards the total and their
+    gate (like the old total/by_gate queries) but not by_ticket_type (the old
+    query's inner JOIN dropped them).
+    """
+    result = {'total_occupancy': 0, 'by_gate': {}, 'by_ticket_type': {}}
+    by_gate = result['by_gate']
+    for no_gate, no_type, gate, ticket_type, count in rows:
+        if no_gate and no_type:
+            result['total_occupancy'] = count
+        elif not no_gate:
+            by_gate[gate] = count
+        elif ticket_type is not None:
+            result['by_ticket_type'][ticket_type] = count
+    result['by_gate'] = dict(sorted(by_gate.items()))     # old query: ORDER BY gate
+    return result
+
+
+@cached_query
+def get_detailed_breakdown_single_sql(pool: Optional[ConnectionPool] = None) -> Dict:
+    """
+    Same result as get_detailed_breakdown_sql(), in one statement and one
+    pass over scans.
+
+    The SQLite statement is tested; the Postgres GROUPING SETS statement is
+    unverified unless tests/test_breakdown_query.py runs with
+    OCCUPANCY_TEST_DSN set.
+
+    Returns:
+        {
+            'total_occupancy': 4,
+            'by_gate': {'A': 1, 'B': 1, 'C': 2},
+            'by_ticket_type': {'VIP': 1, 'General': 3}
+        }
+    """
+    pool = pool or get_pool()
+    with pool.cursor() as cursor:
+        cursor.execute(BREAKDOWN_SQL[pool.dialect])
+        return decode_breakdown(cursor.fetchall())
+
+
+# ===========================================================================
+# BENCHMARK
+# ===========================================================================
+
+def benchmark(n_scans: int = 10_000_000, repeats: int = 3) -> Dict:
+    """
+    Load ~n_scans generated scans into the SHARED pool's database (this runs
+    setup_database() - it wipes the tables), check both versions agree, and
+    time each (best of `repeats`).
+
+    Times get_detailed_breakdown_sql() (three queries) against the single
+    statement. Postgres numbers come from the GROUPING SETS statement, which
+    hasn't been verified against a live server - treat them as unverified
+    until the OCCUPANCY_TEST_DSN test has passed there.
+    """
+    from database_occupancy_learning import get_detailed_breakdown_sql, setup_database
+    from scan_loader import load_generated_event
+
+    pool = get_pool()
+    setup_database()
+    # The generator averages ~1.8 scans per ticket
+    loaded = load_generated_event(max(1, int(n_scans / 1.8)), pool)
+    with pool.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+    def best_of(function):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = function()
+            times.append(time.perf_counter() - start)
+        return result, min(times)
+
+    single, single_s = best_of(get_detailed_breakdown_single_sql)
+    row = {'scans': loaded['scans'], 'load_s': loaded['seconds'],
+           'single_statement_s': round(single_s, 3)}
+    three, three_s = best_of(get_detailed_breakdown_sql)
+    assert single == three, (single, three)
+    row['three_queries_s'] = round(three_s, 3)
+    row['speedup'] = round(three_s / single_s, 2)
+    return row
+
+
+if __name__ == "__main__":
+    # Usage: python breakdown_query.py [n_scans]   (uses OCCUPANCY_DSN)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    for key, value in benchmark(n).items():
+        print(f"{key}: {value}")
@@ -0,0 +1,319 @@
+# Memory-Compact Occupancy State
+# ==============================
+# Every tracker so far holds "who is inside" as a set of ticket-ID strings
+# (~100 bytes per ticket once you count the set slot and hash), plus a
+# ticket -> last_exit_time dict for rapid re-entry (another ~100+ bytes).
+#
+# Here each ticket ID is INTERNED once into a dense int (T001 -> 0, T002 -> 1...)
+# and everything per-ticket becomes a flat array indexed by that int:
+#
+#   inside state   -> 1 BIT per ticket in a bytearray
+#   last exit time -> 8 bytes per ticket in array('q')  (-1 = never exited)
+#
+#   ticket:  T001 T002 T003 T004 T005 T006 T007 T008
+#   index:     0    1    2    3    4    5    6    7
+#   bits:      0    0    0    0    1    1    1    1    -> byte 0b11110000
+#
+# The intern table (an open-addressing hash table in array('q'), ~16 bytes
+# per ticket) is shared by every per-ticket array.
+#
+# Trade-off: pure-Python bit twiddling and probing is a few times slower per
+# event than the C-level set/dict - use this when memory, not CPU, is the
+# limit (multi-venue tenants with tens of millions of tickets).
+
+import sys
+import time
+import tracemalloc
+from array import array
+from typing import Dict, Iterator, List, Set
+
+from scan_decoder import to_scan_event
+from scan_timestamps import to_epoch, RAPID_REENTRY_SECONDS
+
+
+class TicketInterner:
+    """
+    Map ticket-ID strings to dense ints (0, 1, 2, ...) and back.
+
+    A plain dict would work, but every dict VALUE would be a separate int
+    object (28 bytes each past 256) on top of the dict slot itself - as big as
+    the set we're trying to replace. Instead the index lives in an
+    open-addressing hash table stored in array('q'): 8 bytes per slot, no
+    per-ticket objects apart from the ID string we had to keep anyway.
+    """
+
+    EMPTY = -1
+
+    def __init__(self, capacity: int = 8):
+        size = 8
+        while size < capacity * 2:
+            size <<= 1
+        self._table = array('q', [self.EMPTY]) * size
+        self._mask = size - 1
+        self._tickets: List[str] = []
+
+    def _slot(self, ticket_id: str) -> int:
+        """Table slot holding ticket_id, or the empty slot where it would go."""
+        table = self._table
+        tickets = self._tickets
+        mask = self._mask
+        slot = hash(ticket_id) & mask
+        while True:
+            idx = table[slot]
+            if idx == -1 or tickets[idx] == ticket_id:
+                return slot
+            slot = (slot + 1) & mask
+
+    def intern(self, ticket_id: str) -> int:
+        """Index for ticket_id, assigning the next free one if it's new."""
+        slot = self._slot(ticket_id)
+        idx = self._table[slot]
+        if idx != -1:
+            return idx
+
+        idx = len(self._tickets)
+        self._tickets.append(ticket_id)
+        self._table[slot] = idx
+        if (idx + 1) * 2 > len(self._table):
+            self._resize()
+        return idx
+
+    def lookup(self, ticket_id: str) -> int:
+        """Index for ticket_id, or -1 if never seen (doesn't assign)."""
+        return self._table[self._slot(ticket_id)]
+
+    def _resize(self) -> None:
+        size = len(self._table) * 2
+        self._table = array('q', [self.EMPTY]) * size
+        self._mask = size - 1
+        for idx, ticket_id in enumerate(self._tickets):
+            self._table[self._slot(ticket_id)] = idx
+
+    def ticket(self, idx: int) -> str:
+        return self._tickets[idx]
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+    def nbytes(self) -> int:
+        """Table + reverse list, excluding the ID strings themselves."""
+        return self._table.itemsize * len(self._table) + sys.getsizeof(self._tickets)
+
+
+class TicketBitset:
+    """One bit per interned ticket, with a running count of set bits."""
+
+    def __init__(self, capacity: int = 0):
+        self._bits = bytearray((capacity + 7) >> 3)
+        self.count = 0
+
+    def _grow(self, idx: int) -> None:
+        needed = (idx >> 3) + 1
+        self._bits.extend(bytes(max(needed - len(self._bits), len(self._bits))))
+
+    def add(self, idx: int) -> bool:
+        """Set bit idx. Returns True if it was newly set."""
+        byte = idx >> 3
+        if byte >= len(self._bits):
+            self._grow(idx)
+        mask = 1 << (idx & 7)
+        if self._bits[byte] & mask:
+            return False
+        self._bits[byte] |= mask
+        self.count += 1
+        return True
+
+    def discard(self, idx: int) -> bool:
+        """Clear bit idx. Returns True if it was set."""
+        byte = idx >> 3
+        if byte >= len(self._bits):
+            return False
+        mask = 1 << (idx & 7)
+        if not self._bits[byte] & mask:
+            return False
+        self._bits[byte] &= ~mask & 0xFF
+        self.count -= 1
+        return True
+
+    def __contains__(self, idx: int) -> bool:
+        byte = idx >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << (idx & 7)))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[int]:
+        for byte_idx, byte in enumerate(self._bits):
+            if byte:
+                base = byte_idx << 3
+                for bit in range(8):
+                    if byte & (1 << bit):
+                        yield base + bit
+
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+class CompactInsideSet:
+    """
+    Drop-in for the `inside = set()` pattern, keyed by ticket-ID strings:
+    add / discard / in / len / iteration all behave like the set version.
+    """
+
+    def __init__(self, interner: TicketInterner = None):
+        self.interner = interner if interner is not None else TicketInterner()
+        self.bits = TicketBitset()
+
+    def add(self, ticket_id: str) -> None:
+        self.bits.add(self.interner.intern(ticket_id))
+
+    def discard(self, ticket_id: str) -> None:
+        idx = self.interner.lookup(ticket_id)
+        if idx >= 0:
+            self.bits.discard(idx)
+
+    def __contains__(self, ticket_id: str) -> bool:
+        idx = self.interner.lookup(ticket_id)
+        return idx >= 0 and idx in self.bits
+
+    def __len__(self) -> int:
+        return self.bits.count
+
+    def __iter__(self) -> Iterator[str]:
+        ticket = self.interner.ticket
+        return (ticket(idx) for idx in self.bits)
+
+    def to_set(self) -> Set[str]:
+        return set(self)
+
+
+class CompactAnomalyTracker:
+    """
+    Occupancy + Q4 anomaly detection (same rules as OccupancyTracker) with
+    bitset inside-state and an array('q') of per-ticket last-exit epochs.
+
+    Example:
+        >>> tracker = CompactAnomalyTracker()
+        >>> tracker.ingest_many(mock_scan_stream())
+        >>> len(tracker.inside), tracker.duplicate_entries
+        (4, {'T003'})
+    """
+
+    NEVER = -1
+
+    def __init__(self, interner: TicketInterner = None):
+        self.interner = interner if interner is not None else TicketInterner()
+        self.inside_bits = TicketBitset()
+        self.last_exit = array('q')
+        self.duplicate_entries: Set[str] = set()
+        self.exit_without_entry: Set[str] = set()
+        self.rapid_reentry: Set[str] = set()
+
+    @property
+    def inside(self) -> CompactInsideSet:
+        view = CompactInsideSet.__new__(CompactInsideSet)
+        view.interner = self.interner
+        view.bits = self.inside_bits
+        return view
+
+    @property
+    def total_occupancy(self) -> int:
+        return self.inside_bits.count
+
+    def ingest(self, event) -> None:
+        scan = to_scan_event(event)
+        ticket_id = scan.ticket_id
+        idx = self.interner.intern(ticket_id)
+        last_exit = self.last_exit
+        if idx >= len(last_exit):
+            last_exit.extend([self.NEVER] * (idx + 1 - len(last_exit)))
+
+        if scan.scan_type == 'entry':
+            if not self.inside_bits.add(idx):
+                self.duplicate_entries.add(ticket_id)
+                return
+            exited = last_exit[idx]
+            if exited != self.NEVER and to_epoch(scan.timestamp) - exited <= RAPID_REENTRY_SECONDS:
+                self.rapid_reentry.add(ticket_id)
+        else:
+            if not self.inside_bits.discard(idx):
+                self.exit_without_entry.add(ticket_id)
+                return
+            last_exit[idx] = to_epoch(scan.timestamp)
+
+    def ingest_many(self, events) -> None:
+        ingest = self.ingest
+        for event in events:
+            ingest(event)
+
+    def anomalies(self) -> Dict[str, Set[str]]:
+        return {
+            'duplicate_entries': set(self.duplicate_entries),
+            'exit_without_entry': set(self.exit_without_entry),
+            'rapid_reentry': set(self.rapid_reentry),
+        }
+
+
+# ===========================================================================
+# MEMORY BENCHMARK
+# ===========================================================================
+
+def memory_benchmark(n_tickets: int = 10_000_000) -> Dict:
+    """
+    Peak traced memory for n_tickets that are all inside, each with an entry
+    gate and a last-exit time - the state OccupancyTracker keeps per ticket.
+
+    set/dict version: inside dict (ticket -> gate) + last_exit dict (ticket -> epoch)
+    compact version:  interner + inside bitset + array('B') gate + array('q') exit
+
+    Ticket-ID strings are created before tracing starts and shared by both,
+    since any version has to hold them once.
+    """
+    ticket_ids = [f'T{i:08d}' for i in range(n_tickets)]
+    gates = 'ABCD'
+    base = to_epoch('2025-09-30T10:00:00')
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    inside = {}
+    last_exit = {}
+    for i, ticket_id in enumerate(ticket_ids):
+        inside[ticket_id] = gates[i & 3]
+        last_exit[ticket_id] = base + i % 86_400
+    set_time = time.perf_counter() - start
+    _, set_peak = tracemalloc.get_traced_memory()
+    del inside, last_exit
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    interner = TicketInterner(n_tickets)
+    bits = TicketBitset(n_tickets)
+    entry_gate = array('B', bytes(n_tickets))
+    exits = array('q', bytes(8 * n_tickets))
+    for i, ticket_id in enumerate(ticket_ids):
+        idx = interner.intern(ticket_id)
+        bits.add(idx)
+        entry_gate[idx] = i & 3
+        exits[idx] = base + i % 86_400
+    compact_time = time.perf_counter() - start
+    _, compact_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'tickets': n_tickets,
+        'set_dict_mb': round(set_peak / 1e6, 1),
+        'compact_mb': round(compact_peak / 1e6, 1),
+        'set_dict_bytes_per_ticket': round(set_peak / n_tickets, 1),
+        'compact_bytes_per_ticket': round(compact_peak / n_tickets, 1),
+        'set_dict_s': round(set_time, 2),
+        'compact_s': round(compact_time, 2),
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python compact_occupancy.py [n_tickets]
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    print(f"Memory for {n:,} tickets inside, each with a last-exit time:")
+    for key, value in memory_benchmark(n).items():
+        print(f"  {key}: {value}")
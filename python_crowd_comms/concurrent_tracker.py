@@ -0,0 +1,324 @@
+# Thread-Safe Occupancy Tracking with Lock Striping
+# =================================================
+# OccupancyTracker (and every dict/set in the practice files) assumes ONE
+# thread. With several scanner-handler threads, `inside[t] = gate` and
+# `by_gate[g] += 1` interleave and counts drift. The obvious fix - one global
+# lock around ingest() - makes every gate wait for every other gate.
+#
+# StripedOccupancyTracker splits the state so unrelated scans don't contend:
+#
+#   ticket state (inside, last exit, anomaly sets, entry/exit/type counts)
+#       -> stripe = crc32(ticket_id) % N, one lock + one dict per stripe
+#   gate counters (by_gate, scans_per_gate)
+#       -> one lock per gate
+#
+#   scan T042 @ gate B:  lock stripe[7] ──> lock gate[B] ──> update ──> unlock both
+#   scan T913 @ gate A:  lock stripe[2] ──> lock gate[A] ──> ...      (in parallel)
+#
+# Lock order is ALWAYS stripe then gate, so two scans can't deadlock.
+#
+# Consistent snapshot: every writer holds its stripe lock for the whole
+# update, so taking all stripe locks (in index order) stops every writer
+# between scans - the readout is the state after some exact set of scans.
+#
+# CPython note: with the GIL, pure-Python updates don't run in parallel
+# anyway, so striping mostly cuts lock convoying; on free-threaded builds
+# (3.13t+) the stripes genuinely run side by side.
+
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set
+
+from occupancy_tracker import OccupancyTracker
+from recent_exits import RecentExits
+from scan_decoder import to_scan_event
+from scan_timestamps import to_epoch, RAPID_REENTRY_SECONDS
+from ticket_registry import mock_registry
+
+
+class _Stripe:
+    """Everything keyed by ticket, for the tickets that hash to this stripe."""
+
+    __slots__ = ('lock', 'inside', 'last_exit_time', 'duplicate_entries',
+                 'exit_without_entry', 'rapid_reentry', 'by_ticket_type',
+                 'entries_by_type', 'total_entries', 'total_exits')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inside: Dict[str, str] = {}
+        self.last_exit_time = RecentExits()
+        self.duplicate_entries: Set[str] = set()
+        self.exit_without_entry: Set[str] = set()
+        self.rapid_reentry: Set[str] = set()
+        self.by_ticket_type = defaultdict(int)
+        self.entries_by_type = Counter()
+        self.total_entries = 0
+        self.total_exits = 0
+
+
+class _GateCounters:
+    __slots__ = ('lock', 'occupancy', 'scans')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.occupancy = 0   # people inside who entered through this gate
+        self.scans = 0       # every scan at this gate, valid or not
+
+
+class StripedOccupancyTracker:
+    """
+    OccupancyTracker's occupancy + anomaly rules, safe to ingest() from many
+    threads at once.
+
+    Args:
+        stripes: Number of ticket-state partitions (more = less contention)
+        ticket_types: ticket_id -> ticket_type (default: mock tickets)
+
+    Scans for the SAME ticket must still be ingested in order (route each
+    ticket to one handler thread, or reorder first) - the locks make updates
+    atomic, they can't guess which of two racing scans happened first.
+
+    Example:
+        >>> tracker = StripedOccupancyTracker(stripes=16)
+        >>> # from any number of threads:
+        >>> tracker.ingest(scan)
+        >>> tracker.snapshot()['total_occupancy']
+    """
+
+    def __init__(self, stripes: int = 16, ticket_types: Optional[Dict[str, str]] = None):
+        if stripes < 1:
+            raise ValueError("stripes must be at least 1")
+        if ticket_types is None:
+            ticket_types = mock_registry()
+        self.ticket_types = ticket_types
+        self._stripes: List[_Stripe] = [_Stripe() for _ in range(stripes)]
+        self._gates: Dict[str, _GateCounters] = {}
+        self._gates_lock = threading.Lock()
+
+    def _gate(self, gate: str) -> _GateCounters:
+        counters = self._gates.get(gate)
+        if counters is None:
+            with self._gates_lock:
+                counters = self._gates.get(gate)
+                if counters is None:
+                    counters = self._gates[gate] = _GateCounters()
+        return counters
+
+    # -----------------------------------------------------------------------
+    # Writers
+    # -----------------------------------------------------------------------
+
+    def ingest(self, event) -> None:
+        """Apply one scan. Decoding happens before any lock is taken."""
+        scan = to_scan_event(event)
+        ticket_id = scan.ticket_id
+        ticket_type = self.ticket_types.get(ticket_id, 'Unknown')
+        stripe = self._stripes[zlib.crc32(ticket_id.encode()) % len(self._stripes)]
+        gate = self._gate(scan.gate)
+
+        with stripe.lock:
+            with gate.lock:
+                gate.scans += 1
+
+            if scan.scan_type == 'entry':
+                stripe.entries_by_type[ticket_type] += 1
+                if ticket_id in stripe.inside:
+                    stripe.duplicate_entries.add(ticket_id)
+                    return
+
+                last_exit = stripe.last_exit_time.get(ticket_id)
+                if last_exit is not None and to_epoch(scan.timestamp) - last_exit <= RAPID_REENTRY_SECONDS:
+                    stripe.rapid_reentry.add(ticket_id)
+
+                stripe.inside[ticket_id] = scan.gate
+                stripe.by_ticket_type[ticket_type] += 1
+                stripe.total_entries += 1
+                with gate.lock:
+                    gate.occupancy += 1
+
+            else:
+                entry_gate = stripe.inside.pop(ticket_id, None)
+                if entry_gate is None:
+                    stripe.exit_without_entry.add(ticket_id)
+                    return
+
+                stripe.by_ticket_type[ticket_type] -= 1
+                stripe.total_exits += 1
+                stripe.last_exit_time[ticket_id] = to_epoch(scan.timestamp)
+                entered = self._gate(entry_gate)
+                with entered.lock:
+                    entered.occupancy -= 1
+
+    def ingest_many(self, events) -> None:
+        ingest = self.ingest
+        for event in events:
+            ingest(event)
+
+    # -----------------------------------------------------------------------
+    # Readers
+    # -----------------------------------------------------------------------
+
+    def _lock_all(self) -> None:
+        for stripe in self._stripes:
+            stripe.lock.acquire()
+
+    def _unlock_all(self) -> None:
+        for stripe in reversed(self._stripes):
+            stripe.lock.release()
+
+    def snapshot(self) -> Dict:
+        """
+        Consistent view of every metric (details + anomalies + scans per gate).
+
+        Briefly blocks writers: all stripe locks are held while reading.
+        """
+        self._lock_all()
+        try:
+            by_ticket_type = Counter()
+            entries_by_type = Counter()
+            duplicate_entries, exit_without_entry, rapid_reentry = set(), set(), set()
+            total_occupancy = total_entries = total_exits = 0
+            for stripe in self._stripes:
+                total_occupancy += len(stripe.inside)
+                total_entries += stripe.total_entries
+                total_exits += stripe.total_exits
+                by_ticket_type.update(stripe.by_ticket_type)
+                entries_by_type.update(stripe.entries_by_type)
+                duplicate_entries |= stripe.duplicate_entries
+                exit_without_entry |= stripe.exit_without_entry
+                rapid_reentry |= stripe.rapid_reentry
+            # Gates can be registered before their writer reaches a stripe lock
+            with self._gates_lock:
+                gates = list(self._gates.items())
+            by_gate = {gate: c.occupancy for gate, c in gates if c.occupancy}
+            scans_per_gate = Counter({gate: c.scans for gate, c in gates if c.scans})
+        finally:
+            self._unlock_all()
+
+        return {
+            'total_occupancy': total_occupancy,
+            'by_gate': by_gate,
+            'by_ticket_type': {t: count for t, count in by_ticket_type.items() if count},
+            'total_entries': total_entries,
+            'total_exits': total_exits,
+            'duplicate_entries': duplicate_entries,
+            'exit_without_entry': exit_without_entry,
+            'rapid_reentry': rapid_reentry,
+            'scans_per_gate': scans_per_gate,
+            'entries_by_type': entries_by_type,
+        }
+
+    @property
+    def total_occupancy(self) -> int:
+        return self.snapshot()['total_occupancy']
+
+
+class GlobalLockOccupancyTracker:
+    """The simple alternative: one OccupancyTracker behind one lock."""
+
+    def __init__(self, ticket_types: Optional[Dict[str, str]] = None):
+        self.tracker = OccupancyTracker(ticket_types=ticket_types)
+        self.lock = threading.Lock()
+
+    def ingest(self, event) -> None:
+        scan = to_scan_event(event)
+        with self.lock:
+            self.tracker.ingest(scan)
+
+    def ingest_many(self, events) -> None:
+        ingest = self.ingest
+        for event in events:
+            ingest(event)
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            t = self.tracker
+            snapshot = t.details()
+            snapshot.update(t.anomalies())
+            snapshot['scans_per_gate'] = Counter(t.scans_per_gate)
+            snapshot['entries_by_type'] = Counter(t.entries_by_type)
+        return snapshot
+
+
+# ===========================================================================
+# STRESS BENCHMARK
+# ===========================================================================
+
+def stress_benchmark(threads: int = 8, n_tickets: int = 100_000, stripes: int = 16,
+                     snapshot_every: float = 0.01, seed: int = 42) -> Dict:
+    """
+    Ingest the same generated log from `threads` handler threads into both
+    trackers while a reader thread snapshots continuously.
+
+    Each ticket's scans go to one handler (by crc32, like sharded_replay) so
+    per-ticket order holds, and both trackers must end with identical
+    snapshots equal to a single-threaded OccupancyTracker.
+    """
+    from scan_generator import generate_scan_stream, ticket_type_lookup
+
+    types = ticket_type_lookup(n_tickets, seed=seed)
+    per_thread = [[] for _ in range(threads)]
+    for scan in generate_scan_stream(n_tickets=n_tickets, seed=seed, output='event'):
+        per_thread[zlib.crc32(scan.ticket_id.encode()) % threads].append(scan)
+    total = sum(len(events) for events in per_thread)
+
+    results = {'threads': threads, 'events': total, 'stripes': stripes}
+    snapshots = {}
+    for label, tracker in (('global_lock', GlobalLockOccupancyTracker(types)),
+                           ('striped', StripedOccupancyTracker(stripes, types))):
+        elapsed, reads = _hammer(tracker, per_thread, snapshot_every)
+        results[f'{label}_events_per_sec'] = round(total / elapsed)
+        results[f'{label}_snapshots'] = reads
+        snapshots[label] = tracker.snapshot()
+
+    reference = OccupancyTracker(ticket_types=types)
+    for events in per_thread:
+        reference.ingest_many(events)
+    expected = reference.details()
+    results['consistent'] = all(
+        {key: snap[key] for key in expected} == expected for snap in snapshots.values())
+    results['speedup'] = round(results['striped_events_per_sec'] / results['global_lock_events_per_sec'], 2)
+    return results
+
+
+def _hammer(tracker, per_thread, snapshot_every: float):
+    start_line = threading.Barrier(len(per_thread) + 1)
+    done = threading.Event()
+    reads = 0
+
+    def writer(events):
+        start_line.wait()
+        tracker.ingest_many(events)
+
+    def reader():
+        nonlocal reads
+        while not done.is_set():
+            tracker.snapshot()
+            reads += 1
+            done.wait(snapshot_every)
+
+    workers = [threading.Thread(target=writer, args=(events,)) for events in per_thread]
+    for worker in workers:
+        worker.start()
+    reader_thread = threading.Thread(target=reader)
+
+    start_line.wait()
+    start = time.perf_counter()
+    reader_thread.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    reader_thread.join()
+    return elapsed, reads
+
+
+if __name__ == "__main__":
+    # Usage: python concurrent_tracker.py [threads] [n_tickets]
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    for key, value in stress_benchmark(threads, n).items():
+        print(f"{key}: {value}")
@@ -2,11 +2,21 @@
 # ===========================================
 # SQL, PostgreSQL, and database concepts for CrowdComms interview prep
 # Focus: SQL vs Python, JOINs, transactions, database design
+#
+# Every query borrows a connection from the shared pool in db_pool.py instead
+# of connecting per call (DSN from OCCUPANCY_DSN, see db_pool.configure()).
+# The read queries are @cached_query: once query_cache.configure() is called,
+# results are served from cache until new scans are loaded.
 
-import psycopg2
-import json
 from typing import Dict, List
-from datetime import datetime
+
+from db_pool import db_cursor, get_pool
+from occupancy_checkpoints import install_checkpoints, rebuild_checkpoints
+from query_cache import cached_query, invalidate
+from scan_decoder import decode_scan
+from scan_loader import load_scans
+from scan_timestamps import from_epoch, to_epoch
+from ticket_state import install_ticket_state, rebuild_ticket_state
 
 
 # ===========================================================================
@@ -85,58 +95,65 @@ def setup_database():
     - tickets table (what tickets exist)
     - scans table (entry/exit events)
     """
-    conn = psycopg2.connect("dbname=occupancy_db_learning2 user=tomfyfe")
-    cursor = conn.cursor()
-
-    # Drop existing tables (fresh start)
-    cursor.execute("DROP TABLE IF EXISTS scans CASCADE")
-    cursor.execute("DROP TABLE IF EXISTS tickets CASCADE")
-    cursor.execute("DROP TABLE IF EXISTS users CASCADE")
-
-    # Create users table
-    cursor.execute("""
-        CREATE TABLE users (
-            user_id VARCHAR(10) PRIMARY KEY,
-            email VARCHAR(100) UNIQUE NOT NULL,
-            phone VARCHAR(20),
-            name VARCHAR(100),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Create tickets table with foreign key to users
-    cursor.execute("""
-        CREATE TABLE tickets (
-            ticket_id VARCHAR(10) PRIMARY KEY,
-            user_id VARCHAR(10) NOT NULL,
-            ticket_type VARCHAR(20) NOT NULL,
-            price DECIMAL(10, 2),
-            purchase_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            is_valid BOOLEAN DEFAULT true,
-            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
-        )
-    """)
-
-    # Create scans table with foreign key to tickets
-    cursor.execute("""
-        CREATE TABLE scans (
-            scan_id SERIAL PRIMARY KEY,
-            ticket_id VARCHAR(10) NOT NULL,
-            gate VARCHAR(1) NOT NULL,
-            scan_type VARCHAR(5) NOT NULL CHECK (scan_type IN ('entry', 'exit')),
-            scan_time TIMESTAMP NOT NULL,
-            flagged_suspicious BOOLEAN DEFAULT false,
-            FOREIGN KEY (ticket_id) REFERENCES tickets(ticket_id) ON DELETE CASCADE
-        )
-    """)
+    # Same schema on the SQLite stand-in, minus two Postgres-only spellings
+    postgres = get_pool().dialect == 'postgres'
+    cascade = ' CASCADE' if postgres else ''
+    serial = 'SERIAL' if postgres else 'INTEGER'
+
+    with db_cursor() as cursor:
+        # Drop existing tables (fresh start)
+        cursor.execute(f"DROP TABLE IF EXISTS scans{cascade}")
+        cursor.execute(f"DROP TABLE IF EXISTS tickets{cascade}")
+        cursor.execute(f"DROP TABLE IF EXISTS users{cascade}")
+
+        # Create users table
+        cursor.execute("""
+            CREATE TABLE users (
+                user_id VARCHAR(10) PRIMARY KEY,
+                email VARCHAR(100) UNIQUE NOT NULL,
+                phone VARCHAR(20),
+                name VARCHAR(100),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Create tickets table with foreign key to users
+        cursor.execute("""
+            CREATE TABLE tickets (
+                ticket_id VARCHAR(10) PRIMARY KEY,
+                user_id VARCHAR(10) NOT NULL,
+                ticket_type VARCHAR(20) NOT NULL,
+                price DECIMAL(10, 2),
+                purchase_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                is_valid BOOLEAN DEFAULT true,
+                FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+            )
+        """)
+
+        # Create scans table with foreign key to tickets
+        cursor.execute(f"""
+            CREATE TABLE scans (
+                scan_id {serial} PRIMARY KEY,
+                ticket_id VARCHAR(10) NOT NULL,
+                gate VARCHAR(1) NOT NULL,
+                scan_type VARCHAR(5) NOT NULL CHECK (scan_type IN ('entry', 'exit')),
+                scan_time TIMESTAMP NOT NULL,
+                flagged_suspicious BOOLEAN DEFAULT false,
+                FOREIGN KEY (ticket_id) REFERENCES tickets(ticket_id) ON DELETE CASCADE
+            )
+        """)
 
-    # Create indexes for performance
-    cursor.execute("CREATE INDEX idx_scans_ticket_time ON scans(ticket_id, scan_time)")
-    cursor.execute("CREATE INDEX idx_scans_gate ON scans(gate)")
-    cursor.execute("CREATE INDEX idx_tickets_user ON tickets(user_id)")
+        # Create indexes for performance
+        cursor.execute("CREATE INDEX idx_scans_ticket_time ON scans(ticket_id, scan_time)")
+        cursor.execute("CREATE INDEX idx_scans_gate ON scans(gate)")
+        cursor.execute("CREATE INDEX idx_tickets_user ON tickets(user_id)")
+
+    # ticket_state + occupancy_counters, kept current by a trigger on scans
+    install_ticket_state()
+    # Hourly checkpoints for get_occupancy_at_time_checkpointed()
+    install_checkpoints()
+    invalidate()
 
-    conn.commit()
-    conn.close()
     print("✅ Database schema created successfully!")
 
 
@@ -145,38 +162,37 @@ def populate_database():
     Populate all 3 tables with mock data.
     Run this AFTER setup_database().
     """
-    conn = psycopg2.connect("dbname=occupancy_db_learning2 user=tomfyfe")
-    cursor = conn.cursor()
-
-    # Clear existing data
-    cursor.execute("DELETE FROM scans")
-    cursor.execute("DELETE FROM tickets")
-    cursor.execute("DELETE FROM users")
-
-    # Insert users
-    for user in get_mock_users():
-        cursor.execute("""
-            INSERT INTO users (user_id, email, phone, name)
-            VALUES (%s, %s, %s, %s)
-        """, (user['user_id'], user['email'], user['phone'], user['name']))
-
-    # Insert tickets
-    for ticket in get_mock_tickets():
-        cursor.execute("""
-            INSERT INTO tickets (ticket_id, user_id, ticket_type, price)
-            VALUES (%s, %s, %s, %s)
-        """, (ticket['ticket_id'], ticket['user_id'], ticket['ticket_type'], ticket['price']))
+    mark = get_pool().placeholder
+
+    with db_cursor() as cursor:
+        # Clear existing data
+        cursor.execute("DELETE FROM scans")
+        cursor.execute("DELETE FROM tickets")
+        cursor.execute("DELETE FROM users")
+
+        # Insert users
+        for user in get_mock_users():
+            cursor.execute(f"""
+                INSERT INTO users (user_id, email, phone, name)
+                VALUES ({mark}, {mark}, {mark}, {mark})
+            """, (user['user_id'], user['email'], user['phone'], user['name']))
+
+        # Insert tickets
+        for ticket in get_mock_tickets():
+            cursor.execute(f"""
+                INSERT INTO tickets (ticket_id, user_id, ticket_type, price)
+                VALUES ({mark}, {mark}, {mark}, {mark})
+            """, (ticket['ticket_id'], ticket['user_id'], ticket['ticket_type'], ticket['price']))
+
+    # Insert scans - batched COPY (see scan_loader.py), after the tickets
+    # they reference are committed. Works the same for a 50M-scan log.
+    load_scans(mock_scan_stream())
+
+    # The triggers only see inserts - the DELETEs above need a rebuild
+    rebuild_ticket_state()
+    rebuild_checkpoints()
+    invalidate()
 
-    # Insert scans
-    for event_json in mock_scan_stream():
-        scan = json.loads(event_json)
-        cursor.execute("""
-            INSERT INTO scans (ticket_id, gate, scan_type, scan_time)
-            VALUES (%s, %s, %s, %s)
-        """, (scan['ticket_id'], scan['gate'], scan['scan_type'], scan['timestamp']))
-
-    conn.commit()
-    conn.close()
     print("✅ Database populated with mock data!")
 
 
@@ -259,6 +275,33 @@ For this question:
 """
 
 
+# "Last scan per ticket" in each dialect ({where} filters scans first).
+# SQLite has no DISTINCT ON, so it takes ROW_NUMBER() = 1 instead.
+LAST_SCANS_SQL = {
+    'postgres': """
+            SELECT DISTINCT ON (ticket_id)
+                ticket_id,
+                gate,
+                scan_type
+            FROM scans
+            {where}
+            ORDER BY ticket_id, scan_time DESC
+    """,
+    'sqlite': """
+            SELECT ticket_id, gate, scan_type FROM (
+                SELECT
+                    ticket_id,
+                    gate,
+                    scan_type,
+                    ROW_NUMBER() OVER (PARTITION BY ticket_id ORDER BY scan_time DESC) AS rn
+                FROM scans
+                {where}
+            ) WHERE rn = 1
+    """,
+}
+
+
+@cached_query
 def count_current_occupancy_sql() -> int:
     """
     SQL SOLUTION: Find current occupancy using database query.
@@ -272,25 +315,17 @@ def count_current_occupancy_sql() -> int:
 
     Expected: 4 tickets inside
     """
-    conn = psycopg2.connect("dbname=occupancy_db_learning2 user=tomfyfe")
-    cursor = conn.cursor()
-
-    query = """
-    WITH last_scans AS (
-        SELECT DISTINCT ON(ticket_id)
-            ticket_id,
-            scan_type
-        FROM scans
-        ORDER BY ticket_id, scan_time DESC
-    )
-    SELECT COUNT(*)
-    FROM last_scans
-    WHERE scan_type = 'entry';
-    """
+    pool = get_pool()
+    with pool.cursor() as cursor:
+        query = f"""
+        WITH last_scans AS ({LAST_SCANS_SQL[pool.dialect].format(where='')})
+        SELECT COUNT(*)
+        FROM last_scans
+        WHERE scan_type = 'entry';
+        """
 
-    cursor.execute(query)
-    result = cursor.fetchone()
-    conn.close()
+        cursor.execute(query)
+        result = cursor.fetchone()
 
     return result[0] if result else 0
 
@@ -310,14 +345,12 @@ def count_current_occupancy_python(stream) -> int:
     inside = set()
 
     for event_json in stream:
-        event = json.loads(event_json)
-        ticket_id = event['ticket_id']
-        scan_type = event['scan_type']
+        event = decode_scan(event_json)
 
-        if scan_type == 'entry':
-            inside.add(ticket_id)
+        if event.scan_type == 'entry':
+            inside.add(event.ticket_id)
         else:
-            inside.discard(ticket_id)
+            inside.discard(event.ticket_id)
 
     return len(inside)
 
@@ -407,9 +440,12 @@ Look for "Index Scan" in the output!
 """
 
 
+@cached_query
 def get_occupancy_at_time_sql(target_time: str) -> int:
     """
     SQL SOLUTION: Find occupancy at specific time with timestamp filtering.
+    (Reads every scan before target_time - occupancy_checkpoints.py starts
+    from the nearest hourly checkpoint instead. This stays the reference.)
 
     Args:
         target_time: Timestamp string (e.g., '2025-09-30 11:30:00')
@@ -419,26 +455,21 @@ def get_occupancy_at_time_sql(target_time: str) -> int:
 
     Expected: At '2025-09-30 11:30:00' -> 6 tickets inside
     """
-    conn = psycopg2.connect("dbname=occupancy_db_learning2 user=tomfyfe")
-    cursor = conn.cursor()
-
-    query = """
-    WITH last_scans_before AS (
-        SELECT DISTINCT ON (ticket_id)
-            ticket_id,
-            scan_type
-        FROM scans
-        WHERE scan_time <= %s
-        ORDER BY ticket_id, scan_time DESC
-    )
-    SELECT COUNT(*) as occupancy
-    FROM last_scans_before
-    WHERE scan_type = 'entry';
-    """
+    pool = get_pool()
+    if pool.dialect == 'sqlite':
+        # Canonical 'YYYY-MM-DDTHH:MM:SS' - SQLite compares timestamps as text
+        target_time = from_epoch(to_epoch(target_time))
+    where = f"WHERE scan_time <= {pool.placeholder}"
+    with pool.cursor() as cursor:
+        query = f"""
+        WITH last_scans_before AS ({LAST_SCANS_SQL[pool.dialect].format(where=where)})
+        SELECT COUNT(*) as occupancy
+        FROM last_scans_before
+        WHERE scan_type = 'entry';
+        """
 
-    cursor.execute(query, (target_time,))
-    result = cursor.fetchone()
-    conn.close()
+        cursor.execute(query, (target_time,))
+        result = cursor.fetchone()
 
     return result[0] if result else 0
 
@@ -455,23 +486,19 @@ def get_occupancy_at_time_python(stream, target_time: str) -> int:
         int: Number of tickets inside at that moment
     """
     inside = set()
-    target_dt = datetime.fromisoformat(target_time)
+    target_epoch = to_epoch(target_time)
 
     for event_json in stream:
-        event = json.loads(event_json)
-        event_time = datetime.fromisoformat(event['timestamp'])
+        event = decode_scan(event_json)
 
-        # Stop processing events after target time
-        if event_time > target_dt:
+        # Stop processing events after target time (plain int comparison)
+        if to_epoch(event.timestamp) > target_epoch:
             break
 
-        ticket_id = event['ticket_id']
-        scan_type = event['scan_type']
-
-        if scan_type == 'entry':
-            inside.add(ticket_id)
+        if event.scan_type == 'entry':
+            inside.add(event.ticket_id)
         else:
-            inside.discard(ticket_id)
+            inside.discard(event.ticket_id)
 
     return len(inside)
 
@@ -592,11 +619,13 @@ This is perfect for REST APIs.
 """
 
 
+@cached_query
 def get_detailed_breakdown_sql() -> Dict:
     """
     SQL SOLUTION: Return comprehensive occupancy breakdown.
 
     Uses JOINs and GROUP BY to create detailed report.
+    (Three passes over scans - breakdown_query.py does it in one statement.)
 
     Returns:
         {
@@ -605,63 +634,42 @@ def get_detailed_breakdown_sql() -> Dict:
             'by_ticket_type': {'VIP': 1, 'General': 3}
         }
     """
-    conn = psycopg2.connect("dbname=occupancy_db_learning2 user=tomfyfe")
-    cursor = conn.cursor()
-
-    result = {}
-
-    # Total occupancy
-    cursor.execute("""
-        WITH last_scans AS (
-            SELECT DISTINCT ON (ticket_id)
-                ticket_id,
-                scan_type
-            FROM scans
-            ORDER BY ticket_id, scan_time DESC
-        )
-        SELECT COUNT(*)
-        FROM last_scans
-        WHERE scan_type = 'entry';
-    """)
-    result['total_occupancy'] = cursor.fetchone()[0]
-
-    # By gate
-    cursor.execute("""
-        WITH last_scans AS (
-            SELECT DISTINCT ON (ticket_id)
-                ticket_id,
-                gate,
-                scan_type
-            FROM scans
-            ORDER BY ticket_id, scan_time DESC
-        )
-        SELECT gate, COUNT(*)
-        FROM last_scans
-        WHERE scan_type = 'entry'
-        GROUP BY gate
-        ORDER BY gate;
-    """)
-    result['by_gate'] = {row[0]: row[1] for row in cursor.fetchall()}
-
-    # By ticket type (needs JOIN)
-    cursor.execute("""
-        WITH last_scans AS (
-            SELECT DISTINCT ON (s.ticket_id)
-                s.ticket_id,
-                s.scan_type,
-                t.ticket_type
-            FROM scans s
+    pool = get_pool()
+    last_scans = LAST_SCANS_SQL[pool.dialect].format(where='')
+    with pool.cursor() as cursor:
+        result = {}
+
+        # Total occupancy
+        cursor.execute(f"""
+            WITH last_scans AS ({last_scans})
+            SELECT COUNT(*)
+            FROM last_scans
+            WHERE scan_type = 'entry';
+        """)
+        result['total_occupancy'] = cursor.fetchone()[0]
+
+        # By gate
+        cursor.execute(f"""
+            WITH last_scans AS ({last_scans})
+            SELECT gate, COUNT(*)
+            FROM last_scans
+            WHERE scan_type = 'entry'
+            GROUP BY gate
+            ORDER BY gate;
+        """)
+        result['by_gate'] = {row[0]: row[1] for row in cursor.fetchall()}
+
+        # By ticket type (needs JOIN)
+        cursor.execute(f"""
+            WITH last_scans AS ({last_scans})
+            SELECT t.ticket_type, COUNT(*)
+            FROM last_scans s
             JOIN tickets t ON s.ticket_id = t.ticket_id
-            ORDER BY s.ticket_id, s.scan_time DESC
-        )
-        SELECT ticket_type, COUNT(*)
-        FROM last_scans
-        WHERE scan_type = 'entry'
-        GROUP BY ticket_type;
-    """)
-    result['by_ticket_type'] = {row[0]: row[1] for row in cursor.fetchall()}
+            WHERE s.scan_type = 'entry'
+            GROUP BY t.ticket_type;
+        """)
+        result['by_ticket_type'] = {row[0]: row[1] for row in cursor.fetchall()}
 
-    conn.close()
     return result
 
 
@@ -743,6 +751,7 @@ They're often faster than self-joins for "compare with previous row" logic.
 """
 
 
+@cached_query
 def detect_anomalies_sql() -> Dict[str, List[str]]:
     """
     SQL SOLUTION: Detect anomalies using window functions.
@@ -757,42 +766,39 @@ def detect_anomalies_sql() -> Dict[str, List[str]]:
             'exit_without_entry': []
         }
     """
-    conn = psycopg2.connect("dbname=occupancy_db_learning2 user=tomfyfe")
-    cursor = conn.cursor()
+    with db_cursor() as cursor:
+        result = {'duplicate_entries': [], 'exit_without_entry': []}
 
-    result = {'duplicate_entries': [], 'exit_without_entry': []}
+        # Duplicate entries
+        cursor.execute("""
+            WITH scan_with_previous AS (
+                SELECT
+                    ticket_id,
+                    scan_type,
+                    LAG(scan_type) OVER (PARTITION BY ticket_id ORDER BY scan_time) as prev_scan
+                FROM scans
+            )
+            SELECT DISTINCT ticket_id
+            FROM scan_with_previous
+            WHERE scan_type = 'entry' AND prev_scan = 'entry';
+        """)
+        result['duplicate_entries'] = [row[0] for row in cursor.fetchall()]
 
-    # Duplicate entries
-    cursor.execute("""
-        WITH scan_with_previous AS (
-            SELECT
-                ticket_id,
-                scan_type,
-                LAG(scan_type) OVER (PARTITION BY ticket_id ORDER BY scan_time) as prev_scan
-            FROM scans
-        )
-        SELECT DISTINCT ticket_id
-        FROM scan_with_previous
-        WHERE scan_type = 'entry' AND prev_scan = 'entry';
-    """)
-    result['duplicate_entries'] = [row[0] for row in cursor.fetchall()]
-
-    # Exit without entry
-    cursor.execute("""
-        WITH scan_with_previous AS (
-            SELECT
-                ticket_id,
-                scan_type,
-                LAG(scan_type) OVER (PARTITION BY ticket_id ORDER BY scan_time) as prev_scan
-            FROM scans
-        )
-        SELECT DISTINCT ticket_id
-        FROM scan_with_previous
-        WHERE scan_type = 'exit' AND (prev_scan IS NULL OR prev_scan = 'exit');
-    """)
-    result['exit_without_entry'] = [row[0] for row in cursor.fetchall()]
+        # Exit without entry
+        cursor.execute("""
+            WITH scan_with_previous AS (
+                SELECT
+                    ticket_id,
+                    scan_type,
+                    LAG(scan_type) OVER (PARTITION BY ticket_id ORDER BY scan_time) as prev_scan
+                FROM scans
+            )
+            SELECT DISTINCT ticket_id
+            FROM scan_with_previous
+            WHERE scan_type = 'exit' AND (prev_scan IS NULL OR prev_scan = 'exit');
+        """)
+        result['exit_without_entry'] = [row[0] for row in cursor.fetchall()]
 
-    conn.close()
     return result
 
 
@@ -916,6 +922,10 @@ else:
     return count_current_occupancy_sql()
 
 This reduces database load for frequently-accessed data!
+
+(But a 10-second TTL serves stale counts AND re-queries every 10 seconds even
+when nothing changed. query_cache.py keys results by a scan version that the
+ingest path bumps instead - see query_cache.configure().)
 """
 
 
@@ -0,0 +1,358 @@
+# Pooled Database Access
+# ======================
+# Every *_sql function used to do:
+#
+#   conn = psycopg2.connect("dbname=occupancy_db_learning2 user=tomfyfe")
+#   ... one sub-millisecond query ...
+#   conn.close()
+#
+# A Postgres connect is a TCP handshake + auth + a new backend process - a few
+# milliseconds, i.e. 10-100x the query itself. ConnectionPool connects once
+# and hands the same connections out again:
+#
+#   with db_cursor() as cursor:          idle: [conn1, conn2]
+#       cursor.execute(...)     ──>      borrow conn2 -> run -> commit -> return
+#
+# - min_size connections are opened up front, never more than max_size exist;
+#   a caller that finds all max_size busy waits up to `timeout` seconds.
+# - Health check: a connection idle for more than health_check_after seconds
+#   runs `SELECT 1` before it's handed out; a dead one is replaced silently.
+# - A block that raises is rolled back; if even the rollback fails the
+#   connection is broken and gets discarded instead of going back in the pool.
+#
+# The pool only needs a `connect()` callable returning a DB-API connection, so
+# the same code runs on psycopg2 (ConnectionPool.from_dsn) and sqlite3
+# (ConnectionPool.sqlite) - which is how the tests run without a server.
+#
+# The DSN comes from OCCUPANCY_DSN if set; configure() swaps the shared pool.
+# Swapping or closing it also invalidates query_cache: cached results belong
+# to the old database.
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+import query_cache
+
+
+DEFAULT_DSN = os.environ.get('OCCUPANCY_DSN', 'dbname=occupancy_db_learning2 user=tomfyfe')
+
+
+class PoolTimeout(Exception):
+    """Every connection stayed busy for longer than the pool's timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections.
+
+    Args:
+        connect: Zero-argument callable returning a new connection
+        min_size: Connections opened up front (and kept)
+        max_size: Hard cap on open connections
+        health_check_after: Idle seconds after which a connection is pinged
+            before reuse (0 = every time, None = never)
+        health_query: The ping
+        timeout: Seconds to wait for a free connection before PoolTimeout
+        dialect: 'postgres' or 'sqlite'; sets placeholder ('%s' / '?')
+
+    Example:
+        >>> pool = ConnectionPool.from_dsn('dbname=occupancy_db_learning2', max_size=5)
+        >>> with pool.cursor() as cursor:
+        ...     cursor.execute("SELECT COUNT(*) FROM scans")
+        ...     cursor.fetchone()
+    """
+
+    def __init__(self, connect: Callable[[], Any], min_size: int = 1, max_size: int = 10,
+                 health_check_after: Optional[float] = 30.0, health_query: str = 'SELECT 1',
+                 timeout: float = 5.0, dialect: str = 'postgres'):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Need 0 <= min_size <= max_size and max_size >= 1")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.health_check_after = health_check_after
+        self.health_query = health_query
+        self.timeout = timeout
+        self.dialect = dialect              # 'postgres' or 'sqlite' - for SQL that differs
+        self.placeholder = '?' if dialect == 'sqlite' else '%s'
+
+        self._idle = deque()                # (connection, last_used), most recent on the right
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # Stats
+        self.created = 0
+        self.reused = 0
+        self.health_checks = 0
+        self.discarded = 0
+        self.waits = 0
+
+        for _ in range(min_size):
+            self._idle.append((self._new_connection(), time.monotonic()))
+
+    @classmethod
+    def from_dsn(cls, dsn: Optional[str] = None, **kwargs) -> 'ConnectionPool':
+        """Postgres pool (psycopg2 is only imported here)."""
+        import psycopg2
+        dsn = dsn or DEFAULT_DSN
+        return cls(lambda: psycopg2.connect(dsn), **kwargs)
+
+    @classmethod
+    def sqlite(cls, path: str, **kwargs) -> 'ConnectionPool':
+        """
+        SQLite pool - the local stand-in. Use a file path (or a shared-cache
+        URI) so every pooled connection sees the same database.
+        """
+        uri = path.startswith('file:')
+        return cls(lambda: sqlite3.connect(path, uri=uri, check_same_thread=False),
+                   dialect='sqlite', **kwargs)
+
+    # -----------------------------------------------------------------------
+    # Borrow / return
+    # -----------------------------------------------------------------------
+
+    def _new_connection(self):
+        connection = self._connect()
+        self._open += 1
+        self.created += 1
+        return connection
+
+    def _discard(self, connection) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._open -= 1
+            self.discarded += 1
+            self._cond.notify()
+
+    def _healthy(self, connection) -> bool:
+        self.health_checks += 1
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(self.health_query)
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            connection.rollback()      # don't leave the ping's transaction open
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Borrow a connection. Pair with release(), or use connection()."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Pool is closed")
+                    if self._idle:
+                        connection, last_used = self._idle.pop()
+                        break
+                    if self._open < self.max_size:
+                        # Reserve the slot, connect outside the lock
+                        self._open += 1
+                        connection, last_used = None, None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"No free connection after {timeout}s "
+                                          f"(max_size={self.max_size})")
+                    self.waits += 1
+                    self._cond.wait(remaining)
+
+            if connection is None:
+                try:
+                    connection = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+                self.created += 1
+                return connection
+
+            idle_for = time.monotonic() - last_used
+            if (self.health_check_after is not None and idle_for > self.health_check_after
+                    and not self._healthy(connection)):
+                self._discard(connection)
+                continue           # try the next idle one, or open a fresh one
+            self.reused += 1
+            return connection
+
+    def release(self, connection, broken: bool = False) -> None:
+        """Return a borrowed connection; broken=True closes it instead."""
+        if broken or self._closed:
+            self._discard(connection)
+            return
+        with self._cond:
+            self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for one unit of work: commit if the block
+        succeeds, roll back if it raises.
+        """
+        connection = self.acquire()
+        broken = False
+        try:
+            yield connection
+            connection.commit()
+        except BaseException:
+            try:
+                connection.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self.release(connection, broken)
+
+    @contextmanager
+    def cursor(self):
+        """A cursor on a pooled connection - the replacement for connect()/close()."""
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    # -----------------------------------------------------------------------
+    # Lifecycle
+    # -----------------------------------------------------------------------
+
+    def close(self) -> None:
+        """Close idle connections now; borrowed ones close when released."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'open': self._open,
+                'idle': len(self._idle),
+                'created': self.created,
+                'reused': self.reused,
+                'health_checks': self.health_checks,
+                'discarded': self.discarded,
+                'waits': self.waits,
+            }
+
+
+# ===========================================================================
+# SHARED POOL
+# ===========================================================================
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def configure(dsn: Optional[str] = None, pool: Optional[ConnectionPool] = None,
+              **kwargs) -> ConnectionPool:
+    """
+    Replace the shared pool: pass a ready pool (e.g. ConnectionPool.sqlite(...)
+    in tests) or a DSN plus ConnectionPool options.
+    """
+    global _pool
+    new_pool = pool if pool is not None else ConnectionPool.from_dsn(dsn, **kwargs)
+    with _pool_lock:
+        old, _pool = _pool, new_pool
+    if old is not new_pool:
+        query_cache.invalidate()
+    if old is not None and old is not new_pool:
+        old.close()
+    return new_pool
+
+
+def get_pool() -> ConnectionPool:
+    """The shared pool, created from DEFAULT_DSN on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool.from_dsn(DEFAULT_DSN)
+        return _pool
+
+
+def close_pool() -> None:
+    """Close the shared pool; the next get_pool() starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, None
+    if old is not None:
+        query_cache.invalidate()
+        old.close()
+
+
+def db_cursor():
+    """`with db_cursor() as cursor:` on the shared pool."""
+    return get_pool().cursor()
+
+
+def db_connection():
+    """`with db_connection() as conn:` on the shared pool (commits on success)."""
+    return get_pool().connection()
+
+
+# ===========================================================================
+# BENCHMARK
+# ===========================================================================
+
+def benchmark(connect: Callable[[], Any], query: str = 'SELECT 1', n: int = 2_000) -> Dict:
+    """Connect-per-query (the old pattern) vs the pool, same query n times."""
+    start = time.perf_counter()
+    for _ in range(n):
+        connection = connect()
+        cursor = connection.cursor()
+        cursor.execute(query)
+        cursor.fetchall()
+        connection.close()
+    per_call = (time.perf_counter() - start) / n
+
+    pool = ConnectionPool(connect, min_size=1, max_size=1)
+    start = time.perf_counter()
+    for _ in range(n):
+        with pool.cursor() as cursor:
+            cursor.execute(query)
+            cursor.fetchall()
+    pooled = (time.perf_counter() - start) / n
+    pool.close()
+
+    return {
+        'queries': n,
+        'connect_per_query_us': round(per_call * 1e6, 1),
+        'pooled_us': round(pooled * 1e6, 1),
+        'speedup': round(per_call / pooled, 1),
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python db_pool.py [dsn]    (no DSN: a temporary SQLite file)
+    if len(sys.argv) > 1:
+        import psycopg2
+        target = sys.argv[1]
+        result = benchmark(lambda: psycopg2.connect(target))
+    else:
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            result = benchmark(lambda: sqlite3.connect(path))
+    for key, value in result.items():
+        print(f"{key}: {value}")
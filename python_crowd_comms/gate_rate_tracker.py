@@ -0,0 +1,162 @@
+# Sliding-Window Gate Rates
+# =========================
+# track_recent_activity() keeps the last N raw events in a deque - fine for
+# "show the last 100 scans", useless for "entries per gate per minute over the
+# last 15 minutes" (you'd have to hold every raw event in the window).
+#
+# GateRateTracker keeps a RING BUFFER of per-bucket counters for each
+# (gate, scan_type) pair instead. With 60-second buckets and a 15-bucket
+# window, each pair is 15 counters - no matter how many scans arrive.
+#
+#   bucket id = epoch // bucket_seconds        slot = bucket id % window
+#
+#   slot:        0    1    2    3    4   ...  14
+#   bucket id: 1800 1801 1802 1788 1789  ...         <- stale slots are reset
+#   count:       42   37   51    0    0  ...            when their slot is reused
+#
+# Update: O(1) (one index, maybe one reset).  Read: O(buckets).
+
+from array import array
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple, Union
+
+from scan_decoder import to_scan_event
+from scan_timestamps import to_epoch
+
+
+class _Ring:
+    """Fixed-size ring of (bucket id, count) slots."""
+
+    __slots__ = ('ids', 'counts')
+
+    def __init__(self, size: int):
+        self.ids = array('q', [-1]) * size
+        self.counts = array('q', bytes(8 * size))
+
+
+class GateRateTracker:
+    """
+    Rolling entry/exit rates per gate over a fixed time window.
+
+    Args:
+        bucket_seconds: Width of each counter bucket (60 = per-minute)
+        window_buckets: Buckets kept (15 x 60s = last 15 minutes)
+
+    The "current time" is the newest scan timestamp seen (the stream clock),
+    unless you pass now= to a read. Scans older than the window are counted
+    in late_events and otherwise ignored.
+
+    Example:
+        >>> rates = GateRateTracker(bucket_seconds=60, window_buckets=15)
+        >>> rates.ingest_many(mock_scan_stream())
+        >>> rates.count('A', 'entry')      # gate A entries in the last 15 min
+    """
+
+    def __init__(self, bucket_seconds: int = 60, window_buckets: int = 15):
+        if bucket_seconds < 1 or window_buckets < 1:
+            raise ValueError("bucket_seconds and window_buckets must be positive")
+        self.bucket_seconds = bucket_seconds
+        self.window_buckets = window_buckets
+        self._rings: Dict[Tuple[str, str], _Ring] = {}
+        self.latest_bucket = -1
+        self.late_events = 0
+
+    # -----------------------------------------------------------------------
+    # Updates - O(1)
+    # -----------------------------------------------------------------------
+
+    def ingest(self, event) -> None:
+        scan = to_scan_event(event)
+        self.record(scan.gate, scan.scan_type, to_epoch(scan.timestamp))
+
+    def ingest_many(self, events) -> None:
+        ingest = self.ingest
+        for event in events:
+            ingest(event)
+
+    def record(self, gate: str, scan_type: str, epoch: int, count: int = 1) -> None:
+        """Add count scans at epoch seconds for (gate, scan_type)."""
+        bucket = epoch // self.bucket_seconds
+        if bucket > self.latest_bucket:
+            self.latest_bucket = bucket
+        elif bucket <= self.latest_bucket - self.window_buckets:
+            self.late_events += count
+            return
+
+        ring = self._rings.get((gate, scan_type))
+        if ring is None:
+            ring = self._rings[(gate, scan_type)] = _Ring(self.window_buckets)
+
+        slot = bucket % self.window_buckets
+        if ring.ids[slot] != bucket:
+            ring.ids[slot] = bucket
+            ring.counts[slot] = 0
+        ring.counts[slot] += count
+
+    # -----------------------------------------------------------------------
+    # Reads - O(buckets)
+    # -----------------------------------------------------------------------
+
+    def _now_bucket(self, now: Optional[Union[str, int]]) -> int:
+        if now is None:
+            return self.latest_bucket
+        epoch = to_epoch(now) if isinstance(now, str) else now
+        return epoch // self.bucket_seconds
+
+    def series(self, gate: str, scan_type: str = 'entry',
+               now: Optional[Union[str, int]] = None) -> List[int]:
+        """Per-bucket counts for the window, oldest first."""
+        ring = self._rings.get((gate, scan_type))
+        newest = self._now_bucket(now)
+        oldest = newest - self.window_buckets + 1
+        if ring is None:
+            return [0] * self.window_buckets
+
+        window = self.window_buckets
+        out = []
+        for bucket in range(oldest, newest + 1):
+            slot = bucket % window
+            out.append(ring.counts[slot] if ring.ids[slot] == bucket else 0)
+        return out
+
+    def count(self, gate: str, scan_type: str = 'entry',
+              now: Optional[Union[str, int]] = None) -> int:
+        """Total scans for (gate, scan_type) inside the window."""
+        return sum(self.series(gate, scan_type, now))
+
+    def rate_per_minute(self, gate: str, scan_type: str = 'entry',
+                        now: Optional[Union[str, int]] = None) -> float:
+        """Average scans per minute over the window."""
+        window_minutes = self.window_buckets * self.bucket_seconds / 60
+        return self.count(gate, scan_type, now) / window_minutes
+
+    def gates(self) -> List[str]:
+        return sorted({gate for gate, _ in self._rings})
+
+    def snapshot(self, now: Optional[Union[str, int]] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Rates for the ops screen.
+
+        Returns:
+            {'A': {'entry_per_min': 3.2, 'exit_per_min': 1.1}, 'B': {...}}
+        """
+        result = defaultdict(dict)
+        for gate in self.gates():
+            for scan_type in ('entry', 'exit'):
+                result[gate][f'{scan_type}_per_min'] = round(
+                    self.rate_per_minute(gate, scan_type, now), 2)
+        return dict(result)
+
+
+# ===========================================================================
+# TEST RUNNER
+# ===========================================================================
+
+if __name__ == "__main__":
+    from python_occupancy_practice import mock_scan_stream
+
+    rates = GateRateTracker(bucket_seconds=60, window_buckets=60)
+    rates.ingest_many(mock_scan_stream())
+    print("Last 60 minutes of mock scans:")
+    for gate, gate_rates in rates.snapshot().items():
+        print(f"  Gate {gate}: {gate_rates}")
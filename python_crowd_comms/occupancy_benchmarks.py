@@ -0,0 +1,308 @@
+# Occupancy Benchmarks
+# ====================
+# The tests check the occupancy functions on 13 events; nothing notices when a
+# hot path gets 2x slower or starts holding every event in memory. This module
+# times each occupancy function on generated logs from 1e3 to 1e7 events and
+# compares against stored JSON baselines.
+#
+#   generated log (cached on disk) ──> function ──> events/sec
+#                                                   tracemalloc peak
+#                                                   peak RSS growth
+#
+# Each measurement runs in a fresh worker process, so one function's memory
+# high-water mark can't leak into the next one's RSS number. Timing and
+# tracemalloc are separate runs - tracing slows Python code down by 2-3x.
+#
+# Usage:
+#   python occupancy_benchmarks.py                       # 1e3..1e5, compare
+#   python occupancy_benchmarks.py --sizes 1e3,1e7       # bigger runs
+#   python occupancy_benchmarks.py --update              # rewrite baselines
+#
+# pytest runs the same comparison when OCCUPANCY_BENCH_SIZES is set (see
+# tests/test_occupancy_benchmarks.py).
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from occupancy_tracker import OccupancyTracker
+from python_occupancy_practice import (
+    count_current_occupancy,
+    get_occupancy_at_time,
+)
+from scan_generator import generate_scan_stream, ticket_type_lookup
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'tests', 'benchmark_baselines.json')
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_THRESHOLD = 0.30
+# Runs shorter than this are mostly timer and scheduler noise
+MIN_GATED_SECONDS = 0.05
+SEED = 1234
+
+# After the generated event ends, so get_occupancy_at_time reads the whole log
+AFTER_EVENT = '2025-09-30T23:59:59'
+
+
+# ===========================================================================
+# TARGETS
+# ===========================================================================
+# Each target takes an iterable of scans in the format named by its 'input'.
+# Where the practice function is still a TODO (Q4, Q5), or only knows the
+# 8 mock tickets (Q3's ticket-type lookup), the OccupancyTracker version is
+# timed instead - it's the implementation everything else runs on.
+
+def _details(stream, ticket_types):
+    tracker = OccupancyTracker(ticket_types=ticket_types)
+    tracker.ingest_many(stream)
+    return tracker.details()
+
+
+def _anomalies(stream, ticket_types):
+    tracker = OccupancyTracker(ticket_types=ticket_types)
+    tracker.ingest_many(stream)
+    return tracker.anomalies()
+
+
+def _capacity(stream, ticket_types):
+    tracker = OccupancyTracker(ticket_types=ticket_types, max_capacity=5_000)
+    tracker.ingest_many(stream)
+    return tracker.capacity()
+
+
+def _load_archive_function(name: str) -> Optional[Callable]:
+    """
+    archive/occupancy_advanced.py sits outside this package and imports
+    db_pool (and psycopg2 only when its *_db functions run) - optional.
+    """
+    archive = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'archive')
+    if archive not in sys.path:
+        sys.path.append(archive)
+    try:
+        import occupancy_advanced
+    except ImportError:
+        return None
+    return getattr(occupancy_advanced, name, None)
+
+
+def _optimized_for_large_stream(stream, ticket_types):
+    func = _load_archive_function('count_occupancy_optimized_for_large_stream')
+    return func(stream)
+
+
+TARGETS: Dict[str, Dict] = {
+    'count_current_occupancy': {
+        'input': 'json', 'run': lambda stream, _: count_current_occupancy(stream)},
+    'get_occupancy_at_time': {
+        'input': 'json', 'run': lambda stream, _: get_occupancy_at_time(stream, AFTER_EVENT)},
+    'track_occupancy_with_details': {'input': 'json', 'run': _details},
+    'detect_scan_anomalies': {'input': 'json', 'run': _anomalies},
+    'manage_capacity_realtime': {'input': 'json', 'run': _capacity},
+    'count_occupancy_optimized_for_large_stream': {
+        'input': 'dict', 'run': _optimized_for_large_stream,
+        'available': lambda: _load_archive_function(
+            'count_occupancy_optimized_for_large_stream') is not None},
+}
+
+
+def available_targets() -> List[str]:
+    return [name for name, target in TARGETS.items()
+            if target.get('available', lambda: True)()]
+
+
+# ===========================================================================
+# DATA
+# ===========================================================================
+
+def _data_dir() -> str:
+    path = os.environ.get('OCCUPANCY_BENCH_DATA',
+                          os.path.join(tempfile.gettempdir(), 'occupancy_bench'))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def prepare_log(n_events: int, seed: int = SEED) -> str:
+    """
+    Path to a JSON-lines log of exactly n_events generated scans, written
+    once and reused - generating 1e7 events costs more than replaying them.
+    """
+    path = os.path.join(_data_dir(), f'scans_{seed}_{n_events}.jsonl')
+    if not os.path.exists(path):
+        tmp = path + '.tmp'
+        stream = generate_scan_stream(n_tickets=n_events, seed=seed, duplicate_entry_rate=0.02,
+                                      rapid_reentry_rate=0.05)
+        with open(tmp, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            for line in itertools.islice(stream, n_events):
+                f.write(line)
+                f.write('\n')
+        os.replace(tmp, path)
+    return path
+
+
+def _read_stream(path: str, fmt: str):
+    with open(path, encoding='utf-8') as f:
+        if fmt == 'dict':
+            yield from (json.loads(line) for line in f)
+        else:
+            yield from (line.rstrip('\n') for line in f)
+
+
+# ===========================================================================
+# MEASUREMENT
+# ===========================================================================
+
+def _max_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024   # Linux reports KiB
+
+
+def _measure_in_worker(name: str, path: str, n_events: int, trace: bool) -> Dict:
+    target = TARGETS[name]
+    ticket_types = ticket_type_lookup(n_events, seed=SEED)
+    stream = _read_stream(path, target['input'])
+
+    rss_before = _max_rss_bytes()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    target['run'](stream, ticket_types)
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {'elapsed': elapsed, 'tracemalloc_peak': peak,
+            'rss_growth': max(0, _max_rss_bytes() - rss_before)}
+
+
+def _in_fresh_process(*args) -> Dict:
+    # spawn, not fork: a forked child inherits the parent's RSS high-water mark
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(_measure_in_worker, args)
+
+
+def measure(name: str, n_events: int, memory: bool = True) -> Dict:
+    """
+    Time one target on n_events scans.
+
+    Returns:
+        {'events': 10000, 'seconds': 0.021, 'events_per_sec': 476190,
+         'tracemalloc_peak_mb': 1.2, 'peak_rss_growth_mb': 3.4}
+    """
+    path = prepare_log(n_events)
+    timed = _in_fresh_process(name, path, n_events, False)
+    result = {
+        'events': n_events,
+        'seconds': round(timed['elapsed'], 4),
+        'events_per_sec': round(n_events / timed['elapsed']) if timed['elapsed'] else 0,
+        'peak_rss_growth_mb': round(timed['rss_growth'] / 1e6, 2),
+    }
+    if memory:
+        traced = _in_fresh_process(name, path, n_events, True)
+        result['tracemalloc_peak_mb'] = round(traced['tracemalloc_peak'] / 1e6, 3)
+    return result
+
+
+def run_suite(sizes=DEFAULT_SIZES, targets: Optional[List[str]] = None,
+              memory: bool = True) -> Dict[str, Dict[str, Dict]]:
+    """{target: {str(size): measure(...)}} for every available target."""
+    results = {}
+    for name in targets or available_targets():
+        results[name] = {str(n): measure(name, n, memory) for n in sizes}
+    return results
+
+
+# ===========================================================================
+# BASELINES
+# ===========================================================================
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(results: Dict, path: str = BASELINE_PATH) -> None:
+    """Merge results into the baseline file (other sizes/targets are kept)."""
+    baseline = load_baseline(path)
+    for name, by_size in results.items():
+        baseline.setdefault(name, {}).update(by_size)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    Regressions of results against baseline, as readable strings.
+
+    Throughput regresses when it drops below (1 - threshold) x baseline;
+    tracemalloc peak regresses when it grows past (1 + threshold) x baseline.
+    Targets or sizes missing from the baseline are not compared, and
+    throughput isn't gated for runs under MIN_GATED_SECONDS.
+    """
+    regressions = []
+    for name, by_size in results.items():
+        for size, result in by_size.items():
+            base = baseline.get(name, {}).get(size)
+            if base is None:
+                continue
+
+            floor = base['events_per_sec'] * (1 - threshold)
+            long_enough = result.get('seconds', MIN_GATED_SECONDS) >= MIN_GATED_SECONDS
+            if long_enough and result['events_per_sec'] < floor:
+                regressions.append(
+                    f"{name} @ {size} events: {result['events_per_sec']:,} events/sec "
+                    f"< {floor:,.0f} (baseline {base['events_per_sec']:,})")
+
+            if 'tracemalloc_peak_mb' in result and 'tracemalloc_peak_mb' in base:
+                # Tiny peaks are noise - don't fail on 0.01MB -> 0.02MB
+                ceiling = max(base['tracemalloc_peak_mb'] * (1 + threshold),
+                              base['tracemalloc_peak_mb'] + 0.5)
+                if result['tracemalloc_peak_mb'] > ceiling:
+                    regressions.append(
+                        f"{name} @ {size} events: peak {result['tracemalloc_peak_mb']}MB "
+                        f"> {ceiling:.2f}MB (baseline {base['tracemalloc_peak_mb']}MB)")
+    return regressions
+
+
+def parse_sizes(text: str) -> List[int]:
+    """'1e3,1e4,100000' -> [1000, 10000, 100000]"""
+    return [int(float(part)) for part in text.split(',') if part.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)))
+    parser.add_argument('--targets', default='', help='comma-separated (default: all)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--update', action='store_true', help='write results as the new baseline')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    args = parser.parse_args()
+
+    targets = [t for t in args.targets.split(',') if t] or None
+    results = run_suite(parse_sizes(args.sizes), targets, memory=not args.no_memory)
+    for name, by_size in results.items():
+        for size, result in by_size.items():
+            print(f"{name:45s} {int(size):>10,}  {result['events_per_sec']:>10,} ev/s  "
+                  f"peak {result.get('tracemalloc_peak_mb', '-')}MB  "
+                  f"rss +{result['peak_rss_growth_mb']}MB")
+
+    if args.update:
+        save_baseline(results)
+        print(f"Baseline written to {BASELINE_PATH}")
+    else:
+        regressions = compare(results, load_baseline(), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+        sys.exit(1 if regressions else 0)
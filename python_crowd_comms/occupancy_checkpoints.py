@@ -0,0 +1,322 @@
+# Occupancy Checkpoints for Point-in-Time Queries
+# ===============================================
+# get_occupancy_at_time_sql(t) takes every scan with scan_time <= t and runs
+# DISTINCT ON over them - a question about the last hour of an event sorts
+# nearly the whole scans table.
+#
+# The database version of OccupancyTimeIndex: every interval (default hourly)
+# store who was inside, once, and answer from the nearest one:
+#
+#   occupancy_checkpoints   (checkpoint_time, occupancy)      ('2025-09-30T11:00', 6)
+#   checkpoint_inside       (checkpoint_time, ticket_id)      one row per ticket INSIDE
+#
+#   10:00      11:00            11:42
+#     |          |================|
+#     cp         cp  scans in     target
+#                    (11:00, 11:42]
+#
+#   occupancy(11:42) = cp.occupancy
+#                    - tickets with a scan in the window that were inside at cp
+#                    + tickets whose LAST scan in the window is an entry
+#
+# Only the window's scans are sorted (idx_scans_ticket_time covers the range
+# filter), and the checkpoint rows are primary-key lookups.
+#
+# Keeping it right:
+# - refresh_checkpoints() appends checkpoints up to the latest scan, each one
+#   built from the previous checkpoint plus one interval of scans.
+# - A trigger on scans deletes every checkpoint at or after a late scan's time
+#   (an in-order scan skips the deletes after one MAX(checkpoint_time)
+#   lookup); the next refresh rebuilds them, and queries in between simply
+#   start from an earlier checkpoint.
+# - The trigger can't catch a load that's still in flight: a transaction
+#   holding uncommitted scans <= T fires it BEFORE checkpoint T exists, and T
+#   is then built without them. So each checkpoint's transaction first takes
+#   LOCK TABLE scans IN SHARE MODE on Postgres - it waits for in-flight loads
+#   to commit (and holds new ones off for the few ms the checkpoint takes).
+#   SQLite needs nothing: writers are serialised, and the checkpoint INSERT
+#   takes the write lock before it reads scans. (A time lag instead of the
+#   lock would only guess how long loads stay open.)
+# - Deleting scans needs rebuild_checkpoints().
+#
+# get_occupancy_at_time_checkpointed() is @cached_query: checkpoints never
+# change its answer, only new scans do, and loading them invalidates the cache.
+
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Optional, Union
+
+from db_pool import ConnectionPool, get_pool
+from query_cache import cached_query
+from scan_timestamps import from_epoch, to_epoch
+
+
+DEFAULT_CHECKPOINT_SECONDS = 60 * 60
+
+# Lower bound for the first checkpoint's window: before any scan
+_BEGINNING = '0001-01-01T00:00:00'
+
+CHECKPOINT_TABLES = """
+    CREATE TABLE occupancy_checkpoints (
+        checkpoint_time TIMESTAMP PRIMARY KEY,
+        occupancy INTEGER NOT NULL
+    );
+    CREATE TABLE checkpoint_inside (
+        checkpoint_time TIMESTAMP NOT NULL,
+        ticket_id VARCHAR(10) NOT NULL,
+        PRIMARY KEY (checkpoint_time, ticket_id)
+    );
+"""
+
+INVALIDATE_TRIGGER = {
+    'postgres': [
+        """
+        CREATE OR REPLACE FUNCTION invalidate_occupancy_checkpoints() RETURNS trigger AS $$
+        BEGIN
+            -- Same guard as SQLite's WHEN (a trigger WHEN can't hold a
+            -- subquery here): an in-order scan costs one index lookup
+            IF NEW.scan_time <= (SELECT MAX(checkpoint_time) FROM occupancy_checkpoints) THEN
+                DELETE FROM checkpoint_inside WHERE checkpoint_time >= NEW.scan_time;
+                DELETE FROM occupancy_checkpoints WHERE checkpoint_time >= NEW.scan_time;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER scans_checkpoint_invalidate AFTER INSERT ON scans
+            FOR EACH ROW EXECUTE FUNCTION invalidate_occupancy_checkpoints()
+        """,
+    ],
+    'sqlite': [
+        """
+        CREATE TRIGGER scans_checkpoint_invalidate AFTER INSERT ON scans
+        WHEN NEW.scan_time <= (SELECT MAX(checkpoint_time) FROM occupancy_checkpoints)
+        BEGIN
+            DELETE FROM checkpoint_inside WHERE checkpoint_time >= NEW.scan_time;
+            DELETE FROM occupancy_checkpoints WHERE checkpoint_time >= NEW.scan_time;
+        END
+        """,
+    ],
+}
+
+# Last scan per ticket in (lower, upper] - params: lower, upper
+_WINDOW_LAST_SCANS = {
+    'postgres': """
+        SELECT DISTINCT ON (ticket_id) ticket_id, scan_type
+        FROM scans
+        WHERE scan_time > {mark} AND scan_time <= {mark}
+        ORDER BY ticket_id, scan_time DESC
+    """,
+    'sqlite': """
+        SELECT ticket_id, scan_type FROM (
+            SELECT ticket_id, scan_type,
+                   ROW_NUMBER() OVER (PARTITION BY ticket_id ORDER BY scan_time DESC) AS rn
+            FROM scans
+            WHERE scan_time > {mark} AND scan_time <= {mark}
+        ) WHERE rn = 1
+    """,
+}
+
+# Inside set at the next checkpoint - params: prev, next, next, prev, next
+_ADVANCE = """
+    INSERT INTO checkpoint_inside (checkpoint_time, ticket_id)
+    WITH changed AS ({window})
+    SELECT {ts}, ci.ticket_id
+    FROM checkpoint_inside ci
+    WHERE ci.checkpoint_time = {mark}
+      AND NOT EXISTS (SELECT 1 FROM changed c WHERE c.ticket_id = ci.ticket_id)
+    UNION ALL
+    SELECT {ts}, ticket_id FROM changed WHERE scan_type = 'entry'
+"""
+
+# Change since a checkpoint - params: checkpoint, target, checkpoint
+_DELTA = """
+    WITH changed AS ({window})
+    SELECT COALESCE(SUM(CASE WHEN c.scan_type = 'entry' THEN 1 ELSE 0 END), 0)
+           - COUNT(ci.ticket_id)
+    FROM changed c
+    LEFT JOIN checkpoint_inside ci
+           ON ci.checkpoint_time = {mark} AND ci.ticket_id = c.ticket_id
+"""
+
+
+def _timestamp_param(pool: ConnectionPool) -> str:
+    # A parameter used as a value: Postgres needs the type (a UNION of bare
+    # parameters comes out as text); SQLite stores the ISO text as-is
+    return f"CAST({pool.placeholder} AS TIMESTAMP)" if pool.dialect == 'postgres' else pool.placeholder
+
+
+def _sql(template: str, pool: ConnectionPool) -> str:
+    window = _WINDOW_LAST_SCANS[pool.dialect].format(mark=pool.placeholder)
+    return template.format(window=window, mark=pool.placeholder, ts=_timestamp_param(pool))
+
+
+def _to_epoch(value: Union[str, datetime]) -> int:
+    """Epoch seconds from a timestamp string or a datetime read back from Postgres."""
+    return to_epoch(value.isoformat() if isinstance(value, datetime) else value)
+
+
+def _latest(cursor, query: str) -> Optional[int]:
+    cursor.execute(query)
+    row = cursor.fetchone()
+    return _to_epoch(row[0]) if row and row[0] is not None else None
+
+
+def install_checkpoints(pool: Optional[ConnectionPool] = None) -> None:
+    """
+    (Re)create the checkpoint tables and the invalidation trigger on scans.
+    setup_database() calls this; checkpoints appear on refresh_checkpoints().
+    """
+    pool = pool or get_pool()
+    with pool.cursor() as cursor:
+        cursor.execute("DROP TRIGGER IF EXISTS scans_checkpoint_invalidate"
+                       + (" ON scans" if pool.dialect == 'postgres' else ""))
+        cursor.execute("DROP TABLE IF EXISTS checkpoint_inside")
+        cursor.execute("DROP TABLE IF EXISTS occupancy_checkpoints")
+        for statement in CHECKPOINT_TABLES.split(';'):
+            if statement.strip():
+                cursor.execute(statement)
+        for statement in INVALIDATE_TRIGGER[pool.dialect]:
+            cursor.execute(statement)
+
+
+def refresh_checkpoints(interval_seconds: int = DEFAULT_CHECKPOINT_SECONDS,
+                        pool: Optional[ConnectionPool] = None) -> int:
+    """
+    Append checkpoints every interval_seconds up to the latest scan, carrying
+    on from the last existing checkpoint. Cheap to call often (e.g. from a
+    scheduler): each new checkpoint reads one interval of scans.
+
+    Each checkpoint waits for in-flight scan loads to commit first, so it
+    never misses scans an open transaction is still inserting.
+
+    Returns:
+        int: Number of checkpoints added
+    """
+    if interval_seconds < 1:
+        raise ValueError("interval_seconds must be positive")
+    pool = pool or get_pool()
+    advance = _sql(_ADVANCE, pool)
+    mark = pool.placeholder
+
+    with pool.cursor() as cursor:
+        last = _latest(cursor, "SELECT MAX(checkpoint_time) FROM occupancy_checkpoints")
+        latest_scan = _latest(cursor, "SELECT MAX(scan_time) FROM scans")
+        first_scan = _latest(cursor, "SELECT MIN(scan_time) FROM scans")
+    if latest_scan is None:
+        return 0
+
+    if last is None:
+        previous = _BEGINNING
+        # First grid point at or after the first scan
+        checkpoint = -(-first_scan // interval_seconds) * interval_seconds
+    else:
+        previous = from_epoch(last)
+        checkpoint = last + interval_seconds
+
+    added = 0
+    while checkpoint <= latest_scan:
+        at = from_epoch(checkpoint)
+        # One transaction per checkpoint: a long backfill commits as it goes
+        with pool.cursor() as cursor:
+            if pool.dialect == 'postgres':
+                # Wait out uncommitted scan loads - see the header
+                cursor.execute("LOCK TABLE scans IN SHARE MODE")
+            cursor.execute(advance, (previous, at, at, previous, at))
+            cursor.execute(f"INSERT INTO occupancy_checkpoints (checkpoint_time, occupancy) "
+                           f"SELECT {_timestamp_param(pool)}, COUNT(*) FROM checkpoint_inside "
+                           f"WHERE checkpoint_time = {mark}", (at, at))
+        previous = at
+        checkpoint += interval_seconds
+        added += 1
+    return added
+
+
+def rebuild_checkpoints(interval_seconds: int = DEFAULT_CHECKPOINT_SECONDS,
+                        pool: Optional[ConnectionPool] = None) -> int:
+    """Drop every checkpoint and build them again (after deleting scans)."""
+    pool = pool or get_pool()
+    with pool.cursor() as cursor:
+        cursor.execute("DELETE FROM checkpoint_inside")
+        cursor.execute("DELETE FROM occupancy_checkpoints")
+    return refresh_checkpoints(interval_seconds, pool)
+
+
+@cached_query
+def get_occupancy_at_time_checkpointed(target_time: str,
+                                       pool: Optional[ConnectionPool] = None) -> int:
+    """
+    Same answer as get_occupancy_at_time_sql(), reading only the scans since
+    the nearest checkpoint at or before target_time.
+
+    Args:
+        target_time: Timestamp string (e.g., '2025-09-30 11:30:00')
+
+    Returns:
+        int: Number of tickets inside at that moment
+
+    Expected: At '2025-09-30 11:30:00' -> 6 tickets inside
+    """
+    pool = pool or get_pool()
+    mark = pool.placeholder
+    # Canonical 'YYYY-MM-DDTHH:MM:SS' - SQLite compares timestamps as text
+    target = from_epoch(to_epoch(target_time))
+
+    with pool.cursor() as cursor:
+        cursor.execute(f"SELECT checkpoint_time, occupancy FROM occupancy_checkpoints "
+                       f"WHERE checkpoint_time <= {mark} "
+                       f"ORDER BY checkpoint_time DESC LIMIT 1", (target,))
+        row = cursor.fetchone()
+        # Before the first checkpoint: start from an empty venue
+        checkpoint, occupancy = (from_epoch(_to_epoch(row[0])), row[1]) if row else (_BEGINNING, 0)
+        cursor.execute(_sql(_DELTA, pool), (checkpoint, target, checkpoint))
+        return occupancy + cursor.fetchone()[0]
+
+
+# ===========================================================================
+# BENCHMARK
+# ===========================================================================
+
+def benchmark(n_scans: int = 1_000_000, queries: int = 20) -> Dict:
+    """
+    Load ~n_scans generated scans into the SHARED pool's database (runs
+    setup_database() - it wipes the tables), build checkpoints and time
+    point-in-time queries spread over the event.
+
+    Every answer is checked against get_occupancy_at_time_sql() and both are
+    timed.
+    """
+    from database_occupancy_learning import get_occupancy_at_time_sql, setup_database
+    from scan_loader import load_generated_event
+
+    pool = get_pool()
+    setup_database()
+    loaded = load_generated_event(max(1, int(n_scans / 1.8)), pool)
+    start = time.perf_counter()
+    built = refresh_checkpoints(pool=pool)
+    row = {'scans': loaded['scans'], 'checkpoints': built,
+           'build_s': round(time.perf_counter() - start, 2)}
+
+    with pool.cursor() as cursor:
+        first = _latest(cursor, "SELECT MIN(scan_time) FROM scans")
+        last = _latest(cursor, "SELECT MAX(scan_time) FROM scans")
+    targets = [from_epoch(first + (last - first) * (i + 1) // queries) for i in range(queries)]
+
+    start = time.perf_counter()
+    fast = [get_occupancy_at_time_checkpointed(t) for t in targets]
+    row['checkpointed_ms'] = round((time.perf_counter() - start) * 1000 / queries, 2)
+    start = time.perf_counter()
+    reference = [get_occupancy_at_time_sql(t) for t in targets]
+    row['full_scan_ms'] = round((time.perf_counter() - start) * 1000 / queries, 2)
+    assert fast == reference, (fast, reference)
+    row['speedup'] = round(row['full_scan_ms'] / row['checkpointed_ms'], 1)
+    return row
+
+
+if __name__ == "__main__":
+    # Usage: python occupancy_checkpoints.py [n_scans]   (uses OCCUPANCY_DSN)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    for key, value in benchmark(n).items():
+        print(f"{key}: {value}")
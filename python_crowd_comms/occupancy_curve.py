@@ -0,0 +1,251 @@
+# Minute-by-Minute Occupancy Curve (NumPy)
+# ========================================
+# The live dashboard query in database_occupancy_learning.py buckets scans with
+# DATE_TRUNC('minute') and a running SUM() OVER window. This is the same curve
+# for scan logs that never went near Postgres - a binary log (binary_scan_log.py)
+# or any stream of scans - built with two C-level passes instead of a loop:
+#
+#   minute index   = (epoch - first_minute) // 60
+#   entries[m]     = bincount(minute[valid entries])
+#   exits[m]       = bincount(minute[valid exits])
+#   occupancy      = cumsum(entries - exits)
+#
+# Which scans are VALID (same rules as track_occupancy_with_details)?
+# With set add/discard, a ticket is inside after a scan iff that scan was an
+# entry. So each scan only needs to know the ticket's PREVIOUS scan:
+#
+#   ticket T003:  entry   entry   exit    exit
+#   previous:     -       entry   entry   exit
+#   valid?        entry   dup     exit    no (not inside)
+#
+# Sort by (ticket, time) once, compare every row with the row above it, and
+# the whole log is classified in one vectorised step.
+#
+# The per-gate occupancy split is by ENTRY gate, like OccupancyTracker.by_gate,
+# so a valid exit is charged to the ticket's last VALID entry - not the row
+# above, which may be a duplicate entry at another gate:
+#
+#   ticket T003:  entry@A   entry@B (dup)   exit@C   -> charged to A
+#
+# maximum.accumulate over the row numbers of valid entries carries that row
+# forward in one pass.
+
+import sys
+import time
+from typing import Dict, List
+
+from scan_decoder import to_scan_event
+from scan_timestamps import from_epoch, to_epoch
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("NumPy is required for the occupancy curve")
+
+
+def occupancy_curve(tickets, gates, scan_types, epochs, gate_names: List[str],
+                    bucket_seconds: int = 60) -> Dict:
+    """
+    Build the per-minute curve from column arrays.
+
+    Args:
+        tickets: int ticket index per scan
+        gates: int gate index per scan (into gate_names)
+        scan_types: 0 = entry, 1 = exit
+        epochs: int epoch seconds per scan
+        gate_names: gate name for each gate index
+        bucket_seconds: Bucket width (60 = DATE_TRUNC('minute'))
+
+    Returns:
+        {
+            'start': first bucket's epoch,
+            'bucket_seconds': 60,
+            'entries':   [per bucket],       # valid entries (duplicates dropped)
+            'exits':     [per bucket],       # valid exits (exit-without-entry dropped)
+            'occupancy': [per bucket],       # running total at END of the bucket
+            'by_gate': {'A': {'entries': [...], 'exits': [...], 'occupancy': [...]}}
+        }
+        Arrays are NumPy int64. Per-gate entries/exits are where the scan
+        happened; per-gate occupancy is by ENTRY gate, so it sums to the total.
+    """
+    _require_numpy()
+    tickets = np.asarray(tickets)
+    gates = np.asarray(gates, dtype=np.int64)
+    is_entry = np.asarray(scan_types) == 0
+    epochs = np.asarray(epochs, dtype=np.int64)
+    n_gates = len(gate_names)
+
+    if len(epochs) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return {'start': None, 'bucket_seconds': bucket_seconds,
+                'entries': empty, 'exits': empty, 'occupancy': empty,
+                'by_gate': {name: {'entries': empty, 'exits': empty, 'occupancy': empty}
+                            for name in gate_names}}
+
+    start = int(epochs.min()) // bucket_seconds * bucket_seconds
+    bucket = (epochs - start) // bucket_seconds
+    n_buckets = int(bucket.max()) + 1
+
+    # (ticket, time) order; lexsort is stable so same-second scans keep log order
+    order = np.lexsort((epochs, tickets))
+    sorted_tickets = tickets[order]
+    sorted_entry = is_entry[order]
+    same_ticket = np.zeros(len(order), dtype=bool)
+    same_ticket[1:] = sorted_tickets[1:] == sorted_tickets[:-1]
+    prev_entry = np.zeros(len(order), dtype=bool)
+    prev_entry[1:] = sorted_entry[:-1]
+    inside_before = same_ticket & prev_entry
+
+    valid_entry = sorted_entry & ~inside_before
+    valid_exit = ~sorted_entry & inside_before
+
+    sorted_bucket = bucket[order]
+    sorted_gate = gates[order]
+    # Row of the latest valid entry at or above each row. For a valid exit it
+    # can't come from another ticket: the ticket is inside, so its own run has
+    # a valid entry since its last valid exit.
+    rows = np.arange(len(order))
+    last_entry_row = np.maximum.accumulate(np.where(valid_entry, rows, 0))
+    entry_gate = sorted_gate[last_entry_row]
+
+    entries = np.bincount(sorted_bucket[valid_entry], minlength=n_buckets)
+    exits = np.bincount(sorted_bucket[valid_exit], minlength=n_buckets)
+
+    def per_gate(bucket_idx, gate_idx):
+        flat = np.bincount(bucket_idx * n_gates + gate_idx, minlength=n_buckets * n_gates)
+        return flat.reshape(n_buckets, n_gates)
+
+    gate_entries = per_gate(sorted_bucket[valid_entry], sorted_gate[valid_entry])
+    gate_exits = per_gate(sorted_bucket[valid_exit], sorted_gate[valid_exit])
+    gate_left = per_gate(sorted_bucket[valid_exit], entry_gate[valid_exit])
+    gate_occupancy = np.cumsum(gate_entries - gate_left, axis=0)
+
+    return {
+        'start': start,
+        'bucket_seconds': bucket_seconds,
+        'entries': entries,
+        'exits': exits,
+        'occupancy': np.cumsum(entries - exits),
+        'by_gate': {
+            name: {'entries': gate_entries[:, i], 'exits': gate_exits[:, i],
+                   'occupancy': gate_occupancy[:, i]}
+            for i, name in enumerate(gate_names)
+        },
+    }
+
+
+def curve_from_log(log, bucket_seconds: int = 60) -> Dict:
+    """Curve straight off a BinaryScanLog's mmap views - no decoding."""
+    return occupancy_curve(log.ticket, log.gate, log.scan_type, log.epoch,
+                           log.gates, bucket_seconds)
+
+
+def curve_from_stream(stream, bucket_seconds: int = 60) -> Dict:
+    """Curve from any scan stream (JSON strings, dicts or ScanEvents)."""
+    _require_numpy()
+    ticket_index: Dict[str, int] = {}
+    gate_index: Dict[str, int] = {}
+    tickets, gates, scan_types, epochs = [], [], [], []
+    for event in stream:
+        scan = to_scan_event(event)
+        tickets.append(ticket_index.setdefault(scan.ticket_id, len(ticket_index)))
+        gates.append(gate_index.setdefault(scan.gate, len(gate_index)))
+        scan_types.append(0 if scan.scan_type == 'entry' else 1)
+        epochs.append(to_epoch(scan.timestamp))
+    gate_names = sorted(gate_index, key=gate_index.get)
+    return occupancy_curve(np.array(tickets, dtype=np.int64), np.array(gates, dtype=np.int64),
+                           np.array(scan_types, dtype=np.int8), np.array(epochs, dtype=np.int64),
+                           gate_names, bucket_seconds)
+
+
+def curve_rows(curve: Dict) -> List[Dict]:
+    """Rows in the dashboard query's shape: minute, entries, exits, running_occupancy."""
+    start, step = curve['start'], curve['bucket_seconds']
+    return [
+        {'minute': from_epoch(start + i * step), 'entries': int(entries),
+         'exits': int(exits), 'running_occupancy': int(occupancy)}
+        for i, (entries, exits, occupancy)
+        in enumerate(zip(curve['entries'], curve['exits'], curve['occupancy']))
+    ]
+
+
+# ===========================================================================
+# TERMINAL CHART
+# ===========================================================================
+
+def render_chart(curve: Dict, width: int = 72, height: int = 16) -> str:
+    """
+    Plain-text chart of running occupancy (peak per column), e.g.
+
+        4213 ┤      ██
+             │    ███████
+             │  ████████████
+           0 ┤▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔▔
+               10:00        21:59
+    """
+    _require_numpy()
+    occupancy = curve['occupancy']
+    if len(occupancy) == 0:
+        return '(no scans)'
+    # Peak per column keeps short spikes visible however long the day is
+    columns = np.array_split(occupancy, min(width, len(occupancy)))
+    peaks = np.array([column.max() for column in columns])
+    top = max(int(peaks.max()), 1)
+    heights = peaks * height // top
+
+    label = len(str(top))
+    lines = []
+    for row in range(height, 0, -1):
+        axis = f'{top:>{label}} ┤' if row == height else f'{"":>{label}} │'
+        lines.append(axis + ''.join('█' if h >= row else ' ' for h in heights))
+    lines.append(f'{0:>{label}} ┤' + '▔' * len(heights))
+
+    first = from_epoch(curve['start'])[11:16]
+    last = from_epoch(curve['start'] + (len(occupancy) - 1) * curve['bucket_seconds'])[11:16]
+    lines.append(' ' * (label + 2) + first + last.rjust(len(heights) - len(first)))
+    return '\n'.join(lines)
+
+
+# ===========================================================================
+# BENCHMARK
+# ===========================================================================
+
+def benchmark(n_tickets: int = 1_000_000) -> Dict:
+    """Time a full day's curve + chart from a binary log."""
+    import os
+    import tempfile
+    from binary_scan_log import BinaryScanLog
+    from scan_generator import write_scan_log
+
+    with tempfile.TemporaryDirectory(prefix='occupancy_curve_') as tmp:
+        path = os.path.join(tmp, 'scans.bin')
+        events = write_scan_log(path, output='binary', n_tickets=n_tickets, duration_hours=24)
+        with BinaryScanLog(path) as log:
+            start = time.perf_counter()
+            curve = curve_from_log(log)
+            curve_s = time.perf_counter() - start
+            chart = render_chart(curve)
+            total_s = time.perf_counter() - start
+            assert int(curve['occupancy'][-1]) == log.count_current_occupancy()
+
+    return {
+        'events': events,
+        'minutes': len(curve['occupancy']),
+        'curve_s': round(curve_s, 3),
+        'curve_and_chart_s': round(total_s, 3),
+        'chart': chart,
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python occupancy_curve.py [n_tickets]
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    result = benchmark(n)
+    print(result.pop('chart'))
+    for key, value in result.items():
+        print(f"{key}: {value}")
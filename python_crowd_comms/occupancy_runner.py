@@ -0,0 +1,273 @@
+# Single-Pass Multi-Query Runner
+# ==============================
+# Every analytics function in python_occupancy_practice.py takes a ONE-SHOT
+# generator like mock_scan_stream(). Running five reports means regenerating
+# (or re-reading) the source five times and decoding every event five times.
+#
+# QueryRunner flips that around: register the reports you want, then run the
+# stream through ONCE. Each event is decoded once and pushed to every
+# registered consumer; all results come back together at the end.
+#
+#   runner = QueryRunner()
+#   runner.register(count_current_occupancy)
+#   runner.register(manage_capacity_realtime, max_capacity=6)
+#   results = runner.run(mock_scan_stream())
+#   results['count_current_occupancy']   -> 4
+#
+# Each report returns exactly what its function returns, quirks included
+# (track_occupancy_with_details' by_gate never goes down). Functions still
+# marked TODO follow the Returns: in their docstrings.
+
+from collections import defaultdict, deque
+from typing import Callable, Dict, List, Optional
+
+from occupancy_tracker import OccupancyTracker
+from python_occupancy_practice import (
+    count_current_occupancy,
+    track_occupancy_with_details,
+    detect_scan_anomalies,
+    manage_capacity_realtime,
+    analyze_scan_patterns,
+    track_recent_activity,
+)
+from scan_decoder import to_scan_event
+from scan_reorder import ReorderBuffer, reorder
+from ticket_registry import mock_registry
+
+
+# ===========================================================================
+# CONSUMERS - push-based versions of each report
+# ===========================================================================
+# A consumer is anything with feed(scan) and result(). feed() gets a ScanEvent.
+
+class _SharedTracker:
+    """
+    One OccupancyTracker shared by every report it can answer, so asking for
+    occupancy, details, anomalies and scan patterns costs one update per event.
+    """
+
+    def __init__(self):
+        self.tracker = OccupancyTracker()
+        self.feed = self.tracker.ingest
+
+    def result(self):
+        return self.tracker
+
+
+class _TrackerView:
+    """A report that reads its answer off the shared tracker at the end."""
+
+    def __init__(self, shared: _SharedTracker, read: Callable):
+        self.shared = shared
+        self.read = read
+
+    def result(self):
+        return self.read(self.shared.tracker)
+
+
+class _DetailsConsumer:
+    """
+    track_occupancy_with_details() rule for rule - it is NOT OccupancyTracker:
+    by_gate counts valid entries per gate and never goes down, and every exit
+    counts towards total_exits and takes one off its ticket type, inside or not.
+    """
+
+    def __init__(self):
+        self.ticket_types = mock_registry()
+        self.inside = set()
+        self.gate_count = defaultdict(int)
+        self.total_ticket_type = defaultdict(int)
+        self.total_entries = 0
+        self.total_exits = 0
+
+    def feed(self, scan) -> None:
+        ticket_id = scan.ticket_id
+        if scan.scan_type == 'entry':
+            if ticket_id not in self.inside:
+                self.gate_count[scan.gate] += 1
+                self.inside.add(ticket_id)
+                self.total_entries += 1
+                self.total_ticket_type[self.ticket_types[ticket_id]] += 1
+        else:
+            self.inside.discard(ticket_id)
+            self.total_exits += 1
+            self.total_ticket_type[self.ticket_types[ticket_id]] -= 1
+
+    def result(self) -> Dict:
+        return {
+            'total_occupancy': len(self.inside),
+            'by_gate': dict(self.gate_count),
+            'by_ticket_type': dict(self.total_ticket_type),
+            'total_entries': self.total_entries,
+            'total_exits': self.total_exits,
+        }
+
+
+class _CapacityConsumer:
+    """Capacity state depends on max_capacity, so each gets its own tracker."""
+
+    def __init__(self, max_capacity: int = 6):
+        self.tracker = OccupancyTracker(max_capacity=max_capacity)
+        self.feed = self.tracker.ingest
+
+    def result(self):
+        return self.tracker.capacity()
+
+
+class _RecentActivityConsumer:
+    """
+    Sliding window of the last N scans (deque with maxlen). Scans are kept as
+    dicts, the shape json.loads() gives the practice function.
+    """
+
+    def __init__(self, window_size: int = 100):
+        self.recent_scans = deque(maxlen=window_size)
+        self.inside = set()
+        self.recent_entry_count = 0
+
+    def feed(self, scan) -> None:
+        recent = self.recent_scans
+        if len(recent) == recent.maxlen and recent[0]['scan_type'] == 'entry':
+            self.recent_entry_count -= 1
+        recent.append(_scan_dict(scan))
+
+        if scan.scan_type == 'entry':
+            self.recent_entry_count += 1
+            self.inside.add(scan.ticket_id)
+        else:
+            self.inside.discard(scan.ticket_id)
+
+    def result(self) -> Dict:
+        return {
+            'recent_scans': deque(self.recent_scans, maxlen=self.recent_scans.maxlen),
+            'current_occupancy': len(self.inside),
+            'recent_entry_count': self.recent_entry_count,
+        }
+
+
+def _scan_dict(scan) -> Dict:
+    event = scan._asdict()
+    if event['user_id'] is None:
+        del event['user_id']
+    return event
+
+
+_TRACKER_VIEWS = {
+    count_current_occupancy: lambda t: t.total_occupancy,
+    detect_scan_anomalies: lambda t: t.anomalies(),
+    analyze_scan_patterns: lambda t: t.scan_patterns(),
+}
+
+_OWN_CONSUMERS = {
+    track_occupancy_with_details: _DetailsConsumer,
+    manage_capacity_realtime: _CapacityConsumer,
+    track_recent_activity: _RecentActivityConsumer,
+}
+
+
+# ===========================================================================
+# RUNNER
+# ===========================================================================
+
+class QueryRunner:
+    """
+    Fan one pass over a scan stream out to many reports.
+
+    Register practice functions (with the keyword arguments you'd normally
+    pass them), or any custom consumer object with feed()/result().
+    """
+
+    def __init__(self):
+        self._reports: Dict[str, object] = {}
+        self._consumers: List[object] = []
+        self._shared: Optional[_SharedTracker] = None
+        self.reorder_buffer: Optional[ReorderBuffer] = None
+
+    def register(self, func: Callable, name: Optional[str] = None, **kwargs) -> str:
+        """
+        Register one of the analytics functions.
+
+        Args:
+            func: e.g. count_current_occupancy, manage_capacity_realtime
+            name: Result key (defaults to the function name)
+            **kwargs: Same keyword arguments the function takes
+                      (max_capacity=..., window_size=...)
+
+        Returns:
+            str: The key this report's result will appear under
+        """
+        name = name or func.__name__
+        if name in self._reports:
+            raise ValueError(f"A report named '{name}' is already registered")
+
+        if func in _TRACKER_VIEWS:
+            if kwargs:
+                raise TypeError(f"{func.__name__} takes no extra arguments")
+            if self._shared is None:
+                self._shared = _SharedTracker()
+                self._consumers.append(self._shared)
+            self._reports[name] = _TrackerView(self._shared, _TRACKER_VIEWS[func])
+        elif func in _OWN_CONSUMERS:
+            consumer = _OWN_CONSUMERS[func](**kwargs)
+            self._consumers.append(consumer)
+            self._reports[name] = consumer
+        else:
+            raise ValueError(f"No single-pass consumer for {func.__name__}")
+        return name
+
+    def register_consumer(self, name: str, consumer) -> str:
+        """Register a custom object with feed(scan) and result()."""
+        if name in self._reports:
+            raise ValueError(f"A report named '{name}' is already registered")
+        self._consumers.append(consumer)
+        self._reports[name] = consumer
+        return name
+
+    def run(self, stream, max_lateness_seconds: Optional[int] = None) -> Dict[str, object]:
+        """
+        Consume the stream once and return {report_name: result}.
+
+        With max_lateness_seconds, scans go through a ReorderBuffer first so
+        out-of-order uploads are fed in timestamp order; its late_events count
+        is on self.reorder_buffer afterwards.
+        """
+        feeds = [consumer.feed for consumer in self._consumers]
+        if max_lateness_seconds is not None:
+            self.reorder_buffer = ReorderBuffer(max_lateness_seconds)
+            stream = reorder((to_scan_event(e) for e in stream), buffer=self.reorder_buffer)
+
+        if len(feeds) == 1:
+            feed = feeds[0]
+            for event in stream:
+                feed(to_scan_event(event))
+        else:
+            for event in stream:
+                scan = to_scan_event(event)
+                for feed in feeds:
+                    feed(scan)
+
+        return {name: report.result() for name, report in self._reports.items()}
+
+
+def run_all_reports(stream, max_capacity: int = 6, window_size: int = 100) -> Dict[str, object]:
+    """Convenience: every analytics report from one pass over the stream."""
+    runner = QueryRunner()
+    runner.register(count_current_occupancy)
+    runner.register(track_occupancy_with_details)
+    runner.register(detect_scan_anomalies)
+    runner.register(manage_capacity_realtime, max_capacity=max_capacity)
+    runner.register(analyze_scan_patterns)
+    runner.register(track_recent_activity, window_size=window_size)
+    return runner.run(stream)
+
+
+# ===========================================================================
+# TEST RUNNER
+# ===========================================================================
+
+if __name__ == "__main__":
+    from python_occupancy_practice import mock_scan_stream
+
+    results = run_all_reports(mock_scan_stream(), window_size=5)
+    for report, value in results.items():
+        print(f"{report}: {value}")
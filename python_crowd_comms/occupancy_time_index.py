@@ -0,0 +1,157 @@
+# Checkpoint Index for Occupancy-at-Time Queries
+# ===============================================
+# get_occupancy_at_time(stream, target_time) replays the stream from the start
+# for EVERY query - O(n) each. Post-event reports ask thousands of
+# "how many were inside at t?" questions over the same scan log.
+#
+# OccupancyTimeIndex replays the log ONCE and stores:
+#   - every event's time (array of int epochs, sorted)
+#   - every event's effect on the count: +1, -1 or 0 (duplicate / bad exit)
+#   - a checkpoint of the running count every `checkpoint_every` events
+#
+# A query bisects to the target time (O(log n)), starts at the checkpoint just
+# before it and sums at most checkpoint_every deltas after it.
+#
+#   times:       10:00  10:01  10:02  10:03 | 10:05  11:00  11:05 ...
+#   deltas:        +1     +1     +1     +1  |   +1     -1     +1
+#   checkpoints:  [0]                       | [4]
+#                                             ^ query 11:02 starts here: 4 + 1 - 1 = 4
+
+from array import array
+from bisect import bisect_right
+from operator import itemgetter
+from typing import List, Optional, Set, Union
+
+from scan_decoder import to_scan_event
+from scan_timestamps import to_epoch
+
+
+class OccupancyTimeIndex:
+    """
+    Build once over a scan log, then answer occupancy-at-time queries in
+    O(log n + checkpoint_every).
+
+    Same rules as get_occupancy_at_time: scans AT the target time are included,
+    entries add a ticket, exits remove it, duplicates change nothing.
+
+    Events are stably sorted by timestamp while building, so late-arriving
+    batches in the log don't cause wrong answers.
+
+    Args:
+        stream: Iterable of scan events (JSON strings, dicts or ScanEvents)
+        checkpoint_every: Events between count checkpoints
+        keep_inside_sets: Also checkpoint WHO was inside, enabling inside_at().
+            Costs one frozenset per checkpoint, so only turn on if needed.
+
+    Example:
+        >>> index = OccupancyTimeIndex(mock_scan_stream())
+        >>> index.occupancy_at('2025-09-30T11:30:00')
+        6
+    """
+
+    def __init__(self, stream, checkpoint_every: int = 1024, keep_inside_sets: bool = False):
+        if checkpoint_every < 1:
+            raise ValueError("checkpoint_every must be at least 1")
+        self.checkpoint_every = checkpoint_every
+        self.keep_inside_sets = keep_inside_sets
+
+        events = []
+        for event in stream:
+            scan = to_scan_event(event)
+            events.append((to_epoch(scan.timestamp), scan.ticket_id, scan.scan_type == 'entry'))
+        events.sort(key=itemgetter(0))
+
+        self.times = array('q')
+        self.deltas = array('b')
+        self.checkpoint_counts = array('q')
+        self.checkpoint_inside: List[frozenset] = []
+        self._tickets: List[str] = []
+
+        inside = set()
+        for i, (epoch, ticket_id, is_entry) in enumerate(events):
+            if i % checkpoint_every == 0:
+                self._checkpoint(inside)
+
+            if is_entry:
+                delta = 0 if ticket_id in inside else 1
+                inside.add(ticket_id)
+            else:
+                delta = -1 if ticket_id in inside else 0
+                inside.discard(ticket_id)
+
+            self.times.append(epoch)
+            self.deltas.append(delta)
+            if keep_inside_sets:
+                self._tickets.append(ticket_id)
+
+        # Final checkpoint so a query past the last event never replays
+        if len(events) % checkpoint_every == 0:
+            self._checkpoint(inside)
+
+    def _checkpoint(self, inside: Set[str]) -> None:
+        self.checkpoint_counts.append(len(inside))
+        if self.keep_inside_sets:
+            self.checkpoint_inside.append(frozenset(inside))
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def _locate(self, target_time: Union[str, int]):
+        """Return (events up to target, checkpoint number, checkpoint event position)."""
+        target = to_epoch(target_time) if isinstance(target_time, str) else target_time
+        idx = bisect_right(self.times, target)
+        checkpoint = idx // self.checkpoint_every
+        return idx, checkpoint, checkpoint * self.checkpoint_every
+
+    def occupancy_at(self, target_time: Union[str, int]) -> int:
+        """
+        Number of tickets inside at target_time.
+
+        Args:
+            target_time: ISO timestamp string or int epoch seconds
+
+        Returns:
+            int: Occupancy at that moment (0 before the first scan)
+        """
+        idx, checkpoint, start = self._locate(target_time)
+        return self.checkpoint_counts[checkpoint] + sum(self.deltas[start:idx])
+
+    def inside_at(self, target_time: Union[str, int]) -> Set[str]:
+        """
+        The set of ticket_ids inside at target_time.
+        Requires keep_inside_sets=True when building the index.
+        """
+        if not self.keep_inside_sets:
+            raise ValueError("Build the index with keep_inside_sets=True to use inside_at()")
+
+        idx, checkpoint, start = self._locate(target_time)
+        inside = set(self.checkpoint_inside[checkpoint])
+        for i in range(start, idx):
+            delta = self.deltas[i]
+            if delta > 0:
+                inside.add(self._tickets[i])
+            elif delta < 0:
+                inside.discard(self._tickets[i])
+        return inside
+
+    def first_time(self) -> Optional[int]:
+        return self.times[0] if self.times else None
+
+    def last_time(self) -> Optional[int]:
+        return self.times[-1] if self.times else None
+
+
+# ===========================================================================
+# TEST RUNNER
+# ===========================================================================
+
+if __name__ == "__main__":
+    from python_occupancy_practice import mock_scan_stream, get_occupancy_at_time
+
+    index = OccupancyTimeIndex(mock_scan_stream(), checkpoint_every=4, keep_inside_sets=True)
+    for target in ('2025-09-30T09:00:00', '2025-09-30T10:00:00',
+                   '2025-09-30T11:30:00', '2025-09-30T23:59:59'):
+        indexed = index.occupancy_at(target)
+        replayed = get_occupancy_at_time(mock_scan_stream(), target)
+        print(f"{target}: index={indexed} replay={replayed} {'✅' if indexed == replayed else '❌'}")
+    print(f"Inside at 11:30: {sorted(index.inside_at('2025-09-30T11:30:00'))}")
@@ -0,0 +1,283 @@
+# Incremental Occupancy Tracker
+# =============================
+# One stateful object that keeps every occupancy metric current as scans arrive.
+#
+# The functions in python_occupancy_practice.py each replay the whole stream and
+# rebuild their own sets and dicts. A dashboard polling once a second would pay
+# for that replay five times per poll. OccupancyTracker does the work ONCE per
+# event in ingest(), so every metric is a plain attribute read afterwards.
+
+from collections import defaultdict, Counter
+from typing import Dict, Optional, Set
+
+from recent_exits import RecentExits
+from scan_decoder import to_scan_event
+from scan_timestamps import to_epoch, RAPID_REENTRY_SECONDS
+from ticket_registry import mock_registry
+
+
+class OccupancyTracker:
+    """
+    Keep total, by_gate, by_ticket_type, entry/exit counts, anomaly sets and
+    capacity counters up to date, one event at a time.
+
+    Rules (same as the practice questions):
+    - Entry while already inside -> duplicate entry, ignored for occupancy
+    - Exit while not inside -> exit without entry, ignored for occupancy
+    - Entry within 5 minutes of the same ticket's last exit -> rapid re-entry
+      (the entry is still allowed, it is just flagged)
+    - by_gate counts people by the gate they ENTERED through, so it always
+      sums to total_occupancy even if they leave through another gate
+
+    Capacity (Q5) is only tracked when max_capacity is given:
+    - General tickets are rejected once admitted occupancy hits max_capacity
+    - VIP tickets always get in (counted in vip_override_count)
+    - would_be_occupancy is what the count would be without any limit
+
+    Exit times are only kept for exit_time_ttl seconds (default: the 5-minute
+    re-entry window), so memory follows recent exits rather than every ticket
+    that ever left. Results are identical on time-ordered streams; pass
+    exit_time_ttl=None to keep every exit time.
+
+    Example:
+        >>> tracker = OccupancyTracker()
+        >>> tracker.ingest_many(mock_scan_stream())
+        >>> tracker.total_occupancy
+        4
+        >>> tracker.duplicate_entries
+        {'T003'}
+    """
+
+    def __init__(self, ticket_types: Optional[Dict[str, str]] = None,
+                 max_capacity: Optional[int] = None,
+                 exit_time_ttl: Optional[int] = RAPID_REENTRY_SECONDS):
+        if ticket_types is None:
+            ticket_types = mock_registry()
+        if exit_time_ttl is not None and exit_time_ttl < RAPID_REENTRY_SECONDS:
+            raise ValueError("exit_time_ttl can't be shorter than the rapid re-entry window")
+        self.ticket_types = ticket_types
+        self.max_capacity = max_capacity
+
+        # ticket_id -> gate they entered through (doubles as the "inside" set)
+        self.inside: Dict[str, str] = {}
+        self.by_gate = defaultdict(int)
+        self.by_ticket_type = defaultdict(int)
+        self.total_entries = 0
+        self.total_exits = 0
+
+        # Q4 anomaly state (exit times are int epoch seconds, see recent_exits.py)
+        self.last_exit_time = RecentExits(exit_time_ttl)
+        self.duplicate_entries: Set[str] = set()
+        self.exit_without_entry: Set[str] = set()
+        self.rapid_reentry: Set[str] = set()
+
+        # Bonus Counter analytics - every scan counts, valid or not
+        self.scans_per_gate = Counter()
+        self.entries_by_type = Counter()
+
+        # Q5 capacity state
+        self.admitted: Set[str] = set()
+        self.times_at_capacity = 0
+        self.rejected_entries = []
+        self.vip_override_count = 0
+        self._at_capacity = False
+
+    # -----------------------------------------------------------------------
+    # Ingest
+    # -----------------------------------------------------------------------
+
+    def ingest(self, event) -> None:
+        """
+        Apply one scan event (JSON string, dict or ScanEvent). O(1).
+
+        Anything that can raise - to_epoch() on a bad timestamp - runs before
+        the first change to state, so a rejected scan leaves no trace. The
+        timestamp is only parsed when the scan needs it.
+        """
+        scan = to_scan_event(event)
+        ticket_id = scan.ticket_id
+        gate = scan.gate
+        scan_type = scan.scan_type
+        ticket_type = self.ticket_types.get(ticket_id, 'Unknown')
+
+        if scan_type == 'entry':
+            if ticket_id in self.inside:
+                self.scans_per_gate[gate] += 1
+                self.entries_by_type[ticket_type] += 1
+                self.duplicate_entries.add(ticket_id)
+                return
+
+            last_exit = self.last_exit_time.get(ticket_id)
+            if last_exit is not None:
+                if to_epoch(scan.timestamp) - last_exit <= RAPID_REENTRY_SECONDS:
+                    self.rapid_reentry.add(ticket_id)
+
+            self.scans_per_gate[gate] += 1
+            self.entries_by_type[ticket_type] += 1
+            self.inside[ticket_id] = gate
+            self.by_gate[gate] += 1
+            self.by_ticket_type[ticket_type] += 1
+            self.total_entries += 1
+
+            if self.max_capacity is not None:
+                self._admit(ticket_id, ticket_type)
+
+        else:
+            entry_gate = self.inside.get(ticket_id)
+            if entry_gate is None:
+                self.scans_per_gate[gate] += 1
+                self.exit_without_entry.add(ticket_id)
+                return
+
+            self.last_exit_time[ticket_id] = to_epoch(scan.timestamp)
+            self.scans_per_gate[gate] += 1
+            del self.inside[ticket_id]
+            self.by_gate[entry_gate] -= 1
+            self.by_ticket_type[ticket_type] -= 1
+            self.total_exits += 1
+
+            if self.max_capacity is not None:
+                self.admitted.discard(ticket_id)
+                if len(self.admitted) < self.max_capacity:
+                    self._at_capacity = False
+
+    def ingest_many(self, events) -> None:
+        """Apply every event from an iterable/generator, in order."""
+        ingest = self.ingest
+        for event in events:
+            ingest(event)
+
+    def _admit(self, ticket_id: str, ticket_type: str) -> None:
+        """Capacity check for a valid entry (Q5 rules)."""
+        if len(self.admitted) >= self.max_capacity:
+            if ticket_type != 'VIP':
+                self.rejected_entries.append(ticket_id)
+                return
+            self.vip_override_count += 1
+
+        self.admitted.add(ticket_id)
+
+        if len(self.admitted) >= self.max_capacity and not self._at_capacity:
+            self.times_at_capacity += 1
+            self._at_capacity = True
+
+    # -----------------------------------------------------------------------
+    # O(1) reads
+    # -----------------------------------------------------------------------
+
+    @property
+    def total_occupancy(self) -> int:
+        return len(self.inside)
+
+    @property
+    def would_be_occupancy(self) -> int:
+        """Occupancy if no capacity limit existed (every valid entry counted)."""
+        return len(self.inside)
+
+    @property
+    def final_occupancy(self) -> int:
+        """Occupancy after capacity rejections (only meaningful with max_capacity)."""
+        return len(self.admitted) if self.max_capacity is not None else len(self.inside)
+
+    def details(self) -> Dict:
+        """Same shape as track_occupancy_with_details()."""
+        return {
+            'total_occupancy': self.total_occupancy,
+            'by_gate': {gate: count for gate, count in self.by_gate.items() if count},
+            'by_ticket_type': {t: count for t, count in self.by_ticket_type.items() if count},
+            'total_entries': self.total_entries,
+            'total_exits': self.total_exits,
+        }
+
+    def anomalies(self) -> Dict[str, Set[str]]:
+        """Same shape as detect_scan_anomalies()."""
+        return {
+            'duplicate_entries': set(self.duplicate_entries),
+            'exit_without_entry': set(self.exit_without_entry),
+            'rapid_reentry': set(self.rapid_reentry),
+        }
+
+    def capacity(self) -> Dict:
+        """Same shape as manage_capacity_realtime()."""
+        return {
+            'final_occupancy': self.final_occupancy,
+            'times_at_capacity': self.times_at_capacity,
+            'rejected_entries': list(self.rejected_entries),
+            'would_be_occupancy': self.would_be_occupancy,
+            'vip_override_count': self.vip_override_count,
+        }
+
+    def scan_patterns(self) -> Dict:
+        """Same shape as analyze_scan_patterns()."""
+        return {
+            'scans_per_gate': Counter(self.scans_per_gate),
+            'busiest_gates': self.scans_per_gate.most_common(2),
+            'entries_by_type': Counter(self.entries_by_type),
+        }
+
+    # -----------------------------------------------------------------------
+    # Serialisation (for snapshots - see durable_tracker.py)
+    # -----------------------------------------------------------------------
+
+    def state(self) -> Dict:
+        """Every piece of tracker state as JSON-safe types."""
+        return {
+            'max_capacity': self.max_capacity,
+            'exit_time_ttl': self.last_exit_time.ttl_seconds,
+            'inside': self.inside,
+            'by_gate': self.by_gate,
+            'by_ticket_type': self.by_ticket_type,
+            'total_entries': self.total_entries,
+            'total_exits': self.total_exits,
+            'last_exit_time': dict(self.last_exit_time.items()),
+            'duplicate_entries': sorted(self.duplicate_entries),
+            'exit_without_entry': sorted(self.exit_without_entry),
+            'rapid_reentry': sorted(self.rapid_reentry),
+            'scans_per_gate': self.scans_per_gate,
+            'entries_by_type': self.entries_by_type,
+            'admitted': sorted(self.admitted),
+            'times_at_capacity': self.times_at_capacity,
+            'rejected_entries': self.rejected_entries,
+            'vip_override_count': self.vip_override_count,
+            'at_capacity': self._at_capacity,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict, ticket_types: Optional[Dict[str, str]] = None) -> 'OccupancyTracker':
+        """Rebuild a tracker from state()."""
+        tracker = cls(ticket_types=ticket_types, max_capacity=state['max_capacity'],
+                      exit_time_ttl=state.get('exit_time_ttl', RAPID_REENTRY_SECONDS))
+        tracker.inside = dict(state['inside'])
+        tracker.by_gate.update(state['by_gate'])
+        tracker.by_ticket_type.update(state['by_ticket_type'])
+        tracker.total_entries = state['total_entries']
+        tracker.total_exits = state['total_exits']
+        tracker.last_exit_time.update(state['last_exit_time'])
+        tracker.duplicate_entries = set(state['duplicate_entries'])
+        tracker.exit_without_entry = set(state['exit_without_entry'])
+        tracker.rapid_reentry = set(state['rapid_reentry'])
+        tracker.scans_per_gate = Counter(state['scans_per_gate'])
+        tracker.entries_by_type = Counter(state['entries_by_type'])
+        tracker.admitted = set(state['admitted'])
+        tracker.times_at_capacity = state['times_at_capacity']
+        tracker.rejected_entries = list(state['rejected_entries'])
+        tracker.vip_override_count = state['vip_override_count']
+        tracker._at_capacity = state['at_capacity']
+        return tracker
+
+
+# ===========================================================================
+# TEST RUNNER
+# ===========================================================================
+
+if __name__ == "__main__":
+    from python_occupancy_practice import mock_scan_stream
+
+    tracker = OccupancyTracker(max_capacity=6)
+    tracker.ingest_many(mock_scan_stream())
+
+    print(f"Total occupancy: {tracker.total_occupancy}")
+    print(f"Details:         {tracker.details()}")
+    print(f"Anomalies:       {tracker.anomalies()}")
+    print(f"Capacity:        {tracker.capacity()}")
+    print(f"Scan patterns:   {tracker.scan_patterns()}")
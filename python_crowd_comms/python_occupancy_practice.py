@@ -279,7 +279,9 @@ def track_occupancy_with_details(stream) -> Dict:
     gate_count = defaultdict(int)
     total_ticket_type = defaultdict(int)
     
-    id_to_ticket_type = {t['ticket_id']: t['ticket_type'] for t in get_mock_tickets()}
+    # Built once per process and shared (ticket_registry.py imports this module)
+    from ticket_registry import mock_registry
+    id_to_ticket_type = mock_registry()
     
     for json_scan in stream:
         scan = json.loads(json_scan)
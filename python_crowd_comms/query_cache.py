@@ -0,0 +1,388 @@
+# Versioned Query Result Cache
+# ============================
+# The Redis note in database_occupancy_learning.py caches the current count
+# with setex(..., 10): for up to 10 seconds the dashboard shows a stale
+# number, and every key still goes back to the database every 10 seconds,
+# whether or not a single scan arrived.
+#
+# Here, results are cached until the scans actually change. Every key carries
+# the current SCAN VERSION, and the ingest path bumps the version after it
+# commits scans:
+#
+#   read:    occupancy:v41:database_occupancy_learning.get_occupancy_at_time_sql:[["2025-09-30 11:30:00"], {}]
+#              local LRU ──miss──> Redis ──miss──> run the query, store in both
+#
+#   ingest:  load_scans() / populate_database() ──commit──> invalidate()
+#              version 41 -> 42: every v41 key is unreachable at once
+#
+# Nothing is deleted on invalidation - old keys age out of the LRU (and
+# expire in Redis after ttl_seconds). With Redis configured the version lives
+# in Redis too, so an ingest process invalidates every reader process; that
+# costs readers one GET per query, still far cheaper than the query.
+#
+# Two tiers:
+#   - local: OrderedDict LRU of max_entries, per process, no round trip
+#   - redis: optional and shared; InMemoryRedis stands in for it offline
+#
+# Redis going away never fails a query. A failed GET/SET of a result falls
+# back to the local tier and the database. If the version can't be read,
+# nothing can be trusted to be current, so the query just runs uncached. A
+# failed invalidate() is remembered and retried before the next version read.
+# Every failure is counted in stats()['redis_errors'].
+#
+# Results are stored as JSON, so both tiers hand back the same types (tuples
+# come back as lists) and a caller mutating a result can't corrupt the cache.
+#
+# Caching is opt-in, like the shared pool: nothing is cached until
+# configure() is called, so scripts and tests that swap databases around
+# don't see each other's results.
+
+import functools
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+
+class LRUCache:
+    """
+    Thread-safe size-capped LRU of bytes values.
+
+    Args:
+        max_entries: Entries kept; the least recently used goes first
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class InMemoryRedis:
+    """
+    The slice of the redis.Redis API the cache uses (get / set with ex /
+    incr / delete), in memory - so tests and demos run without a server.
+    Like redis-py, values come back as bytes.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _encode(value) -> bytes:
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(name)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and time.monotonic() >= expires:
+                del self._data[name]
+                return None
+            return value
+
+    def set(self, name: str, value, ex: Optional[int] = None) -> bool:
+        expires = time.monotonic() + ex if ex else None
+        with self._lock:
+            self._data[name] = (self._encode(value), expires)
+        return True
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        with self._lock:
+            value, expires = self._data.get(name, (b'0', None))
+            if expires is not None and time.monotonic() >= expires:
+                value, expires = b'0', None
+            new = int(value) + amount
+            self._data[name] = (self._encode(new), expires)
+            return new
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def redis_from_url(url: str):
+    """A real Redis client (redis-py is only imported here)."""
+    import redis
+    return redis.Redis.from_url(url)
+
+
+def redis_unreachable_errors() -> Tuple[type, ...]:
+    """Exceptions meaning "Redis is unreachable": redis-py's, plus socket errors."""
+    try:
+        from redis.exceptions import ConnectionError, TimeoutError
+    except ImportError:
+        return (OSError,)
+    return (ConnectionError, TimeoutError, OSError)
+
+
+class QueryCache:
+    """
+    Query results keyed by (query name, parameters, scan version).
+
+    Args:
+        max_entries: Local LRU size
+        redis: Optional shared tier - a redis.Redis (see redis_from_url())
+            or an InMemoryRedis
+        ttl_seconds: Expiry for Redis entries (old versions age out)
+        namespace: Key prefix, so several events can share one Redis
+
+    Example:
+        >>> cache = QueryCache(redis=redis_from_url('redis://localhost:6379/0'))
+        >>> cache.get_or_compute('count_current_occupancy_sql', (), count_current_occupancy_sql)
+        4
+        >>> cache.invalidate()        # after new scans are committed
+    """
+
+    def __init__(self, max_entries: int = 1024, redis=None, ttl_seconds: int = 3600,
+                 namespace: str = 'occupancy'):
+        self.local = LRUCache(max_entries)
+        self.redis = redis
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self._version_key = f'{namespace}:scan_version'
+        self._local_version = 0
+        self._unsent_invalidations = 0
+        self._unreachable = redis_unreachable_errors()
+
+        # Stats
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.redis_errors = 0
+
+    def version(self) -> Optional[int]:
+        """
+        Current scan version (shared through Redis when there is one), or
+        None while Redis is unreachable.
+        """
+        if self.redis is None:
+            return self._local_version
+        try:
+            if self._unsent_invalidations:
+                self.redis.incr(self._version_key, self._unsent_invalidations)
+                self._unsent_invalidations = 0
+            value = self.redis.get(self._version_key)
+        except self._unreachable:
+            self.redis_errors += 1
+            return None
+        return int(value) if value is not None else 0
+
+    def invalidate(self) -> Optional[int]:
+        """
+        Scans changed: bump the version so every cached result is stale.
+        Returns the new version (None if Redis is down - it's bumped later).
+        """
+        self.local.clear()
+        self.invalidations += 1
+        if self.redis is None:
+            self._local_version += 1
+            return self._local_version
+        try:
+            return self.redis.incr(self._version_key)
+        except self._unreachable:
+            self.redis_errors += 1
+            self._unsent_invalidations += 1
+            return None
+
+    def key(self, name: str, params: Sequence = (), kwparams: Optional[Dict] = None,
+            version: Optional[int] = None) -> str:
+        arguments = json.dumps([list(params), kwparams or {}], sort_keys=True, default=str)
+        version = self.version() if version is None else version
+        return f'{self.namespace}:v{version}:{name}:{arguments}'
+
+    def get_or_compute(self, name: str, params: Sequence, compute: Callable[[], Any],
+                       kwparams: Optional[Dict] = None) -> Any:
+        """The cached result for name(*params, **kwparams), running compute() on a miss."""
+        version = self.version()
+        if version is None:
+            # Redis is down: no way to tell if a cached result is current
+            self.misses += 1
+            return json.loads(json.dumps(compute()))
+
+        key = self.key(name, params, kwparams, version)
+        encoded = self.local.get(key)
+        if encoded is not None:
+            self.hits += 1
+            return json.loads(encoded)
+
+        if self.redis is not None:
+            try:
+                encoded = self.redis.get(key)
+            except self._unreachable:
+                self.redis_errors += 1
+                encoded = None
+            if encoded is not None:
+                self.redis_hits += 1
+                self.local.set(key, encoded)
+                return json.loads(encoded)
+
+        self.misses += 1
+        result = compute()
+        encoded = json.dumps(result).encode()
+        self.local.set(key, encoded)
+        if self.redis is not None:
+            try:
+                self.redis.set(key, encoded, ex=self.ttl_seconds)
+            except self._unreachable:
+                self.redis_errors += 1
+        return json.loads(encoded)
+
+    def stats(self) -> Dict:
+        return {
+            'entries': len(self.local),
+            'hits': self.hits,
+            'redis_hits': self.redis_hits,
+            'misses': self.misses,
+            'evictions': self.local.evictions,
+            'invalidations': self.invalidations,
+            'redis_errors': self.redis_errors,
+            'version': self.version(),
+        }
+
+
+# ===========================================================================
+# SHARED CACHE
+# ===========================================================================
+
+_cache: Optional[QueryCache] = None
+
+
+def configure(cache: Optional[QueryCache] = None, redis_url: Optional[str] = None,
+              **kwargs) -> QueryCache:
+    """
+    Turn caching on for every @cached_query function: pass a ready cache, a
+    Redis URL, or QueryCache options (local tier only).
+    """
+    global _cache
+    if cache is None:
+        redis = redis_from_url(redis_url) if redis_url else kwargs.pop('redis', None)
+        cache = QueryCache(redis=redis, **kwargs)
+    _cache = cache
+    return cache
+
+
+def get_cache() -> Optional[QueryCache]:
+    """The shared cache, or None while caching is off."""
+    return _cache
+
+
+def disable() -> None:
+    """Turn caching off again (cached queries go straight to the database)."""
+    global _cache
+    _cache = None
+
+
+def invalidate() -> None:
+    """Called by the scan-ingest path after it commits; no-op while caching is off."""
+    if _cache is not None:
+        _cache.invalidate()
+
+
+def cached_query(function: Callable) -> Callable:
+    """
+    Serve a read query from the shared cache when one is configured. The
+    arguments must be JSON-friendly (timestamps as strings) - they're the key,
+    along with the module-qualified name, so same-named queries in different
+    modules never share entries.
+    """
+    name = f'{function.__module__}.{function.__qualname__}'
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        cache = _cache
+        if cache is None:
+            return function(*args, **kwargs)
+        return cache.get_or_compute(name, args, lambda: function(*args, **kwargs), kwargs)
+    wrapper.uncached = function
+    return wrapper
+
+
+# ===========================================================================
+# BENCHMARK
+# ===========================================================================
+
+def benchmark(n_tickets: int = 20_000, reads: int = 500, reads_per_ingest: int = 100) -> Dict:
+    """
+    A dashboard polling get_detailed_breakdown_single_sql() against a
+    temporary SQLite database, with a scan batch committed every
+    reads_per_ingest reads: uncached vs cached (local tier, then through
+    InMemoryRedis).
+    """
+    import os
+    import tempfile
+
+    import db_pool
+    from breakdown_query import get_detailed_breakdown_single_sql
+    from database_occupancy_learning import setup_database
+    from scan_loader import load_generated_event
+
+    tmp = tempfile.mkdtemp()
+    db_pool.configure(pool=db_pool.ConnectionPool.sqlite(os.path.join(tmp, 'cache_bench.db')))
+    setup_database()
+    load_generated_event(n_tickets)
+
+    def poll() -> float:
+        start = time.perf_counter()
+        for i in range(reads):
+            if i % reads_per_ingest == 0:
+                invalidate()        # stands in for load_scans() committing a batch
+            get_detailed_breakdown_single_sql()
+        return time.perf_counter() - start
+
+    disable()
+    results = {'reads': reads, 'uncached_s': round(poll(), 3)}
+    configure()
+    results['local_s'] = round(poll(), 3)
+    configure(redis=InMemoryRedis())
+    results['local_and_redis_s'] = round(poll(), 3)
+    results.update({k: v for k, v in get_cache().stats().items() if k != 'version'})
+    disable()
+    db_pool.close_pool()
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python query_cache.py [n_tickets] [reads]
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    r = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    # The decorated queries use the imported module's cache, not __main__'s
+    import query_cache
+    for key, value in query_cache.benchmark(n, r).items():
+        print(f"{key}: {value}")
@@ -0,0 +1,83 @@
+# Bounded Last-Exit Times
+# =======================
+# Rapid re-entry (Q4) asks "did this ticket exit in the last 5 minutes?", but
+# the usual ticket -> last_exit_time dict keeps every exit forever. Over a
+# three-day festival that's one entry per ticket that ever left, long after
+# it can matter.
+#
+# RecentExits keeps the same mapping plus a queue of exits in time order.
+# Exits arrive in (roughly) time order, so the oldest is always at the front:
+#
+#   queue:  (10:00:05 T001) (10:01:40 T007) (10:03:12 T002) ... (10:09:58 T031)
+#            ^ front                                             ^ newest exit
+#
+#   newest exit - ttl = 10:04:58  ->  pop T001, T007, T002 off the front
+#
+# Each exit is pushed once and popped once: O(1) amortised. Memory follows the
+# number of exits in the last ttl seconds, not the ticket population.
+#
+# Why this gives IDENTICAL answers on a time-ordered stream: an exit at e can
+# only flag an entry at t if t - e <= ttl. Entries come at or after the newest
+# exit, so once newest - e > ttl no future entry can be within ttl of e.
+# For out-of-order input, reorder first (scan_reorder.py) or raise ttl by the
+# maximum lateness.
+
+from collections import deque
+from typing import Dict, Iterator, Optional, Tuple
+
+from scan_timestamps import RAPID_REENTRY_SECONDS
+
+
+class RecentExits:
+    """
+    ticket_id -> last exit epoch, forgetting exits older than ttl_seconds
+    before the newest exit seen. ttl_seconds=None keeps everything.
+
+    Supports the dict operations the trackers use: get, [] =, in, len, items.
+    """
+
+    def __init__(self, ttl_seconds: Optional[int] = RAPID_REENTRY_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._last: Dict[str, int] = {}
+        self._queue = deque()   # (epoch, ticket_id), oldest first
+        self.newest: Optional[int] = None
+        self.evicted = 0
+
+    def get(self, ticket_id: str, default=None):
+        return self._last.get(ticket_id, default)
+
+    def __getitem__(self, ticket_id: str) -> int:
+        return self._last[ticket_id]
+
+    def __contains__(self, ticket_id: str) -> bool:
+        return ticket_id in self._last
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        return iter(self._last.items())
+
+    def __setitem__(self, ticket_id: str, epoch: int) -> None:
+        """Record an exit, then drop exits that can no longer matter."""
+        self._last[ticket_id] = epoch
+        if self.ttl_seconds is None:
+            return
+        self._queue.append((epoch, ticket_id))
+        if self.newest is None or epoch > self.newest:
+            self.newest = epoch
+
+        cutoff = self.newest - self.ttl_seconds
+        queue = self._queue
+        last = self._last
+        while queue and queue[0][0] < cutoff:
+            old_epoch, old_ticket = queue.popleft()
+            # The ticket may have exited again since - only drop THIS exit
+            if last.get(old_ticket) == old_epoch:
+                del last[old_ticket]
+                self.evicted += 1
+
+    def update(self, exits: Dict[str, int]) -> None:
+        """Bulk load (e.g. from a snapshot), oldest first so eviction works."""
+        for ticket_id, epoch in sorted(exits.items(), key=lambda item: item[1]):
+            self[ticket_id] = epoch
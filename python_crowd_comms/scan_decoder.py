@@ -0,0 +1,173 @@
+# Fast Scan-Event Decoder
+# =======================
+# A decoder specialised to the ONE schema our gate scanners send:
+#
+#   {"ticket_id": "T001", "gate": "A", "timestamp": "2025-09-30T10:00:00", "scan_type": "entry"}
+#
+# optionally with "user_id" straight after ticket_id or at the end
+# (archive/occupancy_db_learning2.py uses the first layout).
+#
+# json.loads is general-purpose: it builds a dict, hashes every key, and we
+# then do four more dict lookups per event. For a fixed schema we can split
+# the line on '"' and read the values straight out of known positions:
+#
+#   '{"ticket_id": "T001", "gate": "A", ...}'.split('"')
+#   -> ['{', 'ticket_id', ': ', 'T001', ', ', 'gate', ': ', 'A', ...]
+#             [1] key          [3] value       [5] key     [7] value
+#
+# Anything that doesn't match the layout exactly (escaped quotes, extra keys,
+# different key order, non-string values) falls back to json.loads, so the
+# decoder is never wrong - just slower on unusual input.
+
+import json
+import sys
+import time
+from typing import NamedTuple, Optional
+
+
+class ScanEvent(NamedTuple):
+    """Compact, immutable scan record (a tuple - no per-event dict)."""
+    ticket_id: str
+    gate: str
+    timestamp: str
+    scan_type: str
+    user_id: Optional[str] = None
+
+
+_new_scan = tuple.__new__
+_COLONS = frozenset((': ', ':'))
+_COMMAS = frozenset((', ', ','))
+
+
+def decode_scan(line: str) -> ScanEvent:
+    """
+    Decode one JSON scan line into a ScanEvent.
+
+    Args:
+        line: JSON string from the scanner stream
+
+    Returns:
+        ScanEvent(ticket_id, gate, timestamp, scan_type, user_id)
+
+    Example:
+        >>> decode_scan('{"ticket_id": "T001", "gate": "A", '
+        ...             '"timestamp": "2025-09-30T10:00:00", "scan_type": "entry"}')
+        ScanEvent(ticket_id='T001', gate='A', timestamp='2025-09-30T10:00:00', scan_type='entry', user_id=None)
+    """
+    if '\\' not in line:
+        p = line.split('"')
+        n = len(p)
+
+        if (n == 17 and p[1] == 'ticket_id' and p[5] == 'gate'
+                and p[9] == 'timestamp' and p[13] == 'scan_type'
+                and p[0] == '{' and p[16] == '}'
+                and p[2] == p[6] == p[10] == p[14] and p[2] in _COLONS
+                and p[4] == p[8] == p[12] and p[4] in _COMMAS):
+            return _new_scan(ScanEvent, (p[3], p[7], p[11], p[15], None))
+
+        if n == 21 and p[0] == '{' and p[20] == '}' and p[1] == 'ticket_id':
+            # {"ticket_id", "user_id", "gate", "timestamp", "scan_type"}
+            if (p[5] == 'user_id' and p[9] == 'gate' and p[13] == 'timestamp'
+                    and p[17] == 'scan_type' and _separators_ok(p)):
+                return _new_scan(ScanEvent, (p[3], p[11], p[15], p[19], p[7]))
+            # {"ticket_id", "gate", "timestamp", "scan_type", "user_id"}
+            if (p[5] == 'gate' and p[9] == 'timestamp' and p[13] == 'scan_type'
+                    and p[17] == 'user_id' and _separators_ok(p)):
+                return _new_scan(ScanEvent, (p[3], p[7], p[11], p[15], p[19]))
+
+    return _from_dict(json.loads(line))
+
+
+def _separators_ok(p) -> bool:
+    """Check every separator between quoted strings is a plain ': ' or ', '."""
+    last = len(p) - 1
+    for i in range(2, last, 2):
+        if p[i] not in (_COLONS if i % 4 == 2 else _COMMAS):
+            return False
+    return True
+
+
+def _from_dict(scan: dict) -> ScanEvent:
+    return ScanEvent(scan['ticket_id'], scan['gate'], scan['timestamp'],
+                     scan['scan_type'], scan.get('user_id'))
+
+
+def to_scan_event(event) -> ScanEvent:
+    """
+    Normalise anything a stream might yield into a ScanEvent.
+
+    Streams in this project yield JSON strings (mock_scan_stream) but the
+    tests feed plain dicts, so consumers call this instead of json.loads.
+    """
+    if type(event) is ScanEvent:
+        return event
+    if isinstance(event, str):
+        return decode_scan(event)
+    return _from_dict(event)
+
+
+def decode_stream(stream):
+    """Generator wrapper: yield a ScanEvent for every line in the stream."""
+    for line in stream:
+        yield decode_scan(line)
+
+
+# ===========================================================================
+# BENCHMARK: decode_scan vs json.loads
+# ===========================================================================
+
+def _generate_lines(n: int):
+    gates = 'ABCD'
+    scan_types = ('entry', 'exit')
+    for i in range(n):
+        yield ('{"ticket_id": "T%07d", "gate": "%s", "timestamp": "2025-09-30T%02d:%02d:%02d", '
+               '"scan_type": "%s"}' % (i % 1_000_000, gates[i % 4], 10 + (i // 3600) % 12,
+                                      (i // 60) % 60, i % 60, scan_types[i % 2]))
+
+
+def benchmark_decoder(n: int = 10_000_000, chunk: int = 100_000) -> dict:
+    """
+    Time json.loads (+ the four dict lookups every hot loop does) against
+    decode_scan on n generated lines. Lines are generated in chunks so 10M
+    lines don't have to sit in memory at once.
+
+    Returns:
+        {'lines': n, 'json_loads_s': ..., 'decode_scan_s': ..., 'speedup': ...}
+    """
+    loads = json.loads
+    json_time = 0.0
+    fast_time = 0.0
+    lines_gen = _generate_lines(n)
+
+    done = 0
+    while done < n:
+        batch = [next(lines_gen) for _ in range(min(chunk, n - done))]
+        done += len(batch)
+
+        start = time.perf_counter()
+        for line in batch:
+            scan = loads(line)
+            scan['ticket_id'], scan['gate'], scan['timestamp'], scan['scan_type']
+        json_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for line in batch:
+            decode_scan(line)
+        fast_time += time.perf_counter() - start
+
+    return {
+        'lines': n,
+        'json_loads_s': round(json_time, 3),
+        'decode_scan_s': round(fast_time, 3),
+        'speedup': round(json_time / fast_time, 2) if fast_time else None,
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python scan_decoder.py [number_of_lines]
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    print(f"Decoding {lines:,} generated scan lines...")
+    result = benchmark_decoder(lines)
+    print(f"json.loads:  {result['json_loads_s']}s")
+    print(f"decode_scan: {result['decode_scan_s']}s")
+    print(f"Speedup:     {result['speedup']}x")
@@ -0,0 +1,293 @@
+# Large-Scale Synthetic Scan Streams
+# ==================================
+# mock_scan_stream() has 13 events and get_mock_tickets() has 8 tickets - good
+# for learning, useless for benchmarks. This module generates realistic scan
+# streams of ANY size, deterministically from a seed, without ever holding the
+# whole stream in memory.
+#
+# How the stream stays in time order while streaming:
+#   1. Arrival times are generated already SORTED (sorted uniforms pushed
+#      through the inverse CDF of the chosen arrival curve).
+#   2. Every later event for a ticket (exit, duplicate scan, rapid re-entry)
+#      goes into a min-heap keyed by time.
+#   3. Before emitting each arrival we pop everything from the heap that
+#      happens earlier. The heap only holds people currently inside, so
+#      memory follows occupancy, not stream length.
+#
+# Output formats:
+#   'json'   - JSON strings in the exact mock_scan_stream() layout
+#   'dict'   - plain dicts (what the tests feed in)
+#   'event'  - ScanEvent tuples (skips decoding entirely)
+#   'binary' - 14-byte packed records: ticket u32, gate u8, scan_type u8, epoch i64
+
+import heapq
+import inspect
+import math
+import random
+import struct
+import sys
+from typing import Dict, Iterator, Sequence
+
+from scan_decoder import ScanEvent
+from scan_timestamps import from_epoch, to_epoch, RAPID_REENTRY_SECONDS
+
+
+BINARY_RECORD = struct.Struct('<IBBq')
+SCAN_TYPES = ('entry', 'exit')
+
+# Heap event kinds
+_EXIT = 0
+_DUPLICATE = 1
+_REENTRY = 2
+
+ARRIVAL_CURVES = ('uniform', 'front_loaded', 'peak')
+
+
+# ===========================================================================
+# TICKETS
+# ===========================================================================
+
+def ticket_id_for(index: int, n_tickets: int) -> str:
+    width = max(3, len(str(n_tickets - 1)))
+    return f'T{index:0{width}d}'
+
+
+def generate_tickets(n_tickets: int = 1_000_000, seed: int = 42, vip_fraction: float = 0.1,
+                     tickets_per_user: float = 1.2) -> Iterator[Dict]:
+    """
+    Ticket rows in the same shape as get_mock_tickets(), streamed.
+
+    Some users own several tickets (like U123 with T001 and T008):
+    on average tickets_per_user tickets share a user_id.
+    """
+    rng = random.Random(f'{seed}-tickets')
+    n_users = max(1, int(n_tickets / tickets_per_user))
+    user_width = max(3, len(str(n_users - 1)))
+    for i in range(n_tickets):
+        is_vip = rng.random() < vip_fraction
+        yield {
+            'ticket_id': ticket_id_for(i, n_tickets),
+            'user_id': f'U{min(i, rng.randrange(n_users)):0{user_width}d}',
+            'ticket_type': 'VIP' if is_vip else 'General',
+            'price': 150.00 if is_vip else 50.00,
+        }
+
+
+def ticket_type_lookup(n_tickets: int = 1_000_000, seed: int = 42, vip_fraction: float = 0.1) -> Dict[str, str]:
+    """ticket_id -> ticket_type, ready for OccupancyTracker(ticket_types=...)."""
+    return {t['ticket_id']: t['ticket_type']
+            for t in generate_tickets(n_tickets, seed, vip_fraction)}
+
+
+# ===========================================================================
+# ARRIVAL CURVES
+# ===========================================================================
+
+def _inverse_cdf(curve: str, peak_at: float):
+    """Map a uniform u in [0, 1) to a fraction of the event duration."""
+    if curve == 'uniform':
+        return lambda u: u
+    if curve == 'front_loaded':
+        # Most people arrive soon after doors open, tailing off exponentially
+        k = 4.0
+        scale = 1 - math.exp(-k)
+        return lambda u: -math.log(1 - u * scale) / k
+    if curve == 'peak':
+        # Triangular: ramps up to a peak at peak_at, then tails off
+        c = peak_at
+        return lambda u: math.sqrt(u * c) if u < c else 1 - math.sqrt((1 - u) * (1 - c))
+    raise ValueError(f"arrival_curve must be one of {ARRIVAL_CURVES}")
+
+
+def _sorted_uniforms(n: int, rng: random.Random) -> Iterator[float]:
+    """n sorted uniforms in one pass, O(1) memory (order-statistics trick)."""
+    current = 0.0
+    for remaining in range(n, 0, -1):
+        current = 1 - (1 - current) * rng.random() ** (1 / remaining)
+        yield current
+
+
+# ===========================================================================
+# SCAN STREAM
+# ===========================================================================
+
+def generate_scan_stream(n_tickets: int = 1_000_000, seed: int = 42,
+                         gates: Sequence[str] = ('A', 'B', 'C', 'D'),
+                         start: str = '2025-09-30T10:00:00',
+                         duration_hours: float = 12.0,
+                         arrival_curve: str = 'peak', peak_at: float = 0.25,
+                         attendance_rate: float = 0.95,
+                         mean_dwell_minutes: float = 180.0,
+                         duplicate_entry_rate: float = 0.01,
+                         exit_without_entry_rate: float = 0.002,
+                         rapid_reentry_rate: float = 0.02,
+                         output: str = 'json') -> Iterator:
+    """
+    Stream a realistic, time-ordered scan log.
+
+    Args:
+        n_tickets: Tickets sold (ids T000..)
+        seed: Same seed + same arguments -> byte-identical stream
+        gates: Gate names; each person uses a random gate per scan
+        start: ISO timestamp doors open
+        duration_hours: Event length; people still inside at the end never exit
+        arrival_curve: 'uniform', 'front_loaded' or 'peak'
+        peak_at: For 'peak', fraction of the event where arrivals peak
+        attendance_rate: Fraction of tickets that turn up at all
+        mean_dwell_minutes: Mean (exponential) time inside per visit
+        duplicate_entry_rate: Chance an attendee scans entry again while inside
+        exit_without_entry_rate: Chance an attendee's first scan is an exit
+        rapid_reentry_rate: Chance an exit is followed by re-entry within 5 min
+        output: 'json', 'dict', 'event' or 'binary'
+
+    Yields:
+        One scan per item, in timestamp order, in the chosen format.
+    """
+    if output not in ('json', 'dict', 'event', 'binary'):
+        raise ValueError("output must be 'json', 'dict', 'event' or 'binary'")
+
+    rng = random.Random(seed)
+    start_epoch = to_epoch(start)
+    duration = int(duration_hours * 3600)
+    end_epoch = start_epoch + duration
+    to_fraction = _inverse_cdf(arrival_curve, peak_at)
+    n_gates = len(gates)
+    mean_dwell = mean_dwell_minutes * 60
+    emit = _emitter(output, gates, n_tickets)
+    ticket_at = _arrival_order(n_tickets, rng)
+
+    pending = []   # heap of (epoch, seq, ticket_index, kind)
+    seq = 0
+
+    def schedule_visit(ticket: int, entered_at: int):
+        nonlocal seq
+        if rng.random() < duplicate_entry_rate:
+            seq += 1
+            heapq.heappush(pending, (entered_at + rng.randint(60, 1800), seq, ticket, _DUPLICATE))
+        seq += 1
+        dwell = max(60, int(rng.expovariate(1 / mean_dwell)))
+        heapq.heappush(pending, (entered_at + dwell, seq, ticket, _EXIT))
+
+    def drain(until: int):
+        nonlocal seq
+        while pending and pending[0][0] <= until:
+            epoch, _, ticket, kind = heapq.heappop(pending)
+            scan_type = 1 if kind == _EXIT else 0
+            yield emit(ticket, rng.randrange(n_gates), scan_type, epoch)
+            if kind == _EXIT and rng.random() < rapid_reentry_rate:
+                seq += 1
+                heapq.heappush(pending, (epoch + rng.randint(30, RAPID_REENTRY_SECONDS - 1),
+                                         seq, ticket, _REENTRY))
+            elif kind == _REENTRY:
+                schedule_visit(ticket, epoch)
+
+    # One arrival slot per ticket sold; no-shows just leave their slot empty
+    for i, u in enumerate(_sorted_uniforms(n_tickets, rng)):
+        if rng.random() >= attendance_rate:
+            continue
+        ticket = ticket_at(i)
+        arrival = start_epoch + int(to_fraction(u) * duration)
+        yield from drain(arrival)
+
+        if rng.random() < exit_without_entry_rate:
+            yield emit(ticket, rng.randrange(n_gates), 1, arrival)
+            continue
+        yield emit(ticket, rng.randrange(n_gates), 0, arrival)
+        schedule_visit(ticket, arrival)
+
+    # Whoever is still inside at end_epoch never scans out
+    yield from drain(end_epoch)
+
+
+def _arrival_order(n: int, rng: random.Random):
+    """
+    A seeded permutation of ticket indexes without a list of n ints:
+    i -> (a*i + b) % n is a bijection whenever gcd(a, n) == 1.
+    """
+    if n <= 1:
+        return lambda i: i
+    a = rng.randrange(1, n)
+    while math.gcd(a, n) != 1:
+        a = rng.randrange(1, n)
+    b = rng.randrange(n)
+    return lambda i: (a * i + b) % n
+
+
+def _emitter(output: str, gates: Sequence[str], n_tickets: int):
+    """Build the per-event formatter once, so the hot loop has no branching."""
+    width = max(3, len(str(n_tickets - 1)))
+    ticket_fmt = f'T%0{width}d'
+
+    if output == 'binary':
+        pack = BINARY_RECORD.pack
+        return lambda ticket, gate, scan_type, epoch: pack(ticket, gate, scan_type, epoch)
+
+    iso = _IsoFormatter()
+
+    if output == 'json':
+        template = '{"ticket_id": "%s", "gate": "%s", "timestamp": "%s", "scan_type": "%s"}'
+        return lambda ticket, gate, scan_type, epoch: template % (
+            ticket_fmt % ticket, gates[gate], iso(epoch), SCAN_TYPES[scan_type])
+
+    if output == 'dict':
+        return lambda ticket, gate, scan_type, epoch: {
+            'ticket_id': ticket_fmt % ticket, 'gate': gates[gate],
+            'timestamp': iso(epoch), 'scan_type': SCAN_TYPES[scan_type]}
+
+    return lambda ticket, gate, scan_type, epoch: ScanEvent(
+        ticket_fmt % ticket, gates[gate], iso(epoch), SCAN_TYPES[scan_type])
+
+
+class _IsoFormatter:
+    """epoch -> 'YYYY-MM-DDTHH:MM:SS', formatting each minute prefix once."""
+
+    def __init__(self):
+        self._minute = None
+        self._prefix = ''
+
+    def __call__(self, epoch: int) -> str:
+        minute = epoch // 60
+        if minute != self._minute:
+            self._minute = minute
+            self._prefix = from_epoch(minute * 60)[:17]
+        return '%s%02d' % (self._prefix, epoch % 60)
+
+
+def write_scan_log(path: str, output: str = 'json', **kwargs) -> int:
+    """
+    Stream a generated log straight to disk. Returns the number of scans.
+
+    'json' writes newline-delimited JSON; 'binary' writes packed records
+    plus the binary_scan_log sidecar files.
+    """
+    count = 0
+    if output == 'binary':
+        with open(path, 'wb', buffering=1 << 20) as f:
+            for record in generate_scan_stream(output='binary', **kwargs):
+                f.write(record)
+                count += 1
+        # Sidecars so binary_scan_log.BinaryScanLog can read it directly
+        from binary_scan_log import write_sidecars
+        defaults = inspect.signature(generate_scan_stream).parameters
+        n_tickets = kwargs.get('n_tickets', defaults['n_tickets'].default)
+        gates = kwargs.get('gates', defaults['gates'].default)
+        write_sidecars(path, gates, (ticket_id_for(i, n_tickets) for i in range(n_tickets)), count)
+    else:
+        with open(path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            for line in generate_scan_stream(output='json', **kwargs):
+                f.write(line)
+                f.write('\n')
+                count += 1
+    return count
+
+
+if __name__ == "__main__":
+    # Usage: python scan_generator.py [n_tickets] [output_path]
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    if len(sys.argv) > 2:
+        written = write_scan_log(sys.argv[2], n_tickets=n)
+        print(f"Wrote {written:,} scans for {n:,} tickets to {sys.argv[2]}")
+    else:
+        for line in generate_scan_stream(n_tickets=n, duplicate_entry_rate=0.2,
+                                         rapid_reentry_rate=0.2, mean_dwell_minutes=60):
+            print(line)
@@ -0,0 +1,324 @@
+# asyncio Scan-Ingestion Server
+# =============================
+# parse_scan_event() in archive/occupancy_db_learning2.py talks about gate
+# scanners POSTing JSON to an API - this is the thing on the other end.
+#
+# Scanners open a TCP connection and write newline-delimited JSON scans.
+# Incoming lines go onto a BOUNDED asyncio.Queue; a single batcher task pulls
+# them off in micro-batches (up to batch_size lines, or whatever arrived
+# within batch_interval seconds) and hands each batch to the occupancy logic.
+#
+#   scanner ──┐                                 ┌─ batch ─> OccupancyTracker
+#   scanner ──┼─> readline ─> Queue(maxsize) ───┤
+#   scanner ──┘        ^                        └─ stats (throughput, depth)
+#                      └── await put() blocks when the queue is full
+#
+# Backpressure: when the consumer falls behind, the queue fills, put() waits,
+# we stop reading the socket, the kernel buffer fills and TCP flow control
+# slows the scanners down. Nothing is dropped and memory stays bounded.
+#
+# A line that isn't a scan - bad JSON, a missing field, a timestamp that
+# doesn't parse - is counted in bad_lines and dropped before it reaches the
+# reorder buffer or the consumer.
+#
+# A consumer that raises loses only its batch (counted in consumer_errors):
+# the batcher keeps draining, so a bad batch can't wedge the queue and stall
+# every scanner behind it. The server can't tell how far into the batch the
+# consumer got, so failed_events counts the WHOLE batch even if part of it
+# was applied before the error.
+#
+# Localhost only - the server refuses to bind anything but a loopback address
+# so it can be load-tested safely.
+
+import asyncio
+import ipaddress
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from occupancy_tracker import OccupancyTracker
+from scan_decoder import decode_scan
+from scan_reorder import ReorderBuffer
+from scan_timestamps import to_epoch
+
+
+_STOP = object()
+
+
+class ScanIngestServer:
+    """
+    Receive newline-delimited JSON scans over local TCP and feed them to the
+    occupancy logic in micro-batches.
+
+    Args:
+        tracker: OccupancyTracker to update (a fresh one if not given)
+        consumer: Called with each decoded batch (list of ScanEvents).
+            Defaults to tracker.ingest_many. May be a coroutine function.
+            If it raises, the whole batch is counted in failed_events and
+            skipped (any part it applied before raising stays applied).
+        host: Loopback address to bind (127.0.0.1 / ::1 / localhost)
+        port: TCP port, 0 picks a free one (see .port after start())
+        batch_size: Max lines per batch
+        batch_interval: Max seconds to wait filling a batch
+        max_queue: Queue bound - the backpressure threshold
+        max_lateness_seconds: If set, scans arriving up to this late are put
+            back in timestamp order before the consumer sees them
+
+    Example:
+        server = ScanIngestServer()
+        await server.start()
+        ...
+        await server.stop()   # drains everything already received
+        server.tracker.total_occupancy
+    """
+
+    def __init__(self, tracker: Optional[OccupancyTracker] = None,
+                 consumer: Optional[Callable] = None,
+                 host: str = '127.0.0.1', port: int = 0,
+                 batch_size: int = 500, batch_interval: float = 0.05,
+                 max_queue: int = 10_000, max_lateness_seconds: Optional[int] = None):
+        if not _is_loopback(host):
+            raise ValueError(f"Refusing to bind non-loopback host {host!r}")
+        self.tracker = tracker if tracker is not None else OccupancyTracker()
+        self.consumer = consumer if consumer is not None else self.tracker.ingest_many
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_queue = max_queue
+        self.reorder_buffer = (ReorderBuffer(max_lateness_seconds)
+                               if max_lateness_seconds is not None else None)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._batcher_task: Optional[asyncio.Task] = None
+        self._clients = set()
+
+        # Stats
+        self.lines_received = 0
+        self.events_processed = 0
+        self.bad_lines = 0
+        self.consumer_errors = 0
+        self.failed_events = 0
+        self.last_consumer_error: Optional[BaseException] = None
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.connections = 0
+        self._started_at = None
+
+    # -----------------------------------------------------------------------
+    # Lifecycle
+    # -----------------------------------------------------------------------
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._batcher_task = asyncio.create_task(self._batcher())
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started_at = time.perf_counter()
+
+    async def stop(self) -> None:
+        """Stop accepting, finish reading open connections, drain the queue."""
+        self._server.close()
+        await self._server.wait_closed()
+        if self._clients:
+            await asyncio.gather(*self._clients, return_exceptions=True)
+        await self._queue.put(_STOP)
+        await self._batcher_task
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # -----------------------------------------------------------------------
+    # Producer side - one task per scanner connection
+    # -----------------------------------------------------------------------
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._clients.add(task)
+        self.connections += 1
+        queue = self._queue
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                self.lines_received += 1
+                await queue.put(line.decode('utf-8', errors='replace'))   # backpressure point
+                depth = queue.qsize()
+                if depth > self.max_queue_depth:
+                    self.max_queue_depth = depth
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            self._clients.discard(task)
+
+    # -----------------------------------------------------------------------
+    # Consumer side - one batcher task
+    # -----------------------------------------------------------------------
+
+    async def _batcher(self) -> None:
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+
+        while True:
+            first = await queue.get()
+            if first is _STOP:
+                await self._flush_reorder_buffer()
+                return
+
+            batch = [first]
+            stopping = False
+            deadline = loop.time() + self.batch_interval
+
+            while len(batch) < self.batch_size:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._process(batch)
+            if stopping:
+                await self._flush_reorder_buffer()
+                return
+
+    async def _process(self, lines: List[str]) -> None:
+        scans = []
+        for line in lines:
+            try:
+                scan = decode_scan(line)
+                to_epoch(scan.timestamp)    # the reorder buffer and tracker need it
+            except (ValueError, KeyError, TypeError):
+                self.bad_lines += 1
+                continue
+            scans.append(scan)
+
+        if self.reorder_buffer is not None:
+            push = self.reorder_buffer.push
+            scans = [ready for scan in scans for ready in push(scan)]
+        await self._consume(scans)
+
+    async def _flush_reorder_buffer(self) -> None:
+        if self.reorder_buffer is not None and len(self.reorder_buffer):
+            await self._consume(self.reorder_buffer.flush())
+
+    async def _consume(self, scans: List) -> None:
+        try:
+            result = self.consumer(scans)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as error:
+            # Keep the batcher alive - a dead batcher means a full queue,
+            # blocked scanners and a stop() that never returns
+            self.consumer_errors += 1
+            self.failed_events += len(scans)
+            self.last_consumer_error = error
+            return
+
+        self.batches += 1
+        self.events_processed += len(scans)
+
+    # -----------------------------------------------------------------------
+    # Stats
+    # -----------------------------------------------------------------------
+
+    def stats(self) -> Dict:
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            'lines_received': self.lines_received,
+            'events_processed': self.events_processed,
+            'bad_lines': self.bad_lines,
+            'consumer_errors': self.consumer_errors,
+            'failed_events': self.failed_events,
+            'batches': self.batches,
+            'avg_batch_size': round(self.events_processed / self.batches, 1) if self.batches else 0,
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'max_queue_depth': self.max_queue_depth,
+            'connections': self.connections,
+            'events_per_sec': round(self.events_processed / elapsed) if elapsed else 0,
+            'late_events': self.reorder_buffer.late_events if self.reorder_buffer else 0,
+        }
+
+
+def _is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+# ===========================================================================
+# LOAD-TEST CLIENT
+# ===========================================================================
+
+async def send_scans(lines, host: str = '127.0.0.1', port: int = 0, chunk: int = 1000) -> int:
+    """
+    Open one connection and write every line, newline-delimited.
+    drain() after each chunk means the client feels the server's backpressure.
+    """
+    _, writer = await asyncio.open_connection(host, port)
+    sent = 0
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= chunk:
+            writer.write(('\n'.join(buffer) + '\n').encode())
+            await writer.drain()
+            sent += len(buffer)
+            buffer = []
+    if buffer:
+        writer.write(('\n'.join(buffer) + '\n').encode())
+        sent += len(buffer)
+    await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+    return sent
+
+
+async def load_test(total_lines: int = 200_000, scanners: int = 8, **server_kwargs) -> Dict:
+    """Run a localhost load test: N scanner connections against one server."""
+    from scan_decoder import _generate_lines
+
+    lines = list(_generate_lines(total_lines))
+    per_scanner = (total_lines + scanners - 1) // scanners
+
+    async with ScanIngestServer(**server_kwargs) as server:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            send_scans(lines[i * per_scanner:(i + 1) * per_scanner], server.host, server.port)
+            for i in range(scanners)
+        ))
+    elapsed = time.perf_counter() - start
+
+    stats = server.stats()
+    stats['wall_time_s'] = round(elapsed, 3)
+    stats['end_to_end_events_per_sec'] = round(total_lines / elapsed)
+    return stats
+
+
+if __name__ == "__main__":
+    # Usage: python scan_ingest_server.py [total_lines] [scanners]
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    scanners = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    for key, value in asyncio.run(load_test(total, scanners)).items():
+        print(f"{key}: {value}")
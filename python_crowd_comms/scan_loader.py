@@ -0,0 +1,231 @@
+# Bulk Scan Loader
+# ================
+# populate_database() inserts one row per cursor.execute() - one round trip,
+# one statement parse and one index update per scan. Fine for 13 mock scans;
+# a 50M-scan historical log takes most of a day that way.
+#
+# load_scans() streams any scan source into the scans table in batches:
+#
+#   stream ──> batch of batch_size rows ──> Postgres: COPY scans FROM STDIN (CSV)
+#                                           SQLite:   executemany(INSERT ...)
+#              every commit_every rows  ──> COMMIT
+#
+# COPY sends a whole batch as one data stream - no per-row statement at all.
+# Memory is one batch, whatever the size of the log. Commits are spaced out so
+# a crash loses at most commit_every rows (the load can be re-run from there)
+# without paying a WAL flush per row.
+
+import csv
+import io
+import sys
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import query_cache
+from db_pool import ConnectionPool, get_pool
+from scan_decoder import to_scan_event
+
+
+SCAN_COLUMNS = ('ticket_id', 'gate', 'scan_type', 'scan_time')
+
+ScanRow = Tuple[str, str, str, str]
+
+
+def scan_rows(stream) -> Iterable[ScanRow]:
+    """(ticket_id, gate, scan_type, scan_time) per scan - JSON, dict or ScanEvent."""
+    for event in stream:
+        scan = to_scan_event(event)
+        yield scan.ticket_id, scan.gate, scan.scan_type, scan.timestamp
+
+
+def _copy_batch(cursor, table: str, columns: Sequence[str], rows: List[tuple]) -> None:
+    """Postgres: one COPY per batch, rows as CSV so any value is quoted safely."""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _insert_batch(cursor, table: str, columns: Sequence[str], rows: List[tuple],
+                  placeholder: str) -> None:
+    """Anything else (SQLite stand-in): one executemany per batch."""
+    marks = ', '.join([placeholder] * len(columns))
+    cursor.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({marks})", rows)
+
+
+def load_rows(rows: Iterable[tuple], table: str, columns: Sequence[str],
+              pool: Optional[ConnectionPool] = None, batch_size: int = 10_000,
+              commit_every: int = 100_000,
+              progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Stream tuples into any table in batches (COPY on Postgres, executemany
+    otherwise). load_scans() is this plus scan decoding; the benchmarks use
+    it for users and tickets too.
+
+    Args:
+        rows: Iterable of tuples in `columns` order
+        table, columns: Target
+        pool: Connection pool (default: the shared db_pool pool)
+        batch_size: Rows per COPY / executemany
+        commit_every: Rows per transaction (rounded up to whole batches)
+        progress: Called with the running stats after every commit
+
+    Returns:
+        {'rows': n, 'batches': b, 'commits': c, 'seconds': t, 'rows_per_sec': r}
+    """
+    if batch_size < 1 or commit_every < 1:
+        raise ValueError("batch_size and commit_every must be positive")
+    pool = pool or get_pool()
+    use_copy = pool.dialect == 'postgres'
+
+    stats = {'rows': 0, 'batches': 0, 'commits': 0, 'seconds': 0.0, 'rows_per_sec': 0}
+    start = time.perf_counter()
+
+    def report():
+        stats['seconds'] = round(time.perf_counter() - start, 3)
+        stats['rows_per_sec'] = round(stats['rows'] / stats['seconds']) if stats['seconds'] else 0
+
+    with pool.connection() as connection:
+        cursor = connection.cursor()
+        uncommitted = 0
+        batch: List[tuple] = []
+
+        def flush():
+            nonlocal uncommitted
+            if use_copy:
+                _copy_batch(cursor, table, columns, batch)
+            else:
+                _insert_batch(cursor, table, columns, batch, pool.placeholder)
+            stats['rows'] += len(batch)
+            stats['batches'] += 1
+            uncommitted += len(batch)
+            batch.clear()
+            if uncommitted >= commit_every:
+                connection.commit()
+                stats['commits'] += 1
+                uncommitted = 0
+                if progress is not None:
+                    report()
+                    progress(dict(stats))
+
+        try:
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    flush()
+            if batch:
+                flush()
+        finally:
+            cursor.close()
+        if uncommitted:
+            stats['commits'] += 1      # the pool commits the tail on exit
+
+    report()
+    return stats
+
+
+def load_scans(stream, pool: Optional[ConnectionPool] = None, batch_size: int = 10_000,
+               commit_every: int = 100_000, table: str = 'scans',
+               progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Stream scans into the scans table in batches. Every commit invalidates
+    the query cache (query_cache.py), so cached reads never miss a batch.
+
+    Args:
+        stream: Any iterable of scans (JSON lines, dicts or ScanEvents)
+        pool, batch_size, commit_every, progress: See load_rows()
+        table: Target table
+
+    Returns:
+        {'rows': n, 'batches': b, 'commits': c, 'seconds': t, 'rows_per_sec': r}
+    """
+    def committed(stats: Dict) -> None:
+        query_cache.invalidate()
+        if progress is not None:
+            progress(stats)
+
+    try:
+        return load_rows(scan_rows(stream), table, SCAN_COLUMNS, pool,
+                         batch_size, commit_every, committed)
+    finally:
+        query_cache.invalidate()       # the final commit (or a partial load)
+
+
+def load_generated_event(n_tickets: int, pool: Optional[ConnectionPool] = None,
+                         seed: int = 42, **stream_kwargs) -> Dict:
+    """
+    Fill users, tickets and scans (schema from setup_database()) with a
+    scan_generator event - the data set for the SQL benchmarks.
+
+    Returns:
+        {'users': n, 'tickets': n, 'scans': n, 'seconds': t}
+    """
+    from scan_generator import generate_scan_stream, generate_tickets
+
+    start = time.perf_counter()
+    user_ids = sorted({t['user_id'] for t in generate_tickets(n_tickets, seed)})
+    users = load_rows(((u, f'{u.lower()}@example.com', None, u) for u in user_ids),
+                      'users', ('user_id', 'email', 'phone', 'name'), pool)
+    tickets = load_rows(((t['ticket_id'], t['user_id'], t['ticket_type'], t['price'])
+                         for t in generate_tickets(n_tickets, seed)),
+                        'tickets', ('ticket_id', 'user_id', 'ticket_type', 'price'), pool)
+    scans = load_scans(generate_scan_stream(n_tickets=n_tickets, seed=seed, output='event',
+                                            **stream_kwargs), pool)
+    return {'users': users['rows'], 'tickets': tickets['rows'], 'scans': scans['rows'],
+            'seconds': round(time.perf_counter() - start, 1)}
+
+
+# ===========================================================================
+# BENCHMARK
+# ===========================================================================
+
+def benchmark(n_tickets: int = 200_000, dsn: Optional[str] = None,
+              batch_size: int = 10_000) -> Dict:
+    """
+    Row-by-row inserts (the populate_database() pattern) vs load_scans(), into
+    a temp table on one pooled connection: Postgres if dsn is given, else
+    in-memory SQLite.
+
+    On SQLite there's no round trip per statement, so the two are close; the
+    gap this loader exists for is on Postgres, where every execute() is a
+    network round trip and COPY replaces them all.
+    """
+    from scan_generator import generate_scan_stream
+
+    events = list(generate_scan_stream(n_tickets=n_tickets, output='event'))
+    if dsn:
+        pool = ConnectionPool.from_dsn(dsn, min_size=1, max_size=1)
+    else:
+        pool = ConnectionPool.sqlite(':memory:', min_size=1, max_size=1)
+    mark = pool.placeholder
+
+    results = {'rows': len(events)}
+    for table in ('scans_row_by_row', 'scans_bulk'):
+        with pool.cursor() as cursor:
+            cursor.execute(f"CREATE TEMP TABLE {table} (ticket_id VARCHAR(10), gate VARCHAR(1), "
+                           f"scan_type VARCHAR(5), scan_time TIMESTAMP)")
+            cursor.execute(f"CREATE INDEX idx_{table} ON {table}(ticket_id, scan_time)")
+
+    start = time.perf_counter()
+    with pool.cursor() as cursor:
+        for row in scan_rows(events):
+            cursor.execute(f"INSERT INTO scans_row_by_row ({', '.join(SCAN_COLUMNS)}) "
+                           f"VALUES ({mark}, {mark}, {mark}, {mark})", row)
+    row_seconds = time.perf_counter() - start
+    results['row_by_row_rows_per_sec'] = round(len(events) / row_seconds)
+
+    bulk = load_scans(events, pool, batch_size=batch_size, table='scans_bulk')
+    results['bulk_rows_per_sec'] = bulk['rows_per_sec']
+    results['speedup'] = round(bulk['rows_per_sec'] * row_seconds / len(events), 1)
+    pool.close()
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python scan_loader.py [n_tickets] [postgres_dsn]
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    target = sys.argv[2] if len(sys.argv) > 2 else None
+    for key, value in benchmark(n, target).items():
+        print(f"{key}: {value}")
@@ -0,0 +1,161 @@
+# Watermarked Reorder Buffer
+# ==========================
+# get_occupancy_at_time() stops at the first scan past the target time. That
+# early exit is only correct if the stream is in timestamp order - and it
+# isn't when a scanner uploads a batch late, or gates interleave:
+#
+#   arrival order:  A 11:29:50   B 11:29:58   A 11:30:05   C 11:29:55 (late batch)
+#                                             ^ break here - C's entry is lost
+#
+# ReorderBuffer holds scans in a min-heap keyed by timestamp and only releases
+# a scan once the WATERMARK has passed it:
+#
+#   watermark = newest timestamp seen - max_lateness_seconds
+#
+# Anything up to max_lateness_seconds late is put back in order. Anything
+# later than that (older than a scan we've already released) can't be placed
+# without breaking order, so it's dropped and counted in late_events.
+#
+# Memory is bounded by max_buffered: if the heap is full the oldest scan is
+# released early (counted in forced_releases) rather than growing forever.
+
+import heapq
+from typing import Callable, Iterator, List, Optional
+
+from scan_decoder import to_scan_event
+from scan_timestamps import to_epoch
+
+
+class ReorderBuffer:
+    """
+    Put a slightly out-of-order scan stream back into timestamp order.
+
+    Args:
+        max_lateness_seconds: How late a scan may arrive and still be placed
+        max_buffered: Heap size limit (memory bound)
+        on_late: Optional callback for scans dropped as too late
+
+    Items come out exactly as they went in (JSON string, dict or ScanEvent),
+    so the buffer can sit in front of any consumer. Scans with equal
+    timestamps keep their arrival order.
+
+    Example:
+        >>> buffer = ReorderBuffer(max_lateness_seconds=30)
+        >>> for line in incoming:
+        ...     for scan in buffer.push(line):
+        ...         tracker.ingest(scan)
+        >>> tracker.ingest_many(buffer.flush())
+    """
+
+    def __init__(self, max_lateness_seconds: int = 30, max_buffered: int = 100_000,
+                 on_late: Optional[Callable] = None):
+        if max_lateness_seconds < 0 or max_buffered < 1:
+            raise ValueError("max_lateness_seconds must be >= 0 and max_buffered >= 1")
+        self.max_lateness_seconds = max_lateness_seconds
+        self.max_buffered = max_buffered
+        self.on_late = on_late
+
+        self._heap = []
+        self._seq = 0
+        self.newest = None          # newest timestamp seen (epoch)
+        self.last_released = None   # timestamp of the last scan released
+
+        # Stats
+        self.late_events = 0
+        self.forced_releases = 0
+        self.max_depth = 0
+
+    @property
+    def watermark(self) -> Optional[int]:
+        """Scans at or before this epoch are safe to release."""
+        if self.newest is None:
+            return None
+        return self.newest - self.max_lateness_seconds
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, event) -> List:
+        """Add one scan. Returns the scans that are now ready, in order."""
+        epoch = to_epoch(to_scan_event(event).timestamp)
+
+        if self.last_released is not None and epoch < self.last_released:
+            self.late_events += 1
+            if self.on_late is not None:
+                self.on_late(event)
+            return []
+
+        self._seq += 1
+        heapq.heappush(self._heap, (epoch, self._seq, event))
+        if self.newest is None or epoch > self.newest:
+            self.newest = epoch
+        if len(self._heap) > self.max_depth:
+            self.max_depth = len(self._heap)
+
+        ready = []
+        heap = self._heap
+        watermark = self.newest - self.max_lateness_seconds
+        while heap and heap[0][0] <= watermark:
+            ready.append(self._release())
+        while len(heap) > self.max_buffered:
+            self.forced_releases += 1
+            ready.append(self._release())
+        return ready
+
+    def flush(self) -> List:
+        """Release everything still buffered (end of stream)."""
+        ready = []
+        while self._heap:
+            ready.append(self._release())
+        return ready
+
+    def _release(self):
+        epoch, _, event = heapq.heappop(self._heap)
+        self.last_released = epoch
+        return event
+
+    def stats(self):
+        return {
+            'buffered': len(self._heap),
+            'max_depth': self.max_depth,
+            'late_events': self.late_events,
+            'forced_releases': self.forced_releases,
+            'watermark': self.watermark,
+        }
+
+
+def reorder(stream, max_lateness_seconds: int = 30, max_buffered: int = 100_000,
+            buffer: Optional[ReorderBuffer] = None) -> Iterator:
+    """
+    Generator version: wrap any scan stream so it comes out in time order.
+
+    Pass your own buffer= to read its late_events / stats afterwards.
+
+    Example:
+        >>> get_occupancy_at_time(reorder(scanner_feed(), 60), '2025-09-30T11:30:00')
+    """
+    if buffer is None:
+        buffer = ReorderBuffer(max_lateness_seconds, max_buffered)
+    push = buffer.push
+    for event in stream:
+        ready = push(event)
+        if ready:
+            yield from ready
+    yield from buffer.flush()
+
+
+# ===========================================================================
+# TEST RUNNER
+# ===========================================================================
+
+if __name__ == "__main__":
+    from python_occupancy_practice import get_occupancy_at_time, mock_scan_stream
+
+    # Swap two neighbouring scans to simulate a late gate upload
+    events = list(mock_scan_stream())
+    events[4], events[5] = events[5], events[4]
+
+    buffer = ReorderBuffer(max_lateness_seconds=3600)
+    print("Raw:      ", get_occupancy_at_time(iter(events), '2025-09-30T10:30:00'))
+    print("Reordered:", get_occupancy_at_time(reorder(events, buffer=buffer), '2025-09-30T10:30:00'))
+    print("Stats:    ", buffer.stats())
@@ -0,0 +1,79 @@
+# Integer Epoch Timestamps
+# ========================
+# Turn scanner ISO timestamps ('2025-09-30T10:00:00') into plain int epoch
+# seconds, so time comparisons and the 5-minute re-entry rule are int maths
+# instead of datetime object construction.
+#
+# Trick: scans arrive in time order, so thousands of consecutive events share
+# the same 'YYYY-MM-DDTHH:MM' prefix. We parse that prefix ONCE, cache its epoch
+# value, and for every other event only parse the two seconds digits:
+#
+#   '2025-09-30T10:00:07'
+#    |-- cached prefix --|07  ->  _prefix_cache['2025-09-30T10:00'] + 7
+#
+# Naive timestamps (like the ones in mock_scan_stream) are treated as UTC.
+# Anything unusual (timezone offsets, fractional seconds) falls back to
+# datetime.fromisoformat - fractional seconds are truncated.
+
+import calendar
+from datetime import datetime, timezone
+from typing import Dict
+
+
+RAPID_REENTRY_SECONDS = 5 * 60
+
+# Minute prefixes are only 1440/day, but cap it so a multi-year replay
+# can't grow the cache forever.
+MAX_CACHED_PREFIXES = 100_000
+
+_prefix_cache: Dict[str, int] = {}
+
+
+def to_epoch(timestamp: str) -> int:
+    """
+    Convert an ISO timestamp string to integer epoch seconds.
+
+    Args:
+        timestamp: e.g. '2025-09-30T10:00:00' (or '2025-09-30 10:00:00')
+
+    Returns:
+        int: seconds since 1970-01-01T00:00:00 UTC
+
+    Example:
+        >>> to_epoch('2025-09-30T10:00:05') - to_epoch('2025-09-30T10:00:00')
+        5
+    """
+    if len(timestamp) == 19 and timestamp[16] == ':':
+        base = _prefix_cache.get(timestamp[:16])
+        if base is None:
+            base = _cache_prefix(timestamp[:16])
+        seconds = timestamp[17:]
+        # Two ASCII digits only - anything else gets the same checks as datetime
+        if seconds.isascii() and seconds.isdigit() and seconds < '60':
+            return base + int(seconds)
+    return _slow_to_epoch(timestamp)
+
+
+def _cache_prefix(prefix: str) -> int:
+    """Parse a 'YYYY-MM-DDTHH:MM' prefix once and remember it."""
+    if len(_prefix_cache) >= MAX_CACHED_PREFIXES:
+        _prefix_cache.clear()
+    base = calendar.timegm(datetime.fromisoformat(prefix).timetuple())
+    _prefix_cache[prefix] = base
+    return base
+
+
+def _slow_to_epoch(timestamp: str) -> int:
+    dt = datetime.fromisoformat(timestamp)
+    if dt.tzinfo is not None:
+        return int(dt.timestamp())
+    return calendar.timegm(dt.timetuple())
+
+
+def from_epoch(epoch: int) -> str:
+    """Back to a naive ISO string (for printing / API responses)."""
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def clear_prefix_cache() -> None:
+    _prefix_cache.clear()
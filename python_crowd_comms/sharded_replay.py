@@ -0,0 +1,227 @@
+# Sharded Parallel Replay
+# =======================
+# Occupancy state is independent per ticket: whether T001 is inside never
+# depends on T002's scans. So a huge scan log can be split by ticket_id,
+# replayed on every core at once, and the per-shard counters added together.
+#
+#   scan log ──hash(ticket_id) % N──┬── shard 0 ──> OccupancyTracker ──┐
+#                                   ├── shard 1 ──> OccupancyTracker ──┼── merge
+#                                   └── shard N ──> OccupancyTracker ──┘
+#
+# The one rule: ALL scans of a ticket must land in the same shard, in their
+# original order - hash partitioning guarantees both.
+#
+# We use zlib.crc32 rather than hash() because Python randomises str hashes
+# per process, and the split must be stable across runs.
+#
+# The partitioning pass is serial, so it must stay cheap or it caps the
+# speedup: it never decodes a scan. A JSON line gives up its ticket_id with one
+# str.split('"') (json.loads only for lines the split can't read), and the
+# lines stream straight into per-shard files - an iterable of events is
+# written out the same way instead of being collected in memory first.
+#
+# NOT shardable: capacity management (Q5). Whether an entry is rejected
+# depends on everyone else inside, so it needs the global order.
+
+import json
+import os
+import tempfile
+import zlib
+from collections import Counter
+from multiprocessing import Pool
+from typing import Dict, List, Optional
+
+from occupancy_tracker import OccupancyTracker
+from scan_decoder import decode_scan, to_scan_event
+
+
+def shard_for(ticket_id: str, shards: int) -> int:
+    """Stable shard number for a ticket."""
+    return zlib.crc32(ticket_id.encode()) % shards
+
+
+# ===========================================================================
+# WORKER SIDE
+# ===========================================================================
+
+_worker_ticket_types: Optional[Dict[str, str]] = None
+
+
+def _init_worker(ticket_types: Optional[Dict[str, str]]) -> None:
+    # Sent once per worker process, not once per shard
+    global _worker_ticket_types
+    _worker_ticket_types = ticket_types
+
+
+def _summarise(tracker: OccupancyTracker) -> Dict:
+    """Everything the merge step needs, as plain picklable types."""
+    return {
+        'total_occupancy': tracker.total_occupancy,
+        'by_gate': Counter(tracker.by_gate),
+        'by_ticket_type': Counter(tracker.by_ticket_type),
+        'total_entries': tracker.total_entries,
+        'total_exits': tracker.total_exits,
+        'duplicate_entries': tracker.duplicate_entries,
+        'exit_without_entry': tracker.exit_without_entry,
+        'rapid_reentry': tracker.rapid_reentry,
+        'scans_per_gate': tracker.scans_per_gate,
+        'entries_by_type': tracker.entries_by_type,
+    }
+
+
+def _replay_events(events) -> Dict:
+    tracker = OccupancyTracker(ticket_types=_worker_ticket_types)
+    tracker.ingest_many(events)
+    return _summarise(tracker)
+
+
+def _replay_file(path: str) -> Dict:
+    tracker = OccupancyTracker(ticket_types=_worker_ticket_types)
+    with open(path, encoding='utf-8') as f:
+        # Strip the newline: decode_scan's fast path only takes the bare line
+        tracker.ingest_many(line.rstrip('\n') for line in f if line.strip())
+    return _summarise(tracker)
+
+
+# ===========================================================================
+# MERGE
+# ===========================================================================
+
+def merge_shard_results(results: List[Dict]) -> Dict:
+    """
+    Combine per-shard summaries. Counts add, anomaly sets union.
+
+    Returns:
+        Same keys as track_occupancy_with_details() plus the anomaly sets
+        and scan-pattern Counters.
+    """
+    by_gate = Counter()
+    by_ticket_type = Counter()
+    scans_per_gate = Counter()
+    entries_by_type = Counter()
+    merged = {
+        'total_occupancy': 0,
+        'total_entries': 0,
+        'total_exits': 0,
+        'duplicate_entries': set(),
+        'exit_without_entry': set(),
+        'rapid_reentry': set(),
+    }
+
+    for result in results:
+        merged['total_occupancy'] += result['total_occupancy']
+        merged['total_entries'] += result['total_entries']
+        merged['total_exits'] += result['total_exits']
+        merged['duplicate_entries'] |= result['duplicate_entries']
+        merged['exit_without_entry'] |= result['exit_without_entry']
+        merged['rapid_reentry'] |= result['rapid_reentry']
+        by_gate.update(result['by_gate'])
+        by_ticket_type.update(result['by_ticket_type'])
+        scans_per_gate.update(result['scans_per_gate'])
+        entries_by_type.update(result['entries_by_type'])
+
+    merged['by_gate'] = {gate: count for gate, count in by_gate.items() if count}
+    merged['by_ticket_type'] = {t: count for t, count in by_ticket_type.items() if count}
+    merged['scans_per_gate'] = scans_per_gate
+    merged['entries_by_type'] = entries_by_type
+    return merged
+
+
+# ===========================================================================
+# PARTITION + RUN
+# ===========================================================================
+
+def replay_sharded(source, processes: Optional[int] = None, shards: Optional[int] = None,
+                   ticket_types: Optional[Dict[str, str]] = None) -> Dict:
+    """
+    Replay a scan log across a process pool, partitioned by ticket_id.
+
+    Args:
+        source: Path to a JSON-lines scan log, or any iterable of scan events
+        processes: Worker processes (default: os.cpu_count()). 1 replays
+            inline in one pass, without partitioning.
+        shards: Number of partitions (default: same as processes)
+        ticket_types: ticket_id -> ticket_type lookup (default: mock tickets)
+
+    Returns:
+        Merged metrics - see merge_shard_results()
+
+    Example:
+        >>> replay_sharded('festival_weekend.jsonl', processes=32)['total_occupancy']
+    """
+    processes = processes or os.cpu_count() or 1
+    shards = shards or processes
+    is_file = isinstance(source, (str, os.PathLike))
+
+    if processes == 1:
+        return _run(_replay_file if is_file else _replay_events, [source], 1, ticket_types)
+
+    with tempfile.TemporaryDirectory(prefix='scan_shards_') as shard_dir:
+        if is_file:
+            with open(source, encoding='utf-8') as f:
+                paths = _write_shards((line.rstrip('\n') for line in f if line.strip()),
+                                      shards, shard_dir)
+        else:
+            paths = _write_shards(map(_event_line, source), shards, shard_dir)
+        return _run(_replay_file, paths, processes, ticket_types)
+
+
+def _ticket_id(line: str) -> str:
+    """ticket_id of a JSON scan line, without decoding the rest of it."""
+    # '{"ticket_id": "T001", ...' -> ['{', 'ticket_id', ': ', 'T001', ...]
+    parts = line.split('"', 4)
+    if (len(parts) == 5 and parts[1] == 'ticket_id' and parts[2].strip() == ':'
+            and '\\' not in parts[3]):
+        return parts[3]
+    return decode_scan(line).ticket_id      # other key order, escapes
+
+
+def _event_line(event) -> str:
+    """An event as one JSON line - strings pass through untouched."""
+    if isinstance(event, str):
+        return event.rstrip('\n')
+    scan = to_scan_event(event)
+    fields = {'ticket_id': scan.ticket_id, 'gate': scan.gate,
+              'timestamp': scan.timestamp, 'scan_type': scan.scan_type}
+    if scan.user_id is not None:
+        fields['user_id'] = scan.user_id
+    return json.dumps(fields)
+
+
+def _write_shards(lines, shards: int, shard_dir: str) -> List[str]:
+    """
+    Stream JSON lines into one file per shard. Only ticket_id is needed here,
+    so the parent does a cheap split and leaves the decoding to the workers.
+    """
+    paths = [os.path.join(shard_dir, f'shard_{i:03d}.jsonl') for i in range(shards)]
+    outputs = [open(p, 'w', encoding='utf-8', buffering=1 << 20) for p in paths]
+    writers = [out.write for out in outputs]
+    crc32 = zlib.crc32
+    try:
+        for line in lines:
+            writers[crc32(_ticket_id(line).encode()) % shards](line + '\n')
+    finally:
+        for out in outputs:
+            out.close()
+    return paths
+
+
+def _run(worker, jobs, processes: int, ticket_types) -> Dict:
+    if processes == 1:
+        _init_worker(ticket_types)
+        return merge_shard_results([worker(job) for job in jobs])
+
+    with Pool(processes, initializer=_init_worker, initargs=(ticket_types,)) as pool:
+        return merge_shard_results(pool.map(worker, jobs, chunksize=1))
+
+
+# ===========================================================================
+# TEST RUNNER
+# ===========================================================================
+
+if __name__ == "__main__":
+    from python_occupancy_practice import mock_scan_stream
+
+    result = replay_sharded(mock_scan_stream(), processes=4)
+    for key, value in result.items():
+        print(f"{key}: {value}")
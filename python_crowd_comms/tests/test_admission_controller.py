@@ -0,0 +1,89 @@
+"""
+Pytest tests for the turnstile admission controller
+===================================================
+Run with: pytest tests/test_admission_controller.py -v
+"""
+
+from admission_controller import (
+    ADMITTED, ALREADY_INSIDE, AT_CAPACITY, EXIT_WITHOUT_ENTRY, EXITED, VIP_OVERRIDE,
+    AdmissionController, latency_benchmark,
+)
+from occupancy_tracker import OccupancyTracker
+from python_occupancy_practice import mock_scan_stream
+from scan_generator import generate_scan_stream, ticket_type_lookup
+
+
+def _scan(ticket_id, scan_type='entry'):
+    return {'ticket_id': ticket_id, 'gate': 'A', 'timestamp': '2025-09-30T10:00:00',
+            'scan_type': scan_type}
+
+
+def test_decisions_follow_capacity_rules():
+    # T001 and T005 are VIP in the mock tickets
+    gate = AdmissionController(max_capacity=2)
+
+    assert gate.decide(_scan('T002')) is ADMITTED
+    assert gate.decide(_scan('T002')) is ALREADY_INSIDE
+    assert gate.decide(_scan('T003')) is ADMITTED
+    assert gate.decide(_scan('T004')) is AT_CAPACITY
+    assert gate.decide(_scan('T001')) is VIP_OVERRIDE
+    assert gate.decide(_scan('T006', 'exit')) is EXIT_WITHOUT_ENTRY
+    assert gate.decide(_scan('T002', 'exit')) is EXITED
+    assert gate.occupancy == 2
+
+
+def test_denied_ticket_can_retry_when_there_is_room():
+    gate = AdmissionController(max_capacity=1)
+
+    assert gate.decide(_scan('T002')) is ADMITTED
+    assert gate.decide(_scan('T003')) is AT_CAPACITY
+    assert gate.decide(_scan('T003')) is AT_CAPACITY
+    assert gate.would_be_occupancy == 2
+    assert gate.decide(_scan('T002', 'exit')) is EXITED
+    assert gate.occupancy == 0
+
+    assert gate.decide(_scan('T003')) is ADMITTED
+    assert gate.decide(_scan('T003')) is ALREADY_INSIDE
+    assert gate.counters()['rejected_count'] == 2
+    assert gate.would_be_occupancy == 1
+
+
+def test_counters_match_occupancy_tracker_on_mock_stream():
+    gate = AdmissionController(max_capacity=6)
+    for scan in mock_scan_stream():
+        gate.decide(scan)
+
+    tracker = OccupancyTracker(max_capacity=6)
+    tracker.ingest_many(mock_scan_stream())
+    expected = tracker.capacity()
+    expected['rejected_count'] = len(expected.pop('rejected_entries'))
+
+    assert gate.counters() == expected
+
+
+def test_counters_match_occupancy_tracker_at_scale():
+    # No duplicate entries: the tracker's report treats a second entry of a
+    # turned-away ticket as a duplicate, the gate treats it as a retry
+    types = ticket_type_lookup(5_000, seed=9, vip_fraction=0.2)
+    gate = AdmissionController(types, max_capacity=500)
+    tracker = OccupancyTracker(types, max_capacity=500)
+    for scan in generate_scan_stream(n_tickets=5_000, seed=9, duplicate_entry_rate=0,
+                                     output='event'):
+        gate.decide(scan)
+        tracker.ingest(scan)
+
+    counters = gate.counters()
+    assert counters['rejected_count'] == len(tracker.rejected_entries) > 0
+    assert counters['vip_override_count'] == tracker.vip_override_count > 0
+    assert counters['final_occupancy'] == tracker.final_occupancy
+    assert counters['times_at_capacity'] == tracker.times_at_capacity
+
+
+def test_latency_harness_reports_percentiles():
+    result = latency_benchmark(rate=5_000, seconds=0.2)
+
+    assert result['scans'] == 1_000
+    assert result['decide_p50_us'] <= result['decide_p99_us'] <= result['decide_p999_us']
+    assert result['response_p50_us'] <= result['response_p99_us'] <= result['response_p999_us']
+    # Turnstiles time out after a few milliseconds
+    assert result['decide_p99_us'] < 2_000
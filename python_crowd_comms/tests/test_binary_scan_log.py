@@ -0,0 +1,78 @@
+"""
+Pytest tests for the binary scan log
+====================================
+Run with: pytest tests/test_binary_scan_log.py -v
+"""
+
+import json
+
+import pytest
+
+from binary_scan_log import RECORD, BinaryScanLog, convert_jsonl
+from python_occupancy_practice import count_current_occupancy, get_occupancy_at_time, mock_scan_stream
+from scan_generator import generate_scan_stream, write_scan_log
+
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def mock_log(tmp_path):
+    src = tmp_path / 'mock.jsonl'
+    src.write_text('\n'.join(mock_scan_stream()) + '\n')
+    dst = str(tmp_path / 'mock.bin')
+    assert convert_jsonl(str(src), dst) == 13
+    with BinaryScanLog(dst) as log:
+        yield log
+
+
+def test_round_trip_and_size(mock_log):
+    original = [json.loads(line) for line in mock_scan_stream()]
+
+    assert [scan._asdict() for scan in mock_log] == [dict(e, user_id=None) for e in original]
+    assert mock_log.records.nbytes == 13 * RECORD.size == 13 * 14
+
+
+def test_views_are_zero_copy(mock_log):
+    assert mock_log.epoch.base is not None
+    assert not mock_log.records.flags.owndata
+    assert mock_log.ticket[0] == 0 and mock_log.gate.max() == 2
+
+
+def test_vectorised_queries_match_python_on_mock_stream(mock_log):
+    assert mock_log.count_current_occupancy() == count_current_occupancy(mock_scan_stream()) == 4
+    for target in ('2025-09-30T09:00:00', '2025-09-30T10:05:00', '2025-09-30T11:30:00',
+                   '2025-09-30T13:00:00'):
+        assert mock_log.occupancy_at_time(target) == get_occupancy_at_time(mock_scan_stream(), target)
+    assert mock_log.gate_tallies() == {
+        'A': {'entry': 4, 'exit': 2, 'total': 6},
+        'B': {'entry': 3, 'exit': 1, 'total': 4},
+        'C': {'entry': 2, 'exit': 1, 'total': 3},
+    }
+
+
+def test_generated_binary_log_matches_json_functions(tmp_path):
+    kwargs = dict(n_tickets=5_000, seed=11, duplicate_entry_rate=0.05, exit_without_entry_rate=0.02)
+    path = str(tmp_path / 'gen.bin')
+    write_scan_log(path, output='binary', **kwargs)
+    lines = list(generate_scan_stream(**kwargs))
+
+    with BinaryScanLog(path) as log:
+        assert len(log) == len(lines)
+        assert log.count_current_occupancy() == count_current_occupancy(iter(lines))
+        assert log.occupancy_at_time('2025-09-30T14:00:00') == \
+            get_occupancy_at_time(iter(lines), '2025-09-30T14:00:00')
+
+
+def test_unsorted_log_uses_mask_not_early_exit(tmp_path):
+    events = [
+        {'ticket_id': 'T001', 'gate': 'A', 'timestamp': '2025-09-30T10:00:00', 'scan_type': 'entry'},
+        {'ticket_id': 'T002', 'gate': 'A', 'timestamp': '2025-09-30T12:00:00', 'scan_type': 'entry'},
+        {'ticket_id': 'T003', 'gate': 'B', 'timestamp': '2025-09-30T10:30:00', 'scan_type': 'entry'},
+    ]
+    src = tmp_path / 'late.jsonl'
+    src.write_text('\n'.join(json.dumps(e) for e in events) + '\n')
+    convert_jsonl(str(src), str(tmp_path / 'late.bin'))
+
+    with BinaryScanLog(str(tmp_path / 'late.bin')) as log:
+        assert log.occupancy_at_time('2025-09-30T11:00:00') == 2
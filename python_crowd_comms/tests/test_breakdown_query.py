@@ -0,0 +1,94 @@
+"""
+Pytest tests for breakdown_query.py
+===================================
+Run with: pytest tests/test_breakdown_query.py -v
+
+The Postgres comparison against get_detailed_breakdown_sql() runs when
+OCCUPANCY_TEST_DSN points at a scratch database (its tables get replaced).
+"""
+
+import os
+from collections import Counter
+
+import pytest
+
+import db_pool
+from breakdown_query import decode_breakdown, get_detailed_breakdown_single_sql
+from database_occupancy_learning import get_detailed_breakdown_sql
+from db_pool import ConnectionPool
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    from database_occupancy_learning import populate_database, setup_database
+
+    pool = db_pool.configure(pool=ConnectionPool.sqlite(str(tmp_path / 'occupancy.db')))
+    setup_database()
+    populate_database()
+    yield pool
+    db_pool.close_pool()
+
+
+def test_mock_data_breakdown(sqlite_db):
+    assert get_detailed_breakdown_single_sql() == {
+        'total_occupancy': 4,
+        'by_gate': {'A': 2, 'B': 1, 'C': 1},
+        'by_ticket_type': {'VIP': 1, 'General': 3},
+    }
+
+
+def test_generated_event_matches_last_scan_rule(sqlite_db):
+    from scan_generator import generate_scan_stream, ticket_type_lookup
+    from scan_loader import load_generated_event
+
+    with sqlite_db.cursor() as cursor:
+        for table in ('scans', 'tickets', 'users'):
+            cursor.execute(f"DELETE FROM {table}")
+    load_generated_event(2_000, sqlite_db)
+
+    # Reference: last scan per ticket by scan_time
+    last = {}
+    for scan in generate_scan_stream(n_tickets=2_000, output='event'):
+        if scan.ticket_id not in last or scan.timestamp >= last[scan.ticket_id].timestamp:
+            last[scan.ticket_id] = scan
+    inside = [s for s in last.values() if s.scan_type == 'entry']
+    types = ticket_type_lookup(2_000)
+
+    expected = {
+        'total_occupancy': len(inside),
+        'by_gate': dict(sorted(Counter(s.gate for s in inside).items())),
+        'by_ticket_type': dict(Counter(types[s.ticket_id] for s in inside)),
+    }
+
+    result = get_detailed_breakdown_single_sql()
+    assert result == expected
+    # by_gate comes back in gate order, like the three-query version
+    assert list(result['by_gate']) == list(expected['by_gate'])
+    assert get_detailed_breakdown_sql() == expected
+
+
+def test_decoder_handles_grouping_rows():
+    rows = [(1, 1, None, None, 5), (0, 1, 'B', None, 2), (0, 1, 'A', None, 3),
+            (1, 0, None, 'VIP', 1), (1, 0, None, 'General', 3), (1, 0, None, None, 1)]
+    assert decode_breakdown(rows) == {
+        'total_occupancy': 5,
+        'by_gate': {'A': 3, 'B': 2},
+        'by_ticket_type': {'VIP': 1, 'General': 3},
+    }
+    assert list(decode_breakdown(rows)['by_gate']) == ['A', 'B']
+    assert decode_breakdown([(1, 1, None, None, 0)])['total_occupancy'] == 0
+
+
+@pytest.mark.skipif(not os.environ.get('OCCUPANCY_TEST_DSN'),
+                    reason="set OCCUPANCY_TEST_DSN to compare against Postgres")
+def test_matches_three_query_version_on_postgres():
+    from database_occupancy_learning import (get_detailed_breakdown_sql, populate_database,
+                                             setup_database)
+
+    db_pool.configure(os.environ['OCCUPANCY_TEST_DSN'])
+    try:
+        setup_database()
+        populate_database()
+        assert get_detailed_breakdown_single_sql() == get_detailed_breakdown_sql()
+    finally:
+        db_pool.close_pool()
@@ -0,0 +1,68 @@
+"""
+Pytest tests for interned, bitset-based occupancy state
+=======================================================
+Run with: pytest tests/test_compact_occupancy.py -v
+"""
+
+from compact_occupancy import (
+    TicketInterner,
+    TicketBitset,
+    CompactInsideSet,
+    CompactAnomalyTracker,
+    memory_benchmark,
+)
+from occupancy_tracker import OccupancyTracker
+from python_occupancy_practice import mock_scan_stream
+
+
+def test_interner_assigns_dense_ids_and_survives_resize():
+    interner = TicketInterner()
+    ids = [interner.intern(f'T{i:05d}') for i in range(1000)]
+    assert ids == list(range(1000))
+    assert interner.intern('T00042') == 42
+    assert interner.lookup('T99999') == -1
+    assert interner.ticket(999) == 'T00999'
+
+
+def test_bitset_add_discard_count():
+    bits = TicketBitset()
+    assert bits.add(0) and bits.add(9) and bits.add(1000)
+    assert not bits.add(9)
+    assert bits.discard(0)
+    assert not bits.discard(0)
+    assert len(bits) == 2
+    assert list(bits) == [9, 1000]
+
+
+def test_compact_inside_set_behaves_like_set():
+    """Same add/discard/in/len behaviour as the set() pattern."""
+    compact = CompactInsideSet()
+    plain = set()
+    for i, op in enumerate(['add', 'add', 'discard', 'add', 'discard', 'discard']):
+        ticket_id = f'T00{i % 3}'
+        getattr(compact, op)(ticket_id)
+        getattr(plain, op)(ticket_id)
+        assert len(compact) == len(plain)
+        assert compact.to_set() == plain
+        assert (ticket_id in compact) == (ticket_id in plain)
+
+
+def test_compact_tracker_matches_occupancy_tracker():
+    events = list(mock_scan_stream()) + [
+        '{"ticket_id": "T001", "gate": "A", "timestamp": "2025-09-30T12:03:00", "scan_type": "entry"}',
+        '{"ticket_id": "T099", "gate": "A", "timestamp": "2025-09-30T12:10:00", "scan_type": "exit"}',
+    ]
+    compact = CompactAnomalyTracker()
+    compact.ingest_many(events)
+    reference = OccupancyTracker()
+    reference.ingest_many(events)
+
+    assert compact.total_occupancy == reference.total_occupancy
+    assert compact.inside.to_set() == set(reference.inside)
+    assert compact.anomalies() == reference.anomalies()
+
+
+def test_memory_benchmark_small():
+    """Compact state uses less memory even at a small scale."""
+    result = memory_benchmark(20_000)
+    assert result['compact_mb'] < result['set_dict_mb']
@@ -0,0 +1,91 @@
+"""
+Pytest tests for the lock-striped occupancy tracker
+===================================================
+Run with: pytest tests/test_concurrent_tracker.py -v
+"""
+
+import threading
+import zlib
+
+from concurrent_tracker import GlobalLockOccupancyTracker, StripedOccupancyTracker, stress_benchmark
+from occupancy_tracker import OccupancyTracker
+from python_occupancy_practice import mock_scan_stream
+from scan_generator import generate_scan_stream, ticket_type_lookup
+
+
+def _reference(events, ticket_types=None):
+    tracker = OccupancyTracker(ticket_types=ticket_types)
+    tracker.ingest_many(events)
+    expected = tracker.details()
+    expected.update(tracker.anomalies())
+    return expected
+
+
+def test_matches_occupancy_tracker_single_threaded():
+    striped = StripedOccupancyTracker(stripes=4)
+    striped.ingest_many(mock_scan_stream())
+    snapshot = striped.snapshot()
+
+    expected = _reference(mock_scan_stream())
+    assert {key: snapshot[key] for key in expected} == expected
+    assert snapshot['scans_per_gate'] == {'A': 6, 'B': 4, 'C': 3}
+
+
+def test_concurrent_ingest_matches_sequential():
+    types = ticket_type_lookup(20_000, seed=3)
+    events = list(generate_scan_stream(n_tickets=20_000, seed=3, output='event',
+                                       duplicate_entry_rate=0.05, rapid_reentry_rate=0.1))
+    per_thread = [[] for _ in range(8)]
+    for scan in events:
+        per_thread[zlib.crc32(scan.ticket_id.encode()) % 8].append(scan)
+
+    striped = StripedOccupancyTracker(stripes=16, ticket_types=types)
+    threads = [threading.Thread(target=striped.ingest_many, args=(chunk,)) for chunk in per_thread]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    snapshot = striped.snapshot()
+    expected = _reference(events, types)
+    assert {key: snapshot[key] for key in expected} == expected
+    assert sum(snapshot['scans_per_gate'].values()) == len(events)
+
+
+def test_snapshots_during_writes_are_internally_consistent():
+    """by_gate and by_ticket_type always sum to total_occupancy, mid-stream."""
+    types = ticket_type_lookup(10_000, seed=4)
+    events = list(generate_scan_stream(n_tickets=10_000, seed=4, output='event'))
+    tracker = StripedOccupancyTracker(stripes=8, ticket_types=types)
+    # Keep each ticket on one thread
+    halves = [[e for e in events if zlib.crc32(e.ticket_id.encode()) % 2 == i] for i in range(2)]
+    writers = [threading.Thread(target=tracker.ingest_many, args=(h,)) for h in halves]
+    for writer in writers:
+        writer.start()
+
+    checked = 0
+    while any(writer.is_alive() for writer in writers) or checked == 0:
+        snapshot = tracker.snapshot()
+        assert sum(snapshot['by_gate'].values()) == snapshot['total_occupancy']
+        assert sum(snapshot['by_ticket_type'].values()) == snapshot['total_occupancy']
+        assert snapshot['total_entries'] - snapshot['total_exits'] == snapshot['total_occupancy']
+        checked += 1
+    for writer in writers:
+        writer.join()
+
+
+def test_stress_benchmark_compares_both_trackers():
+    result = stress_benchmark(threads=4, n_tickets=5_000, stripes=8)
+
+    assert result['consistent']
+    assert result['striped_events_per_sec'] > 0
+    assert result['global_lock_events_per_sec'] > 0
+
+
+def test_global_lock_tracker_snapshot_has_same_shape():
+    striped = StripedOccupancyTracker()
+    single = GlobalLockOccupancyTracker()
+    striped.ingest_many(mock_scan_stream())
+    single.ingest_many(mock_scan_stream())
+
+    assert single.snapshot() == striped.snapshot()
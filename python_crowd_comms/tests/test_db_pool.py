@@ -0,0 +1,142 @@
+"""
+Pytest tests for db_pool.py (against SQLite)
+============================================
+Run with: pytest tests/test_db_pool.py -v
+"""
+
+import threading
+
+import pytest
+
+import db_pool
+from db_pool import ConnectionPool, PoolTimeout
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'occupancy.db')
+
+
+@pytest.fixture
+def shared_pool(db_path):
+    """Point the shared pool (and so every *_sql function) at SQLite."""
+    pool = db_pool.configure(pool=ConnectionPool.sqlite(db_path))
+    yield pool
+    db_pool.close_pool()
+
+
+def test_connections_are_reused(db_path):
+    pool = ConnectionPool.sqlite(db_path, min_size=1, max_size=3)
+    for _ in range(50):
+        with pool.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            assert cursor.fetchone() == (1,)
+    stats = pool.stats()
+    assert stats['created'] == 1
+    assert stats['reused'] == 50
+    pool.close()
+
+
+def test_commit_on_success_rollback_on_error(db_path):
+    pool = ConnectionPool.sqlite(db_path)
+    with pool.cursor() as cursor:
+        cursor.execute("CREATE TABLE t (x INTEGER)")
+    with pool.cursor() as cursor:
+        cursor.execute("INSERT INTO t VALUES (1)")
+    with pytest.raises(ZeroDivisionError):
+        with pool.cursor() as cursor:
+            cursor.execute("INSERT INTO t VALUES (2)")
+            1 / 0
+    with pool.cursor() as cursor:
+        cursor.execute("SELECT x FROM t")
+        assert cursor.fetchall() == [(1,)]
+    # The failed block's connection went back to the pool, not leaked
+    assert pool.stats()['open'] == 1
+    pool.close()
+
+
+def test_max_size_blocks_then_times_out(db_path):
+    pool = ConnectionPool.sqlite(db_path, min_size=0, max_size=2, timeout=0.05)
+    first, second = pool.acquire(), pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+    # A release wakes a waiting thread
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire(timeout=2)))
+    waiter.start()
+    pool.release(first)
+    waiter.join()
+    assert got == [first]
+    pool.release(second)
+    pool.release(got[0])
+    pool.close()
+
+
+def test_dead_idle_connection_is_replaced(db_path):
+    pool = ConnectionPool.sqlite(db_path, min_size=1, health_check_after=0)
+    connection = pool.acquire()
+    pool.release(connection)
+    connection.close()               # e.g. the server dropped it while idle
+
+    with pool.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        assert cursor.fetchone() == (1,)
+    stats = pool.stats()
+    assert stats['discarded'] == 1
+    assert stats['created'] == 2
+    assert stats['open'] == 1
+    pool.close()
+
+
+def test_sql_functions_use_the_shared_pool(shared_pool):
+    from database_occupancy_learning import detect_anomalies_sql, mock_scan_stream
+    from scan_decoder import decode_scan
+
+    with shared_pool.cursor() as cursor:
+        cursor.execute("CREATE TABLE scans (ticket_id TEXT, gate TEXT, scan_type TEXT, scan_time TEXT)")
+        rows = [(scan.ticket_id, scan.gate, scan.scan_type, scan.timestamp)
+                for scan in map(decode_scan, mock_scan_stream())]
+        cursor.executemany("INSERT INTO scans VALUES (?, ?, ?, ?)", rows)
+
+    for _ in range(3):
+        result = detect_anomalies_sql()
+    assert result == {'duplicate_entries': ['T003'], 'exit_without_entry': []}
+    assert shared_pool.stats()['created'] == 1
+
+
+@pytest.fixture
+def mock_db(shared_pool):
+    from database_occupancy_learning import populate_database, setup_database
+
+    setup_database()
+    populate_database()
+    return shared_pool
+
+
+def test_count_current_occupancy_sql_on_sqlite(mock_db):
+    from database_occupancy_learning import count_current_occupancy_sql
+
+    assert count_current_occupancy_sql() == 4
+
+
+def test_get_occupancy_at_time_sql_on_sqlite(mock_db):
+    from database_occupancy_learning import get_occupancy_at_time_sql
+
+    assert get_occupancy_at_time_sql('2025-09-30 11:30:00') == 6
+    assert get_occupancy_at_time_sql('2025-09-30T11:30:00') == 6
+    # A scan exactly at the target time counts (T001 exits at 11:00)
+    assert get_occupancy_at_time_sql('2025-09-30 11:00:00') == 4
+    assert get_occupancy_at_time_sql('2025-09-30 09:00:00') == 0
+
+
+def test_get_detailed_breakdown_sql_on_sqlite(mock_db):
+    from breakdown_query import get_detailed_breakdown_single_sql
+    from database_occupancy_learning import get_detailed_breakdown_sql
+
+    assert get_detailed_breakdown_sql() == {
+        'total_occupancy': 4,
+        'by_gate': {'A': 2, 'B': 1, 'C': 1},
+        'by_ticket_type': {'VIP': 1, 'General': 3},
+    }
+    assert get_detailed_breakdown_sql() == get_detailed_breakdown_single_sql()
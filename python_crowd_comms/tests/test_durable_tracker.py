@@ -0,0 +1,150 @@
+"""
+Pytest tests for WAL + snapshot tracker recovery
+================================================
+Run with: pytest tests/test_durable_tracker.py -v
+"""
+
+import os
+
+import pytest
+
+from durable_tracker import DurableOccupancyTracker, SNAPSHOT_FILE, recovery_benchmark
+from occupancy_tracker import OccupancyTracker
+from python_occupancy_practice import mock_scan_stream
+from scan_decoder import decode_scan
+from scan_generator import generate_scan_stream, ticket_type_lookup
+
+
+def _all_reports(tracker):
+    return (tracker.details(), tracker.anomalies(), tracker.capacity(), tracker.scan_patterns())
+
+
+def test_state_round_trip():
+    tracker = OccupancyTracker(max_capacity=6)
+    tracker.ingest_many(mock_scan_stream())
+
+    assert _all_reports(OccupancyTracker.from_state(tracker.state())) == _all_reports(tracker)
+
+
+def test_recovers_after_crash_with_bounded_replay(tmp_path):
+    types = ticket_type_lookup(3_000)
+    events = list(generate_scan_stream(n_tickets=3_000, output='event'))
+    durable = DurableOccupancyTracker.open(str(tmp_path), types, max_capacity=800,
+                                           snapshot_every=1_000, fsync_every=50)
+    durable.ingest_many(events)
+    durable.log.close()   # crash - no final snapshot
+
+    recovered = DurableOccupancyTracker.open(str(tmp_path), types)
+
+    assert _all_reports(recovered.tracker) == _all_reports(durable.tracker)
+    assert recovered.recovery['snapshot_loaded']
+    assert recovered.recovery['replayed'] < 1_000
+    # Only segments after the last snapshot are kept
+    assert len([f for f in os.listdir(tmp_path) if f.startswith('wal_')]) <= 2
+    recovered.close()
+
+
+def test_torn_last_line_is_ignored_and_logging_continues(tmp_path):
+    events = list(mock_scan_stream())
+    durable = DurableOccupancyTracker.open(str(tmp_path), snapshot_every=100, fsync_every=1)
+    durable.ingest_many(events[:10])
+    durable.close()
+    with open(durable.log.path, 'a', encoding='utf-8') as f:
+        f.write('{"ticket_id": "T00')   # power cut mid-write
+
+    resumed = DurableOccupancyTracker.open(str(tmp_path), snapshot_every=100, fsync_every=1)
+    assert resumed.recovery['replayed'] == 10
+    resumed.ingest_many(events[10:])
+    resumed.close()
+
+    final = DurableOccupancyTracker.open(str(tmp_path))
+    expected = OccupancyTracker()
+    expected.ingest_many(mock_scan_stream())
+    assert _all_reports(final.tracker) == _all_reports(expected)
+    # The torn line was cut off, so it doesn't reappear as corruption mid-log
+    assert final.recovery['corrupt_lines'] == 0
+    final.close()
+
+
+def test_ids_with_quotes_and_backslashes_round_trip(tmp_path):
+    lines = [
+        '{"ticket_id": "T\\\\1", "gate": "A", "timestamp": "2025-09-30T10:00:00", "scan_type": "entry"}',
+        '{"ticket_id": "T\\"2", "gate": "B", "timestamp": "2025-09-30T10:01:00", "scan_type": "entry"}',
+        '{"ticket_id": "T3", "gate": "A", "timestamp": "2025-09-30T10:02:00", "scan_type": "entry"}',
+        '{"ticket_id": "T\\\\1", "gate": "C", "timestamp": "2025-09-30T10:03:00", "scan_type": "exit"}',
+    ]
+    durable = DurableOccupancyTracker.open(str(tmp_path), snapshot_every=100, fsync_every=1)
+    durable.ingest_many(lines)
+    durable.log.close()   # crash - everything is in the log
+
+    recovered = DurableOccupancyTracker.open(str(tmp_path))
+    assert recovered.recovery['replayed'] == 4
+    assert recovered.recovery['corrupt_lines'] == 0
+    assert _all_reports(recovered.tracker) == _all_reports(durable.tracker)
+    assert recovered.tracker.total_occupancy == 2
+    recovered.close()
+
+
+def test_bad_line_before_the_tail_is_counted_not_fatal(tmp_path):
+    events = list(mock_scan_stream())
+    durable = DurableOccupancyTracker.open(str(tmp_path), snapshot_every=100, fsync_every=1)
+    durable.ingest_many(events[:5])
+    durable.close()
+    with open(durable.log.path, encoding='utf-8') as f:
+        logged = f.readlines()
+    with open(durable.log.path, 'w', encoding='utf-8') as f:
+        f.writelines(logged[:2] + ['garbage\n'] + logged[2:])
+
+    recovered = DurableOccupancyTracker.open(str(tmp_path))
+    assert recovered.recovery['corrupt_lines'] == 1
+    assert not recovered.recovery['torn_tail']
+    assert recovered.recovery['replayed'] == 5
+    recovered.close()
+
+
+def test_bad_timestamp_is_rejected_before_it_is_logged(tmp_path):
+    events = list(mock_scan_stream())
+    durable = DurableOccupancyTracker.open(str(tmp_path), snapshot_every=100, fsync_every=1)
+    durable.ingest_many(events[:5])
+    with pytest.raises(ValueError):
+        # T001 is inside - the exit would have reached to_epoch()
+        durable.ingest({'ticket_id': 'T001', 'gate': 'A', 'timestamp': 'bad',
+                        'scan_type': 'exit'})
+    durable.ingest_many(events[5:])
+    durable.log.close()   # crash
+
+    recovered = DurableOccupancyTracker.open(str(tmp_path))
+    assert recovered.recovery['corrupt_lines'] == 0
+    assert _all_reports(recovered.tracker) == _all_reports(durable.tracker)
+    recovered.close()
+
+
+def test_logged_scan_that_cannot_be_applied_is_counted(tmp_path):
+    events = list(mock_scan_stream())
+    durable = DurableOccupancyTracker.open(str(tmp_path), snapshot_every=100, fsync_every=1)
+    durable.ingest_many(events[:5])
+    # A log written before ingest() validated timestamps
+    durable.log.append(decode_scan('{"ticket_id": "T001", "gate": "A", "timestamp": "bad", '
+                                   '"scan_type": "exit"}'))
+    durable.ingest_many(events[5:])
+    durable.log.close()
+
+    recovered = DurableOccupancyTracker.open(str(tmp_path))
+    assert recovered.recovery['corrupt_lines'] == 1
+    assert recovered.recovery['replayed'] == len(events)
+    recovered.close()
+
+
+def test_fresh_directory_starts_empty(tmp_path):
+    durable = DurableOccupancyTracker.open(str(tmp_path / 'new'))
+    assert durable.tracker.total_occupancy == 0
+    assert not durable.recovery['snapshot_loaded']
+    durable.snapshot()
+    durable.close()
+    assert os.path.exists(tmp_path / 'new' / SNAPSHOT_FILE)
+
+
+def test_recovery_benchmark_replays_less_with_snapshots():
+    full, snapshotted = recovery_benchmark(2_000, snapshot_intervals=(None, 500))
+    assert full['replayed'] == full['events']
+    assert snapshotted['replayed'] < 500
@@ -0,0 +1,60 @@
+"""
+Pytest tests for ring-buffer gate rates
+=======================================
+Run with: pytest tests/test_gate_rate_tracker.py -v
+"""
+
+import pytest
+
+from gate_rate_tracker import GateRateTracker
+from python_occupancy_practice import mock_scan_stream
+from scan_timestamps import to_epoch
+
+
+BASE = to_epoch('2025-09-30T10:00:00')
+
+
+def test_counts_within_window():
+    rates = GateRateTracker(bucket_seconds=60, window_buckets=15)
+    for minute in range(10):
+        rates.record('A', 'entry', BASE + minute * 60)
+    rates.record('A', 'exit', BASE + 9 * 60)
+
+    assert rates.count('A', 'entry') == 10
+    assert rates.count('A', 'exit') == 1
+    assert rates.rate_per_minute('A', 'entry') == pytest.approx(10 / 15)
+
+
+def test_old_buckets_roll_out_of_the_window():
+    """After 20 minutes only the last 15 buckets count."""
+    rates = GateRateTracker(bucket_seconds=60, window_buckets=15)
+    for minute in range(20):
+        rates.record('B', 'entry', BASE + minute * 60, count=2)
+
+    assert rates.count('B', 'entry') == 30
+    assert rates.series('B', 'entry') == [2] * 15
+
+
+def test_reads_with_explicit_now():
+    rates = GateRateTracker(bucket_seconds=60, window_buckets=5)
+    rates.record('A', 'entry', BASE)
+    assert rates.count('A', 'entry', now=BASE + 4 * 60) == 1
+    assert rates.count('A', 'entry', now=BASE + 5 * 60) == 0
+
+
+def test_late_events_are_counted_not_applied():
+    rates = GateRateTracker(bucket_seconds=60, window_buckets=5)
+    rates.record('A', 'entry', BASE + 3600)
+    rates.record('A', 'entry', BASE)
+    assert rates.late_events == 1
+    assert rates.count('A', 'entry') == 1
+
+
+def test_mock_stream_snapshot():
+    rates = GateRateTracker(bucket_seconds=60, window_buckets=60)
+    rates.ingest_many(mock_scan_stream())
+    # Window is 11:06-12:05: A has T002 exit, T008 entry; B has T003 entry + exit
+    assert rates.count('A', 'entry') == 1
+    assert rates.count('A', 'exit') == 1
+    assert rates.count('B', 'entry') == 1
+    assert set(rates.snapshot()) == {'A', 'B', 'C'}
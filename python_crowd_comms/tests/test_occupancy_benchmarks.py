@@ -0,0 +1,77 @@
+"""
+Benchmark regression gates for the occupancy functions
+======================================================
+The comparison tests only run when OCCUPANCY_BENCH_SIZES is set:
+
+    OCCUPANCY_BENCH_SIZES=1e3,1e4,1e5 pytest tests/test_occupancy_benchmarks.py -v
+
+Baselines live in tests/benchmark_baselines.json; refresh them on the
+reference machine with `python occupancy_benchmarks.py --sizes ... --update`.
+OCCUPANCY_BENCH_THRESHOLD overrides the allowed slowdown (default 0.30).
+"""
+
+import os
+
+import pytest
+
+from occupancy_benchmarks import (
+    DEFAULT_THRESHOLD,
+    available_targets,
+    compare,
+    load_baseline,
+    measure,
+    parse_sizes,
+)
+
+
+SIZES = parse_sizes(os.environ.get('OCCUPANCY_BENCH_SIZES', ''))
+THRESHOLD = float(os.environ.get('OCCUPANCY_BENCH_THRESHOLD', DEFAULT_THRESHOLD))
+
+
+def test_compare_flags_throughput_and_memory_regressions():
+    baseline = {'count_current_occupancy': {'1000': {'events_per_sec': 100_000,
+                                                     'tracemalloc_peak_mb': 10.0}}}
+    ok = {'count_current_occupancy': {'1000': {'events_per_sec': 80_000,
+                                               'tracemalloc_peak_mb': 12.0}}}
+    slow = {'count_current_occupancy': {'1000': {'events_per_sec': 60_000,
+                                                 'tracemalloc_peak_mb': 10.0}}}
+    fat = {'count_current_occupancy': {'1000': {'events_per_sec': 100_000,
+                                                'tracemalloc_peak_mb': 14.0}}}
+
+    assert compare(ok, baseline, threshold=0.3) == []
+    assert 'events/sec' in compare(slow, baseline, threshold=0.3)[0]
+    assert 'peak 14.0MB' in compare(fat, baseline, threshold=0.3)[0]
+
+
+def test_compare_skips_sizes_without_a_baseline():
+    results = {'count_current_occupancy': {'10000000': {'events_per_sec': 1}}}
+    assert compare(results, {}, threshold=0.3) == []
+
+
+def test_every_target_has_a_baseline():
+    baseline = load_baseline()
+    assert [name for name in available_targets() if not baseline.get(name)] == []
+
+
+def test_measure_reports_throughput_and_memory():
+    result = measure('count_current_occupancy', 1_000)
+
+    assert result['events'] == 1_000
+    assert result['events_per_sec'] > 0
+    assert result['tracemalloc_peak_mb'] > 0
+    assert set(result) >= {'seconds', 'peak_rss_growth_mb'}
+
+
+@pytest.mark.skipif(not SIZES, reason="set OCCUPANCY_BENCH_SIZES to run benchmarks")
+@pytest.mark.parametrize("name", available_targets())
+@pytest.mark.parametrize("size", SIZES)
+def test_no_regression_against_baseline(name, size):
+    baseline = load_baseline()
+    # A whole target without a baseline would never be gated - that's a bug
+    assert baseline.get(name), f"no baseline for {name}: run occupancy_benchmarks.py --update"
+    if str(size) not in baseline[name]:
+        pytest.skip(f"no baseline for {name} @ {size}")
+
+    results = {name: {str(size): measure(name, size)}}
+    regressions = compare(results, baseline, THRESHOLD)
+    assert not regressions, "\n".join(regressions)
@@ -0,0 +1,178 @@
+"""
+Pytest tests for occupancy_checkpoints.py
+=========================================
+Run with: pytest tests/test_occupancy_checkpoints.py -v
+
+Locally the reference is get_occupancy_at_time_sql()'s SQLite form plus the
+same last-scan-by-time rule in Python. The comparison against the Postgres
+query runs when OCCUPANCY_TEST_DSN points at a scratch Postgres database
+(its tables get replaced).
+"""
+
+import os
+import sqlite3
+import threading
+
+import pytest
+
+import db_pool
+from db_pool import ConnectionPool
+from occupancy_checkpoints import (get_occupancy_at_time_checkpointed, rebuild_checkpoints,
+                                   refresh_checkpoints)
+from scan_timestamps import from_epoch, to_epoch
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    from database_occupancy_learning import populate_database, setup_database
+
+    pool = db_pool.configure(pool=ConnectionPool.sqlite(str(tmp_path / 'occupancy.db')))
+    setup_database()
+    populate_database()
+    yield pool
+    db_pool.close_pool()
+
+
+def occupancy_at(scans, target_time):
+    """Reference: last scan per ticket at or before target_time."""
+    target = to_epoch(target_time)
+    last = {}
+    for scan in scans:
+        epoch = to_epoch(scan.timestamp)
+        if epoch <= target and (scan.ticket_id not in last or epoch >= last[scan.ticket_id][0]):
+            last[scan.ticket_id] = (epoch, scan.scan_type)
+    return sum(1 for _, scan_type in last.values() if scan_type == 'entry')
+
+
+def checkpoint_times(pool):
+    with pool.cursor() as cursor:
+        cursor.execute("SELECT checkpoint_time FROM occupancy_checkpoints ORDER BY checkpoint_time")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def test_mock_data(sqlite_db):
+    # populate_database() built the hourly checkpoints
+    assert checkpoint_times(sqlite_db) == ['2025-09-30T10:00:00', '2025-09-30T11:00:00',
+                                           '2025-09-30T12:00:00']
+    assert get_occupancy_at_time_checkpointed('2025-09-30 11:30:00') == 6
+    assert get_occupancy_at_time_checkpointed('2025-09-30T09:00:00') == 0
+    # Exactly on a checkpoint (a scan at that second counts), and after the last one
+    assert get_occupancy_at_time_checkpointed('2025-09-30T11:00:00') == 4
+    assert get_occupancy_at_time_checkpointed('2025-09-30T12:00:00') == 5
+    assert get_occupancy_at_time_checkpointed('2025-09-30T23:00:00') == 4
+
+
+def test_generated_event_matches_last_scan_rule(sqlite_db):
+    from database_occupancy_learning import get_occupancy_at_time_sql
+    from scan_generator import generate_scan_stream
+    from scan_loader import load_generated_event
+
+    with sqlite_db.cursor() as cursor:
+        for table in ('scans', 'tickets', 'users'):
+            cursor.execute(f"DELETE FROM {table}")
+    load_generated_event(1_000, sqlite_db)
+    assert rebuild_checkpoints(interval_seconds=15 * 60) > 4
+
+    scans = list(generate_scan_stream(n_tickets=1_000, output='event'))
+    first = to_epoch(min(s.timestamp for s in scans))
+    last = to_epoch(max(s.timestamp for s in scans))
+    for epoch in range(first - 60, last + 120, 7 * 60 + 13):
+        target = from_epoch(epoch)
+        expected = occupancy_at(scans, target)
+        assert get_occupancy_at_time_checkpointed(target) == expected, target
+        assert get_occupancy_at_time_sql(target) == expected, target
+
+
+def test_late_scan_invalidates_later_checkpoints(sqlite_db):
+    from database_occupancy_learning import mock_scan_stream
+    from scan_decoder import decode_scan
+
+    with sqlite_db.cursor() as cursor:
+        # T005 (inside since 10:05) turns out to have left at 10:30
+        cursor.execute("INSERT INTO scans (ticket_id, gate, scan_type, scan_time) "
+                       "VALUES ('T005', 'B', 'exit', '2025-09-30T10:30:00')")
+    assert checkpoint_times(sqlite_db) == ['2025-09-30T10:00:00']
+
+    scans = [decode_scan(line) for line in mock_scan_stream()]
+    late = decode_scan('{"ticket_id": "T005", "gate": "B", "timestamp": "2025-09-30T10:30:00", '
+                       '"scan_type": "exit"}')
+    targets = ('2025-09-30T11:30:00', '2025-09-30T12:30:00')
+    expected = [occupancy_at(scans + [late], target) for target in targets]
+    # Right straight away (from the 10:00 checkpoint), and after the refresh
+    assert [get_occupancy_at_time_checkpointed(t) for t in targets] == expected
+    assert refresh_checkpoints() == 2
+    assert [get_occupancy_at_time_checkpointed(t) for t in targets] == expected
+
+
+def refresh_during_open_load(pool, loader_connection):
+    """
+    Committed scans run past 13:00; an open load transaction holds a 12:30
+    scan that checkpoint 13:00 must include. The load commits while
+    refresh_checkpoints() is running.
+    """
+    mark = pool.placeholder
+    insert = (f"INSERT INTO scans (ticket_id, gate, scan_type, scan_time) "
+              f"VALUES ({mark}, {mark}, {mark}, {mark})")
+    with pool.cursor() as cursor:
+        cursor.execute(insert, ('T002', 'A', 'entry', '2025-09-30T13:10:00'))
+
+    cursor = loader_connection.cursor()
+    cursor.execute(insert, ('T005', 'B', 'exit', '2025-09-30T12:30:00'))   # not committed
+    committer = threading.Timer(0.3, loader_connection.commit)
+    committer.start()
+    try:
+        refresh_checkpoints(pool=pool)
+    finally:
+        committer.join()
+
+
+def test_refresh_waits_for_an_open_load(sqlite_db, tmp_path):
+    from database_occupancy_learning import get_occupancy_at_time_sql
+
+    loader = sqlite3.connect(str(tmp_path / 'occupancy.db'), check_same_thread=False)
+    try:
+        refresh_during_open_load(sqlite_db, loader)
+    finally:
+        loader.close()
+    assert '2025-09-30T13:00:00' in checkpoint_times(sqlite_db)
+    target = '2025-09-30T13:00:00'
+    assert get_occupancy_at_time_checkpointed(target) == get_occupancy_at_time_sql(target) == 3
+
+
+@pytest.mark.skipif(not os.environ.get('OCCUPANCY_TEST_DSN'),
+                    reason="set OCCUPANCY_TEST_DSN to compare against Postgres")
+def test_refresh_waits_for_an_open_load_on_postgres():
+    from database_occupancy_learning import (get_occupancy_at_time_sql, populate_database,
+                                             setup_database)
+
+    pool = db_pool.configure(os.environ['OCCUPANCY_TEST_DSN'])
+    try:
+        setup_database()
+        populate_database()
+        loader = pool.acquire()
+        try:
+            refresh_during_open_load(pool, loader)
+        finally:
+            pool.release(loader)
+        target = '2025-09-30 13:00:00'
+        assert get_occupancy_at_time_checkpointed(target) == get_occupancy_at_time_sql(target) == 3
+    finally:
+        db_pool.close_pool()
+
+
+@pytest.mark.skipif(not os.environ.get('OCCUPANCY_TEST_DSN'),
+                    reason="set OCCUPANCY_TEST_DSN to compare against Postgres")
+def test_matches_full_scan_query_on_postgres():
+    from database_occupancy_learning import (get_occupancy_at_time_sql, populate_database,
+                                             setup_database)
+
+    db_pool.configure(os.environ['OCCUPANCY_TEST_DSN'])
+    try:
+        setup_database()
+        populate_database()
+        rebuild_checkpoints(interval_seconds=20 * 60)
+        for minute in range(9 * 60 + 55, 12 * 60 + 15, 5):
+            target = f'2025-09-30 {minute // 60:02d}:{minute % 60:02d}:00'
+            assert get_occupancy_at_time_checkpointed(target) == get_occupancy_at_time_sql(target)
+    finally:
+        db_pool.close_pool()
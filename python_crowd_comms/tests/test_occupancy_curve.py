@@ -0,0 +1,88 @@
+"""
+Pytest tests for occupancy_curve.py
+===================================
+
+Run with: pytest tests/test_occupancy_curve.py -v
+"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from binary_scan_log import BinaryScanLog
+from occupancy_curve import curve_from_log, curve_from_stream, curve_rows, render_chart
+from occupancy_tracker import OccupancyTracker
+from python_occupancy_practice import mock_scan_stream
+from scan_generator import generate_scan_stream, write_scan_log
+from scan_timestamps import from_epoch
+
+
+def test_mock_stream_matches_tracker():
+    curve = curve_from_stream(mock_scan_stream())
+    tracker = OccupancyTracker()
+    tracker.ingest_many(mock_scan_stream())
+
+    assert int(curve['occupancy'][-1]) == tracker.total_occupancy
+    assert int(curve['entries'].sum()) == tracker.total_entries   # T003's duplicate dropped
+    assert int(curve['exits'].sum()) == tracker.total_exits
+    by_gate = {gate: int(c['occupancy'][-1]) for gate, c in curve['by_gate'].items()
+               if c['occupancy'][-1]}
+    assert by_gate == tracker.details()['by_gate']
+
+
+def test_exit_after_cross_gate_duplicate_leaves_the_entry_gate():
+    scans = [
+        {'ticket_id': 'T1', 'gate': 'A', 'timestamp': '2025-09-30T10:00:00', 'scan_type': 'entry'},
+        {'ticket_id': 'T1', 'gate': 'B', 'timestamp': '2025-09-30T10:01:00', 'scan_type': 'entry'},
+        {'ticket_id': 'T2', 'gate': 'B', 'timestamp': '2025-09-30T10:01:30', 'scan_type': 'entry'},
+        {'ticket_id': 'T1', 'gate': 'C', 'timestamp': '2025-09-30T10:02:00', 'scan_type': 'exit'},
+    ]
+    curve = curve_from_stream(scans)
+    assert {gate: int(c['occupancy'][-1]) for gate, c in curve['by_gate'].items()} == \
+        {'A': 0, 'B': 1, 'C': 0}
+
+
+def test_generated_stream_per_gate_matches_tracker():
+    events = list(generate_scan_stream(n_tickets=5_000, output='event'))
+    tracker = OccupancyTracker(ticket_types={})
+    tracker.ingest_many(events)
+    assert tracker.duplicate_entries           # cross-gate duplicates are in there
+
+    curve = curve_from_stream(events)
+    by_gate = {gate: int(c['occupancy'][-1]) for gate, c in curve['by_gate'].items()
+               if c['occupancy'][-1]}
+    assert by_gate == {gate: n for gate, n in tracker.details()['by_gate'].items() if n}
+
+
+def test_rows_match_minute_bucketing():
+    rows = curve_rows(curve_from_stream(mock_scan_stream()))
+    assert rows[0] == {'minute': '2025-09-30T10:00:00', 'entries': 1, 'exits': 0,
+                       'running_occupancy': 1}
+    assert rows[-1]['running_occupancy'] == 4
+    assert all(row['minute'].endswith(':00') for row in rows)
+
+
+def test_generated_log_matches_tracker_every_hour(tmp_path):
+    kwargs = dict(n_tickets=3_000, duration_hours=6)
+    path = str(tmp_path / 'scans.bin')
+    write_scan_log(path, output='binary', **kwargs)
+    with BinaryScanLog(path) as log:
+        curve = curve_from_log(log)
+    events = list(generate_scan_stream(output='event', **kwargs))
+
+    tracker = OccupancyTracker(ticket_types={})
+    i = 0
+    for minute in range(0, len(curve['occupancy']), 60):
+        end = from_epoch(curve['start'] + (minute + 1) * 60)
+        while i < len(events) and events[i].timestamp < end:
+            tracker.ingest(events[i])
+            i += 1
+        assert int(curve['occupancy'][minute]) == tracker.total_occupancy
+    gate_total = sum(c['occupancy'] for c in curve['by_gate'].values())
+    assert (gate_total == curve['occupancy']).all()
+
+
+def test_empty_and_chart():
+    assert len(curve_from_stream([])['occupancy']) == 0
+    chart = render_chart(curve_from_stream(mock_scan_stream()), width=20, height=4)
+    assert chart.splitlines()[0].startswith('6 ┤')   # peak: 6 inside from 11:25
@@ -0,0 +1,96 @@
+"""
+Pytest tests for the single-pass QueryRunner
+============================================
+Run with: pytest tests/test_occupancy_runner.py -v
+"""
+
+import json
+
+import pytest
+
+from occupancy_runner import QueryRunner, run_all_reports
+from occupancy_tracker import OccupancyTracker
+from python_occupancy_practice import (
+    mock_scan_stream,
+    count_current_occupancy,
+    track_occupancy_with_details,
+    manage_capacity_realtime,
+    track_recent_activity,
+    get_occupancy_at_time,
+)
+
+
+class CountingStream:
+    """Wraps a stream and counts how many times it is iterated."""
+
+    def __init__(self, events):
+        self.events = list(events)
+        self.passes = 0
+
+    def __iter__(self):
+        self.passes += 1
+        return iter(self.events)
+
+
+def test_runner_reads_stream_once():
+    """Six reports, one pass."""
+    stream = CountingStream(mock_scan_stream())
+    results = run_all_reports(stream)
+    assert stream.passes == 1
+    assert len(results) == 6
+
+
+def test_runner_matches_individual_functions():
+    """Results match calling the functions one at a time."""
+    runner = QueryRunner()
+    runner.register(count_current_occupancy)
+    runner.register(track_occupancy_with_details)
+    results = runner.run(mock_scan_stream())
+
+    assert results['count_current_occupancy'] == count_current_occupancy(mock_scan_stream())
+    assert results['track_occupancy_with_details'] == track_occupancy_with_details(mock_scan_stream())
+    assert results['track_occupancy_with_details']['by_gate'] == {'A': 4, 'B': 2, 'C': 2}
+
+
+def test_runner_same_function_twice_with_different_args():
+    """Two capacity limits in the same pass need different names."""
+    runner = QueryRunner()
+    runner.register(manage_capacity_realtime, name='cap_6', max_capacity=6)
+    runner.register(manage_capacity_realtime, name='cap_3', max_capacity=3)
+    results = runner.run(mock_scan_stream())
+
+    assert results['cap_6']['rejected_entries'] == []
+    assert len(results['cap_3']['rejected_entries']) > 0
+
+
+def test_runner_recent_activity_window():
+    runner = QueryRunner()
+    runner.register(track_recent_activity, window_size=5)
+    result = runner.run(mock_scan_stream())['track_recent_activity']
+
+    assert [s['ticket_id'] for s in result['recent_scans']] == ['T003', 'T007', 'T008', 'T003', 'T004']
+    # Same dicts the practice function gets from json.loads()
+    assert list(result['recent_scans']) == [json.loads(line) for line in list(mock_scan_stream())[-5:]]
+    assert result['recent_entry_count'] == 3
+    assert result['current_occupancy'] == 4
+
+
+def test_runner_custom_consumer():
+    """Anything with feed()/result() can join the pass."""
+    tracker = OccupancyTracker()
+
+    class Consumer:
+        feed = staticmethod(tracker.ingest)
+
+        def result(self):
+            return tracker.total_occupancy
+
+    runner = QueryRunner()
+    runner.register_consumer('custom', Consumer())
+    assert runner.run(mock_scan_stream()) == {'custom': 4}
+
+
+def test_runner_rejects_unknown_function():
+    runner = QueryRunner()
+    with pytest.raises(ValueError):
+        runner.register(get_occupancy_at_time)
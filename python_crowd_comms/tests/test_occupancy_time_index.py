@@ -0,0 +1,59 @@
+"""
+Pytest tests for the checkpointed occupancy-at-time index
+=========================================================
+Run with: pytest tests/test_occupancy_time_index.py -v
+"""
+
+import pytest
+
+from occupancy_time_index import OccupancyTimeIndex
+from python_occupancy_practice import mock_scan_stream, get_occupancy_at_time
+
+
+TARGETS = [
+    '2025-09-30T09:00:00',
+    '2025-09-30T10:00:00',
+    '2025-09-30T10:00:01',
+    '2025-09-30T10:30:00',
+    '2025-09-30T11:15:00',
+    '2025-09-30T11:30:00',
+    '2025-09-30T12:05:00',
+    '2025-09-30T23:59:59',
+]
+
+
+@pytest.mark.parametrize('checkpoint_every', [1, 3, 4, 13, 1024])
+def test_index_matches_replay(checkpoint_every):
+    """Every checkpoint spacing gives the same answers as a full replay."""
+    index = OccupancyTimeIndex(mock_scan_stream(), checkpoint_every=checkpoint_every)
+    for target in TARGETS:
+        assert index.occupancy_at(target) == get_occupancy_at_time(mock_scan_stream(), target), target
+
+
+def test_index_inside_at():
+    """Who was inside at 11:30am."""
+    index = OccupancyTimeIndex(mock_scan_stream(), checkpoint_every=4, keep_inside_sets=True)
+    assert index.inside_at('2025-09-30T11:30:00') == {'T003', 'T004', 'T005', 'T006', 'T007', 'T008'}
+
+
+def test_index_inside_at_requires_flag():
+    index = OccupancyTimeIndex(mock_scan_stream())
+    with pytest.raises(ValueError):
+        index.inside_at('2025-09-30T11:30:00')
+
+
+def test_index_handles_out_of_order_log():
+    """A late batch in the log is sorted into place while building."""
+    events = [
+        {'ticket_id': 'T001', 'gate': 'A', 'timestamp': '2025-09-30T10:00:00', 'scan_type': 'entry'},
+        {'ticket_id': 'T001', 'gate': 'A', 'timestamp': '2025-09-30T12:00:00', 'scan_type': 'exit'},
+        {'ticket_id': 'T002', 'gate': 'B', 'timestamp': '2025-09-30T11:00:00', 'scan_type': 'entry'},
+    ]
+    index = OccupancyTimeIndex(events, checkpoint_every=2)
+    assert index.occupancy_at('2025-09-30T11:30:00') == 2
+    assert index.occupancy_at('2025-09-30T12:00:00') == 1
+
+
+def test_index_empty_log():
+    index = OccupancyTimeIndex(iter([]))
+    assert index.occupancy_at('2025-09-30T11:30:00') == 0
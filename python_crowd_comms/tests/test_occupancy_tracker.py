@@ -0,0 +1,107 @@
+"""
+Pytest tests for the incremental OccupancyTracker
+=================================================
+Run with: pytest tests/test_occupancy_tracker.py -v
+"""
+
+import pytest
+
+from occupancy_tracker import OccupancyTracker
+from python_occupancy_practice import (
+    mock_scan_stream,
+    count_current_occupancy,
+    track_occupancy_with_details,
+)
+
+
+def test_tracker_matches_count_current_occupancy():
+    """Tracker total should match the replay function."""
+    tracker = OccupancyTracker()
+    tracker.ingest_many(mock_scan_stream())
+    assert tracker.total_occupancy == count_current_occupancy(mock_scan_stream())
+
+
+def test_tracker_details():
+    """Breakdowns should always sum to total occupancy."""
+    tracker = OccupancyTracker()
+    tracker.ingest_many(mock_scan_stream())
+    details = tracker.details()
+
+    expected = track_occupancy_with_details(mock_scan_stream())
+    assert details['total_occupancy'] == expected['total_occupancy']
+    assert details['total_entries'] == expected['total_entries']
+    assert details['total_exits'] == expected['total_exits']
+    assert details['by_ticket_type'] == expected['by_ticket_type']
+    assert sum(details['by_gate'].values()) == details['total_occupancy']
+
+
+def test_tracker_reads_are_current_mid_stream():
+    """Metrics should be readable after every single ingest."""
+    tracker = OccupancyTracker()
+    stream = mock_scan_stream()
+    for _ in range(5):
+        tracker.ingest(next(stream))
+    assert tracker.total_occupancy == 5
+    assert tracker.total_entries == 5
+
+
+def test_tracker_anomalies():
+    """Duplicate, exit-without-entry and rapid re-entry are all flagged."""
+    events = [
+        {'ticket_id': 'T001', 'gate': 'A', 'timestamp': '2025-09-30T10:00:00', 'scan_type': 'entry'},
+        {'ticket_id': 'T001', 'gate': 'A', 'timestamp': '2025-09-30T10:01:00', 'scan_type': 'entry'},
+        {'ticket_id': 'T002', 'gate': 'A', 'timestamp': '2025-09-30T10:02:00', 'scan_type': 'exit'},
+        {'ticket_id': 'T001', 'gate': 'A', 'timestamp': '2025-09-30T10:10:00', 'scan_type': 'exit'},
+        {'ticket_id': 'T001', 'gate': 'A', 'timestamp': '2025-09-30T10:12:00', 'scan_type': 'entry'},
+    ]
+    tracker = OccupancyTracker()
+    tracker.ingest_many(events)
+    assert tracker.anomalies() == {
+        'duplicate_entries': {'T001'},
+        'exit_without_entry': {'T002'},
+        'rapid_reentry': {'T001'},
+    }
+
+
+def test_bad_timestamp_changes_nothing():
+    """An exit or a re-entry with an unparseable timestamp raises before any update."""
+    tracker = OccupancyTracker(max_capacity=6)
+    tracker.ingest_many([
+        {'ticket_id': 'T001', 'gate': 'A', 'timestamp': '2025-09-30T10:00:00', 'scan_type': 'entry'},
+        {'ticket_id': 'T002', 'gate': 'B', 'timestamp': '2025-09-30T10:00:30', 'scan_type': 'entry'},
+        {'ticket_id': 'T001', 'gate': 'A', 'timestamp': '2025-09-30T10:01:00', 'scan_type': 'exit'},
+    ])
+    before = tracker.state()
+
+    for scan in ({'ticket_id': 'T002', 'gate': 'C', 'timestamp': 'bad', 'scan_type': 'exit'},
+                 {'ticket_id': 'T001', 'gate': 'C', 'timestamp': 'bad', 'scan_type': 'entry'}):
+        with pytest.raises(ValueError):
+            tracker.ingest(scan)
+        assert tracker.state() == before
+
+
+def test_tracker_mock_stream_anomalies():
+    """T003 enters twice in the mock stream."""
+    tracker = OccupancyTracker()
+    tracker.ingest_many(mock_scan_stream())
+    assert tracker.duplicate_entries == {'T003'}
+    assert tracker.exit_without_entry == set()
+
+
+def test_tracker_capacity_rejects_general_but_not_vip():
+    """At capacity, General is rejected and VIP overrides."""
+    events = [
+        {'ticket_id': 'T002', 'gate': 'A', 'timestamp': '2025-09-30T10:00:00', 'scan_type': 'entry'},
+        {'ticket_id': 'T003', 'gate': 'A', 'timestamp': '2025-09-30T10:01:00', 'scan_type': 'entry'},
+        {'ticket_id': 'T004', 'gate': 'B', 'timestamp': '2025-09-30T10:02:00', 'scan_type': 'entry'},
+        {'ticket_id': 'T001', 'gate': 'B', 'timestamp': '2025-09-30T10:03:00', 'scan_type': 'entry'},
+    ]
+    tracker = OccupancyTracker(max_capacity=2)
+    tracker.ingest_many(events)
+    capacity = tracker.capacity()
+
+    assert capacity['rejected_entries'] == ['T004']
+    assert capacity['vip_override_count'] == 1
+    assert capacity['final_occupancy'] == 3
+    assert capacity['would_be_occupancy'] == 4
+    assert capacity['times_at_capacity'] == 1
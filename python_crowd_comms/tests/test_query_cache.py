@@ -0,0 +1,208 @@
+"""
+Pytest tests for query_cache.py
+===============================
+Run with: pytest tests/test_query_cache.py -v
+"""
+
+import pytest
+
+import db_pool
+import query_cache
+from db_pool import ConnectionPool
+from query_cache import InMemoryRedis, LRUCache, QueryCache
+
+
+@pytest.fixture
+def cached_db(tmp_path):
+    """Mock data in SQLite behind the shared pool, with caching turned on."""
+    from database_occupancy_learning import populate_database, setup_database
+
+    pool = db_pool.configure(pool=ConnectionPool.sqlite(str(tmp_path / 'occupancy.db')))
+    setup_database()
+    populate_database()
+    cache = query_cache.configure(max_entries=16)
+    yield pool, cache
+    query_cache.disable()
+    db_pool.close_pool()
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2)
+    lru.set('a', b'1')
+    lru.set('b', b'2')
+    assert lru.get('a') == b'1'          # 'b' is now the oldest
+    lru.set('c', b'3')
+    assert lru.get('b') is None
+    assert (lru.get('a'), lru.get('c')) == (b'1', b'3')
+    assert lru.evictions == 1
+    assert len(lru) == 2
+
+
+def test_in_memory_redis(monkeypatch):
+    redis = InMemoryRedis()
+    assert redis.get('missing') is None
+    redis.set('k', 'v', ex=10)
+    assert redis.get('k') == b'v'
+    assert redis.incr('version') == 1
+    assert redis.incr('version', 5) == 6
+    assert redis.get('version') == b'6'
+
+    now = query_cache.time.monotonic()
+    monkeypatch.setattr(query_cache.time, 'monotonic', lambda: now + 11)
+    assert redis.get('k') is None
+    assert redis.delete('k', 'version') == 1
+
+
+def test_local_hits_and_invalidation():
+    cache = QueryCache(max_entries=8)
+    calls = []
+
+    def occupancy_at(target):
+        calls.append(target)
+        return {'at': target, 'inside': len(calls)}
+
+    first = cache.get_or_compute('at', ('11:30',), lambda: occupancy_at('11:30'))
+    first['inside'] = 99                 # callers get a copy
+    assert cache.get_or_compute('at', ('11:30',), lambda: occupancy_at('11:30')) == \
+        {'at': '11:30', 'inside': 1}
+    cache.get_or_compute('at', ('12:00',), lambda: occupancy_at('12:00'))
+    assert calls == ['11:30', '12:00']
+
+    cache.invalidate()
+    assert cache.get_or_compute('at', ('11:30',), lambda: occupancy_at('11:30'))['inside'] == 3
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['invalidations']) == (1, 3, 1)
+    assert stats['version'] == 1
+
+
+def test_redis_tier_shares_results_and_versions_between_processes():
+    redis = InMemoryRedis()
+    reader, ingest = QueryCache(redis=redis), QueryCache(redis=redis)
+
+    assert ingest.get_or_compute('count', (), lambda: 4) == 4
+    # A different process finds it in Redis, then in its own LRU
+    assert reader.get_or_compute('count', (), lambda: pytest.fail("should be cached")) == 4
+    assert reader.get_or_compute('count', (), lambda: pytest.fail("should be cached")) == 4
+    assert (reader.stats()['redis_hits'], reader.stats()['hits']) == (1, 1)
+
+    # New scans committed elsewhere: the reader's local copy is stale too
+    ingest.invalidate()
+    assert reader.get_or_compute('count', (), lambda: 5) == 5
+    assert reader.stats()['misses'] == 1
+    assert reader.version() == ingest.version() == 1
+
+
+def test_scan_ingest_invalidates_cached_queries(cached_db):
+    from database_occupancy_learning import detect_anomalies_sql
+    from scan_loader import load_scans
+
+    pool, cache = cached_db
+    expected = {'duplicate_entries': ['T003'], 'exit_without_entry': []}
+    assert detect_anomalies_sql() == expected
+    assert detect_anomalies_sql() == expected
+    assert (cache.stats()['misses'], cache.stats()['hits']) == (1, 1)
+
+    # T006 scans in twice without leaving
+    load_scans([{'ticket_id': 'T006', 'gate': 'B', 'timestamp': '2025-09-30T12:30:00',
+                 'scan_type': 'entry'}], pool)
+    assert detect_anomalies_sql() == {'duplicate_entries': ['T003', 'T006'],
+                                      'exit_without_entry': []}
+    assert cache.stats()['misses'] == 2
+
+    query_cache.disable()
+    assert detect_anomalies_sql.uncached() == detect_anomalies_sql()
+
+
+class FlakyRedis(InMemoryRedis):
+    """InMemoryRedis that raises ConnectionError (an OSError) while down."""
+
+    def __init__(self):
+        super().__init__()
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("Redis unreachable")
+
+    def get(self, name):
+        self._check()
+        return super().get(name)
+
+    def set(self, name, value, ex=None):
+        self._check()
+        return super().set(name, value, ex=ex)
+
+    def incr(self, name, amount=1):
+        self._check()
+        return super().incr(name, amount)
+
+
+def test_redis_outage_falls_back_to_the_database():
+    redis = FlakyRedis()
+    cache = QueryCache(redis=redis)
+    count = [4]
+
+    assert cache.get_or_compute('count', (), lambda: count[0]) == 4
+    redis.down = True
+    # Version unknown: every read goes to the database, nothing raises
+    count[0] = 5
+    assert cache.get_or_compute('count', (), lambda: count[0]) == 5
+    assert cache.invalidate() is None
+    assert cache.redis_errors == 2                    # the version GET, then the INCR
+
+    # Back up: the missed invalidation is applied before the next read
+    redis.down = False
+    assert cache.version() == 1
+    assert cache.get_or_compute('count', (), lambda: count[0]) == 5
+
+
+def test_redis_result_errors_use_the_local_tier():
+    redis = FlakyRedis()
+    cache = QueryCache(redis=redis)
+    cache.version = lambda: 0        # version reads fine, result GET/SET fail
+    redis.down = True
+
+    assert cache.get_or_compute('count', (), lambda: 4) == 4
+    assert cache.get_or_compute('count', (), lambda: pytest.fail("should be cached")) == 4
+    assert (cache.hits, cache.misses, cache.redis_errors) == (1, 1, 2)
+
+
+def test_swapping_the_pool_invalidates(cached_db, tmp_path):
+    from database_occupancy_learning import detect_anomalies_sql
+
+    assert detect_anomalies_sql() == {'duplicate_entries': ['T003'], 'exit_without_entry': []}
+
+    empty = db_pool.configure(pool=ConnectionPool.sqlite(str(tmp_path / 'empty.db')))
+    with empty.cursor() as cursor:
+        cursor.execute("CREATE TABLE scans (ticket_id TEXT, gate TEXT, scan_type TEXT, scan_time TEXT)")
+    assert detect_anomalies_sql() == {'duplicate_entries': [], 'exit_without_entry': []}
+
+
+def test_derived_table_reads_are_cached(cached_db):
+    from breakdown_query import get_detailed_breakdown_single_sql
+    from occupancy_checkpoints import get_occupancy_at_time_checkpointed
+    from ticket_state import (count_current_occupancy_state, get_detailed_breakdown_state,
+                              rebuild_ticket_state, tickets_inside)
+
+    pool, cache = cached_db
+    reads = [get_detailed_breakdown_single_sql, count_current_occupancy_state,
+             get_detailed_breakdown_state, tickets_inside]
+    first = [read() for read in reads] + [get_occupancy_at_time_checkpointed('2025-09-30 11:30:00')]
+    again = [read() for read in reads] + [get_occupancy_at_time_checkpointed('2025-09-30 11:30:00')]
+    assert again == first
+    assert (cache.stats()['misses'], cache.stats()['hits']) == (5, 5)
+
+    rebuild_ticket_state()
+    assert count_current_occupancy_state() == first[1]
+    assert cache.stats()['misses'] == 6
+
+
+def test_keys_are_module_qualified(monkeypatch):
+    names = []
+    cache = QueryCache()
+    monkeypatch.setattr(cache, 'get_or_compute', lambda name, *args: names.append(name))
+    monkeypatch.setattr(query_cache, '_cache', cache)
+
+    from breakdown_query import get_detailed_breakdown_single_sql
+    get_detailed_breakdown_single_sql()
+    assert names == ['breakdown_query.get_detailed_breakdown_single_sql']
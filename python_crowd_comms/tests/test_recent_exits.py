@@ -0,0 +1,70 @@
+"""
+Pytest tests for bounded last-exit times
+========================================
+Run with: pytest tests/test_recent_exits.py -v
+"""
+
+import pytest
+
+from occupancy_tracker import OccupancyTracker
+from python_occupancy_practice import mock_scan_stream
+from recent_exits import RecentExits
+from scan_generator import generate_scan_stream
+from scan_timestamps import to_epoch
+
+
+BASE = to_epoch('2025-09-30T10:00:00')
+
+
+def test_old_exits_are_evicted_as_the_clock_advances():
+    exits = RecentExits(ttl_seconds=300)
+    exits['T001'] = BASE
+    exits['T002'] = BASE + 200
+    exits['T003'] = BASE + 301
+
+    assert 'T001' not in exits
+    assert exits['T002'] == BASE + 200
+    assert exits.evicted == 1
+
+
+def test_later_exit_of_same_ticket_is_not_evicted_by_its_old_one():
+    exits = RecentExits(ttl_seconds=300)
+    exits['T001'] = BASE
+    exits['T001'] = BASE + 250
+    exits['T002'] = BASE + 400   # pops T001's first exit only
+
+    assert exits['T001'] == BASE + 250
+    assert len(exits) == 2
+
+
+def test_anomalies_identical_with_bounded_memory():
+    kwargs = dict(n_tickets=20_000, seed=21, rapid_reentry_rate=0.2, mean_dwell_minutes=30)
+    bounded = OccupancyTracker(ticket_types={})
+    unbounded = OccupancyTracker(ticket_types={}, exit_time_ttl=None)
+    peak = 0
+    for scan in generate_scan_stream(output='event', **kwargs):
+        bounded.ingest(scan)
+        unbounded.ingest(scan)
+        peak = max(peak, len(bounded.last_exit_time))
+
+    assert bounded.anomalies() == unbounded.anomalies()
+    assert len(bounded.anomalies()['rapid_reentry']) > 100
+    # Only exits from the last 5 minutes are held, not every ticket that left
+    assert peak < len(unbounded.last_exit_time) / 10
+
+
+def test_mock_stream_and_snapshot_round_trip_unchanged():
+    tracker = OccupancyTracker()
+    tracker.ingest_many(mock_scan_stream())
+    unbounded = OccupancyTracker(exit_time_ttl=None)
+    unbounded.ingest_many(mock_scan_stream())
+    restored = OccupancyTracker.from_state(tracker.state())
+
+    assert tracker.anomalies() == unbounded.anomalies()
+    assert restored.anomalies() == tracker.anomalies()
+    assert dict(restored.last_exit_time.items()) == dict(tracker.last_exit_time.items())
+
+
+def test_ttl_shorter_than_reentry_window_is_rejected():
+    with pytest.raises(ValueError):
+        OccupancyTracker(exit_time_ttl=60)
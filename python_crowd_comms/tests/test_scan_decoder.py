@@ -0,0 +1,59 @@
+"""
+Pytest tests for the fixed-schema scan decoder
+==============================================
+Run with: pytest tests/test_scan_decoder.py -v
+"""
+
+import json
+
+from scan_decoder import ScanEvent, decode_scan, to_scan_event, benchmark_decoder
+from python_occupancy_practice import mock_scan_stream
+
+
+def test_decode_matches_json_loads_on_mock_stream():
+    """Every mock line decodes to the same values as json.loads."""
+    for line in mock_scan_stream():
+        expected = json.loads(line)
+        scan = decode_scan(line)
+        assert scan.ticket_id == expected['ticket_id']
+        assert scan.gate == expected['gate']
+        assert scan.timestamp == expected['timestamp']
+        assert scan.scan_type == expected['scan_type']
+        assert scan.user_id is None
+
+
+def test_decode_optional_user_id_layouts():
+    """user_id straight after ticket_id (db_learning2 layout) or at the end."""
+    after_ticket = ('{"ticket_id": "T001", "user_id": "U123", "gate": "A", '
+                    '"timestamp": "2025-09-30T10:00:00", "scan_type": "entry"}')
+    at_end = ('{"ticket_id": "T001", "gate": "A", "timestamp": "2025-09-30T10:00:00", '
+              '"scan_type": "entry", "user_id": "U123"}')
+    expected = ScanEvent('T001', 'A', '2025-09-30T10:00:00', 'entry', 'U123')
+    assert decode_scan(after_ticket) == expected
+    assert decode_scan(at_end) == expected
+
+
+def test_decode_falls_back_for_unusual_lines():
+    """Reordered keys, escapes and compact separators still decode correctly."""
+    reordered = '{"gate": "A", "ticket_id": "T001", "scan_type": "exit", "timestamp": "2025-09-30T10:00:00"}'
+    escaped = '{"ticket_id": "T\\"01", "gate": "A", "timestamp": "2025-09-30T10:00:00", "scan_type": "exit"}'
+    compact = json.dumps({'ticket_id': 'T001', 'gate': 'A', 'timestamp': '2025-09-30T10:00:00',
+                          'scan_type': 'exit'}, separators=(',', ':'))
+
+    assert decode_scan(reordered) == ScanEvent('T001', 'A', '2025-09-30T10:00:00', 'exit')
+    assert decode_scan(escaped).ticket_id == 'T"01'
+    assert decode_scan(compact) == ScanEvent('T001', 'A', '2025-09-30T10:00:00', 'exit')
+
+
+def test_to_scan_event_accepts_dicts():
+    """Tests feed plain dicts into streams - these must work too."""
+    scan = to_scan_event({'ticket_id': 'T001', 'gate': 'A',
+                          'timestamp': '2025-09-30T10:00:00', 'scan_type': 'entry'})
+    assert scan == ScanEvent('T001', 'A', '2025-09-30T10:00:00', 'entry')
+
+
+def test_benchmark_runs_small():
+    """Benchmark harness works (the real run uses 10M lines)."""
+    result = benchmark_decoder(1_000, chunk=300)
+    assert result['lines'] == 1_000
+    assert result['speedup'] > 0
@@ -0,0 +1,84 @@
+"""
+Pytest tests for the synthetic scan generator
+=============================================
+Run with: pytest tests/test_scan_generator.py -v
+"""
+
+import itertools
+
+import pytest
+
+from occupancy_tracker import OccupancyTracker
+from scan_decoder import decode_scan
+from scan_generator import (BINARY_RECORD, generate_scan_stream, generate_tickets,
+                            ticket_type_lookup, write_scan_log)
+from scan_timestamps import to_epoch
+
+
+def test_same_seed_same_stream():
+    first = list(generate_scan_stream(n_tickets=2_000, seed=7))
+    second = list(generate_scan_stream(n_tickets=2_000, seed=7))
+    other = list(generate_scan_stream(n_tickets=2_000, seed=8))
+
+    assert first == second
+    assert first != other
+
+
+@pytest.mark.parametrize("curve", ['uniform', 'front_loaded', 'peak'])
+def test_stream_is_time_ordered_and_inside_the_event(curve):
+    events = list(generate_scan_stream(n_tickets=3_000, arrival_curve=curve,
+                                       duration_hours=6, output='event'))
+    times = [to_epoch(e.timestamp) for e in events]
+
+    assert times == sorted(times)
+    assert times[0] >= to_epoch('2025-09-30T10:00:00')
+    assert times[-1] <= to_epoch('2025-09-30T16:00:00')
+
+
+def test_json_lines_decode_like_mock_stream():
+    lines = list(itertools.islice(generate_scan_stream(n_tickets=100, gates=('A', 'B')), 50))
+    scans = [decode_scan(line) for line in lines]
+
+    assert {s.gate for s in scans} <= {'A', 'B'}
+    assert {s.scan_type for s in scans} <= {'entry', 'exit'}
+    assert all(s.ticket_id.startswith('T') for s in scans)
+
+
+def test_binary_matches_json_stream(tmp_path):
+    kwargs = dict(n_tickets=500, seed=3, gates=('A', 'B', 'C'))
+    events = list(generate_scan_stream(output='event', **kwargs))
+    path = tmp_path / 'scans.bin'
+
+    assert write_scan_log(str(path), output='binary', **kwargs) == len(events)
+    data = path.read_bytes()
+    records = [BINARY_RECORD.unpack_from(data, i) for i in range(0, len(data), BINARY_RECORD.size)]
+    assert [(f'T{t:03d}', 'ABC'[g], ('entry', 'exit')[s], e) for t, g, s, e in records] == \
+        [(e.ticket_id, e.gate, e.scan_type, to_epoch(e.timestamp)) for e in events]
+
+
+def test_anomaly_rates_show_up_in_the_tracker():
+    clean = OccupancyTracker(ticket_types={})
+    clean.ingest_many(generate_scan_stream(
+        n_tickets=2_000, duplicate_entry_rate=0, exit_without_entry_rate=0,
+        rapid_reentry_rate=0, output='event'))
+    assert clean.anomalies() == {'duplicate_entries': set(), 'exit_without_entry': set(),
+                                 'rapid_reentry': set()}
+
+    noisy = OccupancyTracker(ticket_types={})
+    noisy.ingest_many(generate_scan_stream(
+        n_tickets=2_000, duplicate_entry_rate=0.1, exit_without_entry_rate=0.05,
+        rapid_reentry_rate=0.2, mean_dwell_minutes=60, output='event'))
+    anomalies = noisy.anomalies()
+    assert len(anomalies['duplicate_entries']) > 50
+    assert len(anomalies['exit_without_entry']) > 30
+    assert len(anomalies['rapid_reentry']) > 50
+
+
+def test_ticket_rows_are_deterministic_and_mixed():
+    tickets = list(generate_tickets(1_000, seed=1, vip_fraction=0.2))
+    assert tickets == list(generate_tickets(1_000, seed=1, vip_fraction=0.2))
+    assert set(tickets[0]) == {'ticket_id', 'user_id', 'ticket_type', 'price'}
+
+    vip = sum(t['ticket_type'] == 'VIP' for t in tickets)
+    assert 120 < vip < 280
+    assert ticket_type_lookup(1_000, seed=1, vip_fraction=0.2)['T000'] == tickets[0]['ticket_type']
@@ -0,0 +1,112 @@
+"""
+Pytest tests for the asyncio scan-ingestion server
+==================================================
+Run with: pytest tests/test_scan_ingest_server.py -v
+"""
+
+import asyncio
+
+import pytest
+
+from python_occupancy_practice import mock_scan_stream
+from scan_ingest_server import ScanIngestServer, send_scans
+
+
+def test_server_feeds_tracker():
+    """Mock scans sent over TCP end up in the tracker."""
+    async def scenario():
+        async with ScanIngestServer(batch_size=4) as server:
+            await send_scans(mock_scan_stream(), server.host, server.port)
+        return server
+
+    server = asyncio.run(scenario())
+    assert server.tracker.total_occupancy == 4
+    assert server.tracker.duplicate_entries == {'T003'}
+    assert server.stats()['events_processed'] == 13
+    assert server.stats()['batches'] >= 4
+
+
+def test_server_counts_bad_lines():
+    """A malformed line is counted, not fatal."""
+    lines = list(mock_scan_stream())[:2] + ['not json at all']
+
+    async def scenario():
+        async with ScanIngestServer() as server:
+            await send_scans(lines, server.host, server.port)
+        return server
+
+    server = asyncio.run(scenario())
+    assert server.stats()['bad_lines'] == 1
+    assert server.stats()['events_processed'] == 2
+
+
+def test_server_backpressure_bounds_queue():
+    """A slow consumer fills the queue but never past max_queue."""
+    processed = []
+
+    async def slow_consumer(batch):
+        await asyncio.sleep(0.01)
+        processed.extend(batch)
+
+    lines = list(mock_scan_stream()) * 20
+
+    async def scenario():
+        async with ScanIngestServer(consumer=slow_consumer, batch_size=5, max_queue=8) as server:
+            await send_scans(lines, server.host, server.port, chunk=10)
+        return server
+
+    server = asyncio.run(scenario())
+    assert len(processed) == len(lines)
+    assert server.stats()['max_queue_depth'] <= 8
+
+
+def test_server_survives_a_failing_consumer():
+    """A consumer that raises loses its batch; later batches and stop() still run."""
+    processed = []
+
+    def flaky_consumer(batch):
+        if not flaky_consumer.failed:
+            flaky_consumer.failed = True
+            raise RuntimeError("database down")
+        processed.extend(batch)
+
+    flaky_consumer.failed = False
+    lines = list(mock_scan_stream()) * 10
+
+    async def scenario():
+        server = ScanIngestServer(consumer=flaky_consumer, batch_size=5, max_queue=4)
+        await server.start()
+        await send_scans(lines, server.host, server.port, chunk=5)
+        await asyncio.wait_for(server.stop(), timeout=5)
+        return server
+
+    server = asyncio.run(scenario())
+    stats = server.stats()
+    assert stats['consumer_errors'] == 1
+    assert stats['failed_events'] + len(processed) == len(lines)
+    assert stats['events_processed'] == len(processed) > 0
+    assert isinstance(server.last_consumer_error, RuntimeError)
+
+
+def test_bad_timestamp_is_a_bad_line_with_reordering():
+    """A timestamp that doesn't parse is counted, and the batcher keeps going."""
+    lines = list(mock_scan_stream())
+    lines.insert(3, '{"ticket_id": "T001", "gate": "A", "timestamp": "not-a-time", '
+                    '"scan_type": "exit"}')
+
+    async def scenario():
+        server = ScanIngestServer(batch_size=4, max_lateness_seconds=60)
+        await server.start()
+        await send_scans(lines, server.host, server.port)
+        await asyncio.wait_for(server.stop(), timeout=5)
+        return server
+
+    server = asyncio.run(scenario())
+    assert server.stats()['bad_lines'] == 1
+    assert server.stats()['events_processed'] == 13
+    assert server.tracker.total_occupancy == 4
+
+
+def test_server_refuses_non_loopback():
+    with pytest.raises(ValueError):
+        ScanIngestServer(host='0.0.0.0')
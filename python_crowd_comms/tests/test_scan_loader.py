@@ -0,0 +1,92 @@
+"""
+Pytest tests for scan_loader.py
+===============================
+Run with: pytest tests/test_scan_loader.py -v
+"""
+
+import json
+
+from db_pool import ConnectionPool
+from python_occupancy_practice import mock_scan_stream
+from scan_generator import generate_scan_stream
+from scan_loader import load_scans
+
+
+def _sqlite_pool(tmp_path):
+    pool = ConnectionPool.sqlite(str(tmp_path / 'scans.db'))
+    with pool.cursor() as cursor:
+        cursor.execute("CREATE TABLE scans (scan_id INTEGER PRIMARY KEY, ticket_id TEXT, "
+                       "gate TEXT, scan_type TEXT, scan_time TEXT)")
+    return pool
+
+
+def test_loads_generated_stream_in_batches(tmp_path):
+    pool = _sqlite_pool(tmp_path)
+    events = list(generate_scan_stream(n_tickets=500, output='event'))
+    commits = []
+    stats = load_scans(iter(events), pool, batch_size=100, commit_every=250,
+                       progress=commits.append)
+
+    assert stats['rows'] == len(events)
+    assert stats['batches'] == -(-len(events) // 100)
+    assert [c['rows'] for c in commits] == [300 * (i + 1) for i in range(len(commits))]
+    assert stats['rows_per_sec'] > 0
+    with pool.cursor() as cursor:
+        cursor.execute("SELECT ticket_id, gate, scan_type, scan_time FROM scans ORDER BY scan_id")
+        assert cursor.fetchall() == [(e.ticket_id, e.gate, e.scan_type, e.timestamp) for e in events]
+    pool.close()
+
+
+def test_accepts_json_lines_and_dicts(tmp_path):
+    pool = _sqlite_pool(tmp_path)
+    load_scans(mock_scan_stream(), pool)
+    load_scans((json.loads(line) for line in mock_scan_stream()), pool)
+    with pool.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*), COUNT(DISTINCT ticket_id) FROM scans")
+        assert cursor.fetchone() == (26, 8)
+    pool.close()
+
+
+class _CopyCursor:
+    """Just enough of a psycopg2 cursor to capture COPY calls."""
+
+    def __init__(self, copies):
+        self.copies = copies
+
+    def copy_expert(self, sql, buffer):
+        self.copies.append((sql, buffer.read()))
+
+    def close(self):
+        pass
+
+
+class _CopyConnection:
+    def __init__(self):
+        self.copies = []
+        self.commits = 0
+
+    def cursor(self):
+        return _CopyCursor(self.copies)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_postgres_path_uses_copy_csv():
+    connection = _CopyConnection()
+    pool = ConnectionPool(lambda: connection, max_size=1)      # '%s' = psycopg2 style
+    stats = load_scans(mock_scan_stream(), pool, batch_size=5, commit_every=10)
+
+    assert stats['batches'] == 3
+    assert len(connection.copies) == 3
+    sql, data = connection.copies[0]
+    assert sql == "COPY scans (ticket_id, gate, scan_type, scan_time) FROM STDIN WITH (FORMAT csv)"
+    assert data.splitlines()[0] == 'T001,A,entry,2025-09-30T10:00:00'
+    # One mid-load commit after 10 rows, one for the tail
+    assert connection.commits == 2 and stats['commits'] == 2
@@ -0,0 +1,96 @@
+"""
+Pytest tests for the watermarked reorder buffer
+===============================================
+Run with: pytest tests/test_scan_reorder.py -v
+"""
+
+import asyncio
+import random
+
+from occupancy_runner import QueryRunner
+from python_occupancy_practice import count_current_occupancy, get_occupancy_at_time, mock_scan_stream
+from scan_decoder import to_scan_event
+from scan_generator import generate_scan_stream
+from scan_ingest_server import ScanIngestServer, send_scans
+from scan_reorder import ReorderBuffer, reorder
+from scan_timestamps import to_epoch
+
+
+def _epoch(event):
+    return to_epoch(to_scan_event(event).timestamp)
+
+
+def _jitter(events, max_shift, seed=0):
+    """Shuffle a sorted stream so no event moves more than max_shift seconds."""
+    rng = random.Random(seed)
+    keyed = [(_epoch(e) + rng.uniform(0, max_shift), i, e) for i, e in enumerate(events)]
+    return [e for _, _, e in sorted(keyed)]
+
+
+def test_restores_order_within_lateness():
+    ordered = list(generate_scan_stream(n_tickets=2_000, seed=5))
+    shuffled = _jitter(ordered, max_shift=20)
+    assert shuffled != ordered
+
+    buffer = ReorderBuffer(max_lateness_seconds=30)
+    out = list(reorder(shuffled, buffer=buffer))
+
+    assert [_epoch(e) for e in out] == sorted(_epoch(e) for e in ordered)
+    assert sorted(out) == sorted(ordered)
+    assert buffer.late_events == 0
+
+
+def test_too_late_scans_are_dropped_and_counted():
+    dropped = []
+    buffer = ReorderBuffer(max_lateness_seconds=60, on_late=dropped.append)
+    events = [
+        {'ticket_id': 'T001', 'gate': 'A', 'timestamp': '2025-09-30T10:00:00', 'scan_type': 'entry'},
+        {'ticket_id': 'T002', 'gate': 'B', 'timestamp': '2025-09-30T10:05:00', 'scan_type': 'entry'},
+        {'ticket_id': 'T003', 'gate': 'C', 'timestamp': '2025-09-30T09:59:00', 'scan_type': 'entry'},
+    ]
+
+    out = list(reorder(events, buffer=buffer))
+
+    assert [e['ticket_id'] for e in out] == ['T001', 'T002']
+    assert buffer.late_events == 1
+    assert dropped == [events[2]]
+
+
+def test_memory_is_bounded_by_max_buffered():
+    # Huge lateness would buffer everything - the cap forces releases instead
+    buffer = ReorderBuffer(max_lateness_seconds=10**9, max_buffered=100)
+    out = list(reorder(generate_scan_stream(n_tickets=1_000), buffer=buffer))
+
+    assert buffer.max_depth == 101
+    assert buffer.forced_releases > 0
+    assert [_epoch(e) for e in out] == sorted(_epoch(e) for e in out)
+
+
+def test_keeps_early_exit_correct_for_late_gate_uploads():
+    events = list(mock_scan_stream())
+    events[4], events[5] = events[5], events[4]   # T005's entry uploaded late
+
+    assert get_occupancy_at_time(iter(events), '2025-09-30T10:30:00') == 4
+    assert get_occupancy_at_time(reorder(events, 3600), '2025-09-30T10:30:00') == 5
+
+
+def test_runner_and_server_reorder_before_consumers():
+    events = list(mock_scan_stream())
+    events[4], events[5] = events[5], events[4]
+
+    runner = QueryRunner()
+    runner.register(count_current_occupancy)
+    assert runner.run(events, max_lateness_seconds=3600)['count_current_occupancy'] == 4
+    assert runner.reorder_buffer.late_events == 0
+
+    seen = []
+
+    async def scenario():
+        async with ScanIngestServer(consumer=seen.extend, max_lateness_seconds=3600) as server:
+            await send_scans(events, server.host, server.port)
+        return server.stats()
+
+    stats = asyncio.run(scenario())
+    assert [s.timestamp for s in seen] == sorted(s.timestamp for s in seen)
+    assert stats['events_processed'] == 13
+    assert stats['late_events'] == 0
@@ -0,0 +1,51 @@
+"""
+Pytest tests for integer epoch timestamp parsing
+================================================
+Run with: pytest tests/test_scan_timestamps.py -v
+"""
+
+import calendar
+from datetime import datetime
+
+import pytest
+
+from scan_timestamps import to_epoch, from_epoch, clear_prefix_cache, _prefix_cache
+from python_occupancy_practice import mock_scan_stream
+from scan_decoder import decode_stream
+
+
+def test_to_epoch_matches_datetime():
+    """Fast path agrees with datetime for every mock timestamp."""
+    for scan in decode_stream(mock_scan_stream()):
+        expected = calendar.timegm(datetime.fromisoformat(scan.timestamp).timetuple())
+        assert to_epoch(scan.timestamp) == expected
+
+
+def test_prefix_cache_reused_within_a_minute():
+    """Events in the same minute only add one cache entry."""
+    clear_prefix_cache()
+    to_epoch('2025-09-30T10:00:00')
+    to_epoch('2025-09-30T10:00:30')
+    to_epoch('2025-09-30T10:00:59')
+    assert len(_prefix_cache) == 1
+    assert to_epoch('2025-09-30T10:00:59') - to_epoch('2025-09-30T10:00:00') == 59
+
+
+def test_space_separator_and_timezone_fallback():
+    """SQL-style timestamps and offsets still parse."""
+    assert to_epoch('2025-09-30 11:30:00') == to_epoch('2025-09-30T11:30:00')
+    assert to_epoch('2025-09-30T11:30:00+01:00') == to_epoch('2025-09-30T10:30:00')
+    assert to_epoch('2025-09-30T11:30:00.750') == to_epoch('2025-09-30T11:30:00')
+
+
+def test_malformed_seconds_rejected_with_cached_prefix():
+    """A cached minute doesn't let int() accept seconds datetime would reject."""
+    to_epoch('2025-09-30T10:00:00')
+    for bad in ('2025-09-30T10:00: 5', '2025-09-30T10:00:+5', '2025-09-30T10:00:x1',
+                '2025-09-30T10:00:\u0663\u0664'):
+        with pytest.raises(ValueError):
+            to_epoch(bad)
+
+
+def test_from_epoch_round_trip():
+    assert from_epoch(to_epoch('2025-09-30T23:59:59')) == '2025-09-30T23:59:59'
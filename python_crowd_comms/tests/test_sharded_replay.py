@@ -0,0 +1,100 @@
+"""
+Pytest tests for sharded parallel replay
+========================================
+Run with: pytest tests/test_sharded_replay.py -v
+"""
+
+import json
+import types
+
+import pytest
+
+import scan_decoder
+from occupancy_tracker import OccupancyTracker
+from python_occupancy_practice import mock_scan_stream
+import sharded_replay
+from sharded_replay import replay_sharded, shard_for
+
+
+def _single_threaded():
+    tracker = OccupancyTracker()
+    tracker.ingest_many(mock_scan_stream())
+    return tracker
+
+
+@pytest.mark.parametrize('processes, shards', [(1, 1), (1, 3), (2, 4)])
+def test_sharded_matches_single_threaded(processes, shards):
+    """Any shard count gives the same merged answer."""
+    expected = _single_threaded()
+    result = replay_sharded(mock_scan_stream(), processes=processes, shards=shards)
+
+    assert result['total_occupancy'] == expected.total_occupancy
+    assert result['total_entries'] == expected.total_entries
+    assert result['total_exits'] == expected.total_exits
+    assert result['by_gate'] == expected.details()['by_gate']
+    assert result['by_ticket_type'] == expected.details()['by_ticket_type']
+    assert result['duplicate_entries'] == expected.duplicate_entries
+
+
+def test_sharded_from_file(tmp_path):
+    """A JSON-lines log on disk is partitioned into shard files."""
+    log = tmp_path / 'scans.jsonl'
+    log.write_text('\n'.join(mock_scan_stream()))
+
+    result = replay_sharded(str(log), processes=2, shards=3)
+    assert result['total_occupancy'] == 4
+    assert result['duplicate_entries'] == {'T003'}
+
+
+def test_shard_files_take_the_decoder_fast_path(tmp_path, monkeypatch):
+    """Worker lines reach decode_scan without their newline - no json.loads."""
+    log = tmp_path / 'scans.jsonl'
+    log.write_text('\n'.join(mock_scan_stream()) + '\n')
+
+    def no_json(line):
+        raise AssertionError(f"fell back to json.loads for {line!r}")
+
+    monkeypatch.setattr(scan_decoder, 'json', types.SimpleNamespace(loads=no_json))
+    result = replay_sharded(str(log), processes=1, shards=3)
+    assert result['total_occupancy'] == 4
+
+
+def test_partitioning_reads_ticket_id_without_decoding(tmp_path, monkeypatch):
+    """The parent only splits out ticket_id; decode_scan runs in the workers."""
+    log = tmp_path / 'scans.jsonl'
+    log.write_text('\n'.join(mock_scan_stream()) + '\n')
+
+    def no_decode(line):
+        raise AssertionError(f"parent decoded {line!r}")
+
+    monkeypatch.setattr(sharded_replay, 'decode_scan', no_decode)
+    paths = sharded_replay._write_shards(log.read_text().splitlines(), 3, str(tmp_path))
+    sizes = [len(open(p).read().splitlines()) for p in paths]
+    assert sum(sizes) == len(list(mock_scan_stream()))
+
+
+@pytest.mark.parametrize('line, ticket_id', [
+    ('{"ticket_id": "T001", "gate": "A", "timestamp": "2025-09-30T10:00:00", "scan_type": "entry"}', 'T001'),
+    ('{"gate": "A", "ticket_id": "T002", "timestamp": "2025-09-30T10:00:00", "scan_type": "entry"}', 'T002'),
+    ('{"ticket_id": "T\\"3", "gate": "A", "timestamp": "2025-09-30T10:00:00", "scan_type": "entry"}', 'T"3'),
+])
+def test_ticket_id_extraction(line, ticket_id):
+    """The cheap split agrees with a full decode, falling back when it can't."""
+    assert sharded_replay._ticket_id(line) == ticket_id
+
+
+def test_events_are_streamed_not_collected():
+    """A generator of dicts is written to shard files as it is consumed."""
+    def events():
+        for line in mock_scan_stream():
+            yield json.loads(line)
+
+    result = replay_sharded(events(), processes=2, shards=3)
+    assert result['total_occupancy'] == _single_threaded().total_occupancy
+    assert result['duplicate_entries'] == {'T003'}
+
+
+def test_shard_for_is_stable():
+    """Same ticket, same shard - every time, in every process."""
+    assert shard_for('T001', 8) == shard_for('T001', 8)
+    assert 0 <= shard_for('T999', 8) < 8
@@ -0,0 +1,103 @@
+"""
+Pytest tests for ticket_registry.py
+===================================
+
+Run with: pytest tests/test_ticket_registry.py -v
+"""
+
+import sqlite3
+import tracemalloc
+
+import pytest
+
+from occupancy_tracker import OccupancyTracker
+from python_occupancy_practice import get_mock_tickets, mock_scan_stream
+from ticket_registry import SqlTicketLoader, TicketRegistry, mock_registry, mock_ticket_loader
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE tickets (ticket_id TEXT PRIMARY KEY, user_id TEXT, ticket_type TEXT)")
+    conn.executemany("INSERT INTO tickets VALUES (?, ?, ?)",
+                     [(t['ticket_id'], t['user_id'], t['ticket_type']) for t in get_mock_tickets()])
+    yield conn
+    conn.close()
+
+
+def test_lazy_lookup_from_sqlite(conn):
+    registry = TicketRegistry(SqlTicketLoader(conn))
+    assert len(registry) == 0
+    assert registry.get('T001') == 'VIP'
+    assert registry.user_id('T001') == 'U123'
+    assert registry.get('NOPE', 'Unknown') == 'Unknown'
+    assert registry.get('NOPE', 'Unknown') == 'Unknown'
+    # One query per distinct ticket - unknown tickets are cached too
+    assert registry.stats()['queries'] == 2
+
+
+def test_prefetching_batches_queries(conn):
+    registry = TicketRegistry(SqlTicketLoader(conn), batch_size=5)
+    tracker = OccupancyTracker(ticket_types=registry)
+    tracker.ingest_many(registry.prefetching(mock_scan_stream()))
+
+    reference = OccupancyTracker()
+    reference.ingest_many(mock_scan_stream())
+    assert tracker.details() == reference.details()
+    # 13 scans in batches of 5 -> 3 prefetches, every lookup a hit
+    assert registry.stats()['queries'] == 3
+    assert registry.stats()['misses'] == 0
+
+
+def test_lru_evicts_above_cap():
+    registry = TicketRegistry(mock_ticket_loader, max_tickets=3)
+    for ticket_id in ('T001', 'T002', 'T003'):
+        registry.get(ticket_id)
+    registry.get('T001')            # T001 is now most recent
+    registry.get('T004')            # evicts T002
+
+    assert len(registry) == 3
+    assert registry.evictions == 1
+    queries = registry.queries
+    registry.get('T001')
+    assert registry.queries == queries
+    registry.get('T002')
+    assert registry.queries == queries + 1
+
+
+def test_fetch_on_miss_off_returns_default():
+    calls = []
+    registry = TicketRegistry(lambda ids: calls.append(ids) or [], fetch_on_miss=False)
+    assert registry.get('T001', 'Unknown') == 'Unknown'
+    assert 'T001' not in registry
+    assert calls == []
+
+
+def test_mock_registry_matches_mock_tickets():
+    registry = mock_registry()
+    for ticket in get_mock_tickets():
+        assert registry[ticket['ticket_id']] == ticket['ticket_type']
+        assert registry.user_id(ticket['ticket_id']) == ticket['user_id']
+    with pytest.raises(KeyError):
+        registry['T999']
+
+
+def test_evicted_tickets_take_their_user_with_them():
+    def loader(ids):
+        return [(ticket_id, 'U' + ticket_id, 'General') for ticket_id in ids]
+
+    registry = TicketRegistry(loader, max_tickets=10)
+    for n in range(1_000):
+        registry.get(f'T{n}')
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for n in range(1_000, 20_000):
+            assert registry.user_id(f'T{n}') == f'UT{n}'
+        grown = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    assert len(registry) == 10
+    # 19,000 more users seen, but nothing outlives the 10 cached tickets
+    assert grown < 50_000
@@ -0,0 +1,76 @@
+"""
+Pytest tests for ticket_state.py (against SQLite)
+=================================================
+Run with: pytest tests/test_ticket_state.py -v
+"""
+
+import pytest
+
+import db_pool
+from breakdown_query import get_detailed_breakdown_single_sql
+from db_pool import ConnectionPool
+from ticket_state import (count_current_occupancy_state, get_detailed_breakdown_state,
+                          rebuild_ticket_state, tickets_inside)
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    from database_occupancy_learning import populate_database, setup_database
+
+    pool = db_pool.configure(pool=ConnectionPool.sqlite(str(tmp_path / 'occupancy.db')))
+    setup_database()
+    populate_database()
+    yield pool
+    db_pool.close_pool()
+
+
+def insert_scan(pool, ticket_id, gate, scan_type, scan_time):
+    with pool.cursor() as cursor:
+        cursor.execute("INSERT INTO scans (ticket_id, gate, scan_type, scan_time) "
+                       "VALUES (?, ?, ?, ?)", (ticket_id, gate, scan_type, scan_time))
+
+
+def test_mock_data_counters(sqlite_db):
+    assert count_current_occupancy_state() == 4
+    assert get_detailed_breakdown_state() == {
+        'total_occupancy': 4,
+        'by_gate': {'A': 2, 'B': 1, 'C': 1},
+        'by_ticket_type': {'VIP': 1, 'General': 3},
+    }
+    assert get_detailed_breakdown_state() == get_detailed_breakdown_single_sql()
+    assert len(tickets_inside()) == 4
+
+
+def test_each_insert_moves_the_counters(sqlite_db):
+    inside = set(tickets_inside())
+    ticket = sorted(inside)[0]
+
+    insert_scan(sqlite_db, ticket, 'B', 'exit', '2025-09-30T23:00:00')
+    assert count_current_occupancy_state() == 3
+    insert_scan(sqlite_db, ticket, 'C', 'entry', '2025-09-30T23:30:00')
+    assert count_current_occupancy_state() == 4
+    assert get_detailed_breakdown_state() == get_detailed_breakdown_single_sql()
+
+    # A late upload (older than the ticket's last scan) changes nothing
+    before = get_detailed_breakdown_state()
+    insert_scan(sqlite_db, ticket, 'A', 'exit', '2025-09-30T22:00:00')
+    assert get_detailed_breakdown_state() == before == get_detailed_breakdown_single_sql()
+
+
+def test_generated_event_matches_breakdown_query(sqlite_db):
+    from scan_loader import load_generated_event
+
+    with sqlite_db.cursor() as cursor:
+        for table in ('scans', 'tickets', 'users'):
+            cursor.execute(f"DELETE FROM {table}")
+    rebuild_ticket_state()
+    assert count_current_occupancy_state() == 0
+
+    # Scans go in through the batched loader - the trigger still fires per row
+    load_generated_event(2_000, sqlite_db)
+    incremental = get_detailed_breakdown_state()
+    assert incremental == get_detailed_breakdown_single_sql()
+    assert incremental['total_occupancy'] > 0
+
+    rebuild_ticket_state()
+    assert get_detailed_breakdown_state() == incremental
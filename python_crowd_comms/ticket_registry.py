@@ -0,0 +1,270 @@
+# Shared Ticket Registry
+# ======================
+# track_occupancy_with_details() and every tracker used to start by building
+# {ticket_id: ticket_type} from get_mock_tickets(). Against
+# a real database that's a full `SELECT * FROM tickets` per report - for a
+# 500k-ticket festival, every time.
+#
+# TicketRegistry loads NOTHING up front. It fetches tickets the first time
+# they're seen, in batches, and keeps them in a size-capped LRU:
+#
+#   scans ──> prefetching(stream) ──> consumer
+#                 │  every 500 scans: unknown IDs -> ONE query
+#                 v
+#           TicketRegistry  (OrderedDict, LRU above max_tickets)
+#                 │ miss
+#                 v
+#           loader(ids) -> SELECT ticket_id, user_id, ticket_type
+#                          FROM tickets WHERE ticket_id IN (...)
+#
+# Compact cache: each ticket is a (user_id, type_code) pair, not a dict row.
+# Ticket types ('VIP', 'General', ...) are interned once - there are a handful.
+# User IDs are NOT interned: a table of every user ever seen would outlive the
+# LRU and grow forever, so the user_id string lives in the entry and goes when
+# the entry is evicted.
+#
+# Hits take no lock (safe for the striped tracker's threads); loads run under
+# one lock, and misses are rare once warm.
+#
+# The registry quacks like the old dict: registry.get(ticket_id, 'Unknown')
+# returns the ticket type, so it drops straight into ticket_types= parameters.
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from python_occupancy_practice import get_mock_tickets
+from scan_decoder import to_scan_event
+
+
+TicketRow = Tuple[str, str, str]            # (ticket_id, user_id, ticket_type)
+Loader = Callable[[Sequence[str]], Iterable[TicketRow]]
+
+_NOT_FOUND = (None, -1)          # cached 'no such ticket'
+
+
+class TicketRegistry:
+    """
+    Lazily loaded, batch-prefetched, LRU-capped ticket lookup.
+
+    Args:
+        loader: Called with a list of ticket IDs, returns (ticket_id, user_id,
+            ticket_type) rows for the ones that exist
+        max_tickets: LRU cap (tickets not found also count, so a flood of
+            bad scans can't grow memory)
+        batch_size: Max IDs per loader call
+        fetch_on_miss: If False, get() of an unknown ticket returns the
+            default instead of querying - use with prefetch()/prefetching()
+
+    Example:
+        >>> registry = TicketRegistry(SqlTicketLoader(conn))
+        >>> tracker = OccupancyTracker(ticket_types=registry)
+        >>> tracker.ingest_many(registry.prefetching(scan_stream))
+    """
+
+    def __init__(self, loader: Loader, max_tickets: int = 1_000_000, batch_size: int = 500,
+                 fetch_on_miss: bool = True):
+        if max_tickets < 1 or batch_size < 1:
+            raise ValueError("max_tickets and batch_size must be positive")
+        self.loader = loader
+        self.max_tickets = max_tickets
+        self.batch_size = batch_size
+        self.fetch_on_miss = fetch_on_miss
+
+        self._cache: 'OrderedDict[str, Tuple[Optional[str], int]]' = OrderedDict()
+        self._types: List[str] = []
+        self._type_codes: Dict[str, int] = {}
+        self._load_lock = threading.Lock()
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+        self.evictions = 0
+
+    # -----------------------------------------------------------------------
+    # Compact encoding
+    # -----------------------------------------------------------------------
+
+    def _pack(self, user_id: str, ticket_type: str) -> Tuple[str, int]:
+        type_code = self._type_codes.get(ticket_type)
+        if type_code is None:
+            type_code = self._type_codes[ticket_type] = len(self._types)
+            self._types.append(ticket_type)
+        return user_id, type_code
+
+    def _store(self, ticket_id: str, packed: Tuple[Optional[str], int]) -> None:
+        cache = self._cache
+        cache[ticket_id] = packed
+        cache.move_to_end(ticket_id)
+        while len(cache) > self.max_tickets:
+            cache.popitem(last=False)
+            self.evictions += 1
+
+    # -----------------------------------------------------------------------
+    # Loading
+    # -----------------------------------------------------------------------
+
+    def prefetch(self, ticket_ids: Iterable[str]) -> int:
+        """
+        Load every ticket not already cached, batch_size IDs per query.
+        Returns the number of loader calls made.
+        """
+        cache = self._cache
+        unknown = list(dict.fromkeys(t for t in ticket_ids if t not in cache))
+        calls = 0
+        with self._load_lock:
+            for start in range(0, len(unknown), self.batch_size):
+                batch = unknown[start:start + self.batch_size]
+                found = set()
+                for ticket_id, user_id, ticket_type in self.loader(batch):
+                    self._store(ticket_id, self._pack(user_id, ticket_type))
+                    found.add(ticket_id)
+                for ticket_id in batch:
+                    if ticket_id not in found:
+                        self._store(ticket_id, _NOT_FOUND)
+                self.queries += 1
+                calls += 1
+        return calls
+
+    def prefetching(self, stream, batch_size: Optional[int] = None) -> Iterator:
+        """
+        Wrap a scan stream: every batch_size scans, prefetch their tickets in
+        one query, then pass the scans on unchanged.
+        """
+        batch_size = batch_size or self.batch_size
+        pending = []
+        for event in stream:
+            pending.append(event)
+            if len(pending) >= batch_size:
+                self.prefetch(to_scan_event(e).ticket_id for e in pending)
+                yield from pending
+                pending = []
+        if pending:
+            self.prefetch(to_scan_event(e).ticket_id for e in pending)
+            yield from pending
+
+    def _lookup(self, ticket_id: str) -> Tuple[Optional[str], int]:
+        packed = self._cache.get(ticket_id)
+        if packed is not None:
+            self.hits += 1
+            try:
+                self._cache.move_to_end(ticket_id)
+            except KeyError:   # evicted by another thread in between
+                pass
+            return packed
+        self.misses += 1
+        if not self.fetch_on_miss:
+            return _NOT_FOUND
+        self.prefetch([ticket_id])
+        return self._cache.get(ticket_id, _NOT_FOUND)
+
+    # -----------------------------------------------------------------------
+    # Lookups - O(1) once cached
+    # -----------------------------------------------------------------------
+
+    def get(self, ticket_id: str, default: Optional[str] = None) -> Optional[str]:
+        """Ticket type (dict-style, so it works as ticket_types=)."""
+        packed = self._lookup(ticket_id)
+        return default if packed is _NOT_FOUND else self._types[packed[1]]
+
+    def ticket_type(self, ticket_id: str, default: Optional[str] = None) -> Optional[str]:
+        return self.get(ticket_id, default)
+
+    def user_id(self, ticket_id: str, default: Optional[str] = None) -> Optional[str]:
+        packed = self._lookup(ticket_id)
+        return default if packed is _NOT_FOUND else packed[0]
+
+    def __getitem__(self, ticket_id: str) -> str:
+        ticket_type = self.get(ticket_id)
+        if ticket_type is None:
+            raise KeyError(ticket_id)
+        return ticket_type
+
+    def __contains__(self, ticket_id: str) -> bool:
+        return self.get(ticket_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def stats(self) -> Dict:
+        return {
+            'cached': len(self._cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'queries': self.queries,
+            'evictions': self.evictions,
+        }
+
+
+# ===========================================================================
+# LOADERS
+# ===========================================================================
+
+class SqlTicketLoader:
+    """
+    Batch loader over a DB-API connection (psycopg2 or sqlite3).
+
+    Args:
+        connection: Open connection with a tickets table (see setup_database())
+        placeholder: '%s' for psycopg2, '?' for sqlite3 (detected for sqlite3)
+    """
+
+    def __init__(self, connection, placeholder: Optional[str] = None):
+        self.connection = connection
+        if placeholder is None:
+            placeholder = '?' if isinstance(connection, sqlite3.Connection) else '%s'
+        self.placeholder = placeholder
+
+    def __call__(self, ticket_ids: Sequence[str]) -> List[TicketRow]:
+        marks = ', '.join([self.placeholder] * len(ticket_ids))
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                f"SELECT ticket_id, user_id, ticket_type FROM tickets WHERE ticket_id IN ({marks})",
+                list(ticket_ids))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+
+def mock_ticket_loader(ticket_ids: Sequence[str]) -> List[TicketRow]:
+    """Loader over get_mock_tickets() - the in-process stand-in."""
+    wanted = set(ticket_ids)
+    return [(t['ticket_id'], t['user_id'], t['ticket_type'])
+            for t in get_mock_tickets() if t['ticket_id'] in wanted]
+
+
+_mock_registry: Optional[TicketRegistry] = None
+
+
+def mock_registry() -> TicketRegistry:
+    """
+    One shared registry over the mock tickets, built on first use - the
+    default ticket_types for the trackers. The 8 tickets are loaded up front
+    and unknown IDs aren't queried, so generated streams behave like the old
+    dict ('Unknown' for every ticket outside the mock set).
+    """
+    global _mock_registry
+    if _mock_registry is None:
+        registry = TicketRegistry(mock_ticket_loader, fetch_on_miss=False)
+        registry.prefetch(t['ticket_id'] for t in get_mock_tickets())
+        _mock_registry = registry
+    return _mock_registry
+
+
+# ===========================================================================
+# TEST RUNNER
+# ===========================================================================
+
+if __name__ == "__main__":
+    from occupancy_tracker import OccupancyTracker
+    from python_occupancy_practice import mock_scan_stream
+
+    registry = TicketRegistry(mock_ticket_loader, batch_size=4)
+    tracker = OccupancyTracker(ticket_types=registry)
+    tracker.ingest_many(registry.prefetching(mock_scan_stream()))
+    print(f"Details:  {tracker.details()}")
+    print(f"T008 belongs to {registry.user_id('T008')}")
+    print(f"Registry: {registry.stats()}")
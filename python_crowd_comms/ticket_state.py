@@ -0,0 +1,294 @@
+# Incrementally Maintained Ticket State
+# =====================================
+# count_current_occupancy_sql() answers "who is inside?" by re-deriving every
+# ticket's last scan (DISTINCT ON ... ORDER BY ticket_id, scan_time DESC) on
+# every call - a sort of the whole scans table for one number.
+#
+# Instead, keep the answer up to date as scans are inserted:
+#
+#   INSERT INTO scans ──trigger──> ticket_state        one row per ticket
+#                                  (ticket_id, inside, last_gate, last_scan_time)
+#                                  occupancy_counters   one row per total/gate/type
+#                                  ('total', '', 4) ('gate', 'A', 2) ('ticket_type', 'VIP', 1)
+#
+# Each scan does O(1) work: lock the ticket's state row, take its old
+# contribution off the counters, write the new state, add the new contribution.
+# Current occupancy is then one primary-key lookup, and the breakdowns are a
+# handful of counter rows.
+#
+# Same rules as the DISTINCT ON queries - the LATEST scan by scan_time decides:
+# a scan older than the ticket's last_scan_time (a late upload) changes nothing.
+# by_gate is the gate of that last scan, like get_detailed_breakdown_sql().
+#
+# A trigger (rather than application code) means every insert path keeps the
+# state right - populate_database(), load_scans(), psql. For a huge historical
+# load, rebuild_ticket_state() afterwards recomputes everything in two
+# set-based statements.
+#
+# The reads are @cached_query, like the queries in
+# database_occupancy_learning.py; rebuild_ticket_state() invalidates the cache.
+
+import sys
+import time
+from typing import Dict, List, Optional
+
+from db_pool import ConnectionPool, get_pool
+from query_cache import cached_query, invalidate
+
+
+STATE_TABLES = """
+    CREATE TABLE ticket_state (
+        ticket_id VARCHAR(10) PRIMARY KEY,
+        inside BOOLEAN NOT NULL,
+        last_gate VARCHAR(1) NOT NULL,
+        last_scan_time TIMESTAMP NOT NULL
+    );
+    CREATE INDEX idx_ticket_state_inside ON ticket_state(inside);
+    CREATE TABLE occupancy_counters (
+        dimension VARCHAR(12) NOT NULL,     -- 'total', 'gate' or 'ticket_type'
+        key VARCHAR(20) NOT NULL,           -- '' for total
+        inside INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dimension, key)
+    );
+"""
+
+_BUMP = ("ON CONFLICT (dimension, key) "
+         "DO UPDATE SET inside = occupancy_counters.inside + EXCLUDED.inside")
+
+STATE_TRIGGER = {
+    'postgres': [
+        f"""
+        CREATE OR REPLACE FUNCTION apply_scan_to_ticket_state() RETURNS trigger AS $$
+        DECLARE
+            state ticket_state%ROWTYPE;
+            kind VARCHAR(20);
+            now_inside BOOLEAN := NEW.scan_type = 'entry';
+        BEGIN
+            -- Make sure the row exists, then lock it: concurrent scans for the
+            -- same ticket apply one after the other
+            INSERT INTO ticket_state VALUES (NEW.ticket_id, false, NEW.gate, '-infinity')
+                ON CONFLICT (ticket_id) DO NOTHING;
+            SELECT * INTO state FROM ticket_state WHERE ticket_id = NEW.ticket_id FOR UPDATE;
+            IF state.last_scan_time > NEW.scan_time THEN
+                RETURN NULL;        -- late scan: not the ticket's last scan
+            END IF;
+            SELECT ticket_type INTO kind FROM tickets WHERE ticket_id = NEW.ticket_id;
+
+            IF state.inside THEN
+                INSERT INTO occupancy_counters VALUES ('total', '', -1) {_BUMP};
+                INSERT INTO occupancy_counters VALUES ('gate', state.last_gate, -1) {_BUMP};
+                IF kind IS NOT NULL THEN
+                    INSERT INTO occupancy_counters VALUES ('ticket_type', kind, -1) {_BUMP};
+                END IF;
+            END IF;
+            IF now_inside THEN
+                INSERT INTO occupancy_counters VALUES ('total', '', 1) {_BUMP};
+                INSERT INTO occupancy_counters VALUES ('gate', NEW.gate, 1) {_BUMP};
+                IF kind IS NOT NULL THEN
+                    INSERT INTO occupancy_counters VALUES ('ticket_type', kind, 1) {_BUMP};
+                END IF;
+            END IF;
+
+            UPDATE ticket_state
+               SET inside = now_inside, last_gate = NEW.gate, last_scan_time = NEW.scan_time
+             WHERE ticket_id = NEW.ticket_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER scans_ticket_state AFTER INSERT ON scans
+            FOR EACH ROW EXECUTE FUNCTION apply_scan_to_ticket_state()
+        """,
+    ],
+    # No variables in SQLite triggers: each step re-reads ticket_state, and
+    # the order of the statements does the work (writers are serialised anyway)
+    'sqlite': [
+        f"""
+        CREATE TRIGGER scans_ticket_state AFTER INSERT ON scans
+        BEGIN
+            INSERT OR IGNORE INTO ticket_state VALUES (NEW.ticket_id, 0, NEW.gate, '');
+
+            -- Take the old state's contribution off (unless this scan is late)
+            INSERT INTO occupancy_counters (dimension, key, inside)
+                SELECT 'total', '', -1 FROM ticket_state s
+                 WHERE s.ticket_id = NEW.ticket_id AND s.inside AND s.last_scan_time <= NEW.scan_time
+                UNION ALL
+                SELECT 'gate', s.last_gate, -1 FROM ticket_state s
+                 WHERE s.ticket_id = NEW.ticket_id AND s.inside AND s.last_scan_time <= NEW.scan_time
+                UNION ALL
+                SELECT 'ticket_type', t.ticket_type, -1 FROM ticket_state s
+                  JOIN tickets t ON t.ticket_id = s.ticket_id
+                 WHERE s.ticket_id = NEW.ticket_id AND s.inside AND s.last_scan_time <= NEW.scan_time
+            {_BUMP};
+
+            UPDATE ticket_state
+               SET inside = (NEW.scan_type = 'entry'), last_gate = NEW.gate,
+                   last_scan_time = NEW.scan_time
+             WHERE ticket_id = NEW.ticket_id AND last_scan_time <= NEW.scan_time;
+
+            -- Add the new contribution (last_scan_time = NEW's only if it applied)
+            INSERT INTO occupancy_counters (dimension, key, inside)
+                SELECT 'total', '', 1 FROM ticket_state s
+                 WHERE s.ticket_id = NEW.ticket_id AND s.inside AND s.last_scan_time = NEW.scan_time
+                UNION ALL
+                SELECT 'gate', s.last_gate, 1 FROM ticket_state s
+                 WHERE s.ticket_id = NEW.ticket_id AND s.inside AND s.last_scan_time = NEW.scan_time
+                UNION ALL
+                SELECT 'ticket_type', t.ticket_type, 1 FROM ticket_state s
+                  JOIN tickets t ON t.ticket_id = s.ticket_id
+                 WHERE s.ticket_id = NEW.ticket_id AND s.inside AND s.last_scan_time = NEW.scan_time
+            {_BUMP};
+        END
+        """,
+    ],
+}
+
+# Last scan per ticket, the same way each dialect's occupancy queries do it
+_LAST_SCANS = {
+    'postgres': """
+        SELECT DISTINCT ON (ticket_id) ticket_id, scan_type = 'entry', gate, scan_time
+        FROM scans
+        ORDER BY ticket_id, scan_time DESC
+    """,
+    'sqlite': """
+        SELECT ticket_id, scan_type = 'entry', gate, scan_time FROM (
+            SELECT ticket_id, scan_type, gate, scan_time,
+                   ROW_NUMBER() OVER (PARTITION BY ticket_id ORDER BY scan_time DESC) AS rn
+            FROM scans
+        ) WHERE rn = 1
+    """,
+}
+
+_REBUILD_COUNTERS = """
+    INSERT INTO occupancy_counters (dimension, key, inside)
+    SELECT 'total', '', COUNT(*) FROM ticket_state WHERE inside
+    UNION ALL
+    SELECT 'gate', last_gate, COUNT(*) FROM ticket_state WHERE inside GROUP BY last_gate
+    UNION ALL
+    SELECT 'ticket_type', t.ticket_type, COUNT(*)
+      FROM ticket_state s JOIN tickets t ON t.ticket_id = s.ticket_id
+     WHERE s.inside
+     GROUP BY t.ticket_type
+"""
+
+
+def install_ticket_state(pool: Optional[ConnectionPool] = None) -> None:
+    """
+    (Re)create ticket_state, occupancy_counters and the scans trigger, then
+    fill them from whatever is already in scans. setup_database() calls this.
+    """
+    pool = pool or get_pool()
+    with pool.cursor() as cursor:
+        cursor.execute("DROP TRIGGER IF EXISTS scans_ticket_state"
+                       + (" ON scans" if pool.dialect == 'postgres' else ""))
+        cursor.execute("DROP TABLE IF EXISTS ticket_state")
+        cursor.execute("DROP TABLE IF EXISTS occupancy_counters")
+        for statement in STATE_TABLES.split(';'):
+            if statement.strip():
+                cursor.execute(statement)
+        for statement in STATE_TRIGGER[pool.dialect]:
+            cursor.execute(statement)
+    rebuild_ticket_state(pool)
+
+
+def rebuild_ticket_state(pool: Optional[ConnectionPool] = None) -> None:
+    """
+    Recompute ticket_state and the counters from scans, in one transaction.
+
+    The trigger only follows INSERTs: run this after deleting or updating
+    scans, and after a bulk historical load if the trigger was dropped for it.
+    """
+    pool = pool or get_pool()
+    with pool.cursor() as cursor:
+        cursor.execute("DELETE FROM ticket_state")
+        cursor.execute("DELETE FROM occupancy_counters")
+        cursor.execute("INSERT INTO ticket_state (ticket_id, inside, last_gate, last_scan_time) "
+                       + _LAST_SCANS[pool.dialect])
+        cursor.execute(_REBUILD_COUNTERS)
+    invalidate()        # deleted or updated scans change the answers
+
+
+# ===========================================================================
+# O(1) READS
+# ===========================================================================
+
+@cached_query
+def count_current_occupancy_state(pool: Optional[ConnectionPool] = None) -> int:
+    """Same answer as count_current_occupancy_sql(), from one counter row."""
+    pool = pool or get_pool()
+    with pool.cursor() as cursor:
+        cursor.execute("SELECT inside FROM occupancy_counters "
+                       "WHERE dimension = 'total' AND key = ''")
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+@cached_query
+def get_detailed_breakdown_state(pool: Optional[ConnectionPool] = None) -> Dict:
+    """Same shape as get_detailed_breakdown_sql(), from the counter rows."""
+    pool = pool or get_pool()
+    with pool.cursor() as cursor:
+        cursor.execute("SELECT dimension, key, inside FROM occupancy_counters "
+                       "WHERE inside <> 0 ORDER BY dimension, key")
+        rows = cursor.fetchall()
+    result = {'total_occupancy': 0, 'by_gate': {}, 'by_ticket_type': {}}
+    for dimension, key, inside in rows:
+        if dimension == 'total':
+            result['total_occupancy'] = inside
+        elif dimension == 'gate':
+            result['by_gate'][key] = inside
+        else:
+            result['by_ticket_type'][key] = inside
+    return result
+
+
+@cached_query
+def tickets_inside(pool: Optional[ConnectionPool] = None) -> List[str]:
+    """Ticket IDs currently inside (uses idx_ticket_state_inside)."""
+    pool = pool or get_pool()
+    with pool.cursor() as cursor:
+        cursor.execute("SELECT ticket_id FROM ticket_state WHERE inside ORDER BY ticket_id")
+        return [row[0] for row in cursor.fetchall()]
+
+
+# ===========================================================================
+# BENCHMARK
+# ===========================================================================
+
+def benchmark(n_scans: int = 1_000_000, repeats: int = 5) -> Dict:
+    """
+    Load ~n_scans generated scans through the trigger into the SHARED pool's
+    database (runs setup_database() - it wipes the tables), check the counters
+    against the single-statement breakdown, and time both reads.
+    """
+    from breakdown_query import get_detailed_breakdown_single_sql
+    from database_occupancy_learning import setup_database
+    from scan_loader import load_generated_event
+
+    pool = get_pool()
+    setup_database()
+    loaded = load_generated_event(max(1, int(n_scans / 1.8)), pool)
+
+    def best_of(function):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = function()
+            times.append(time.perf_counter() - start)
+        return result, min(times)
+
+    scanned, scanned_s = best_of(get_detailed_breakdown_single_sql)
+    counters, counters_s = best_of(get_detailed_breakdown_state)
+    assert counters == scanned, (counters, scanned)
+    return {'scans': loaded['scans'], 'load_s': loaded['seconds'],
+            'breakdown_query_ms': round(scanned_s * 1000, 2),
+            'counters_ms': round(counters_s * 1000, 2),
+            'speedup': round(scanned_s / counters_s)}
+
+
+if __name__ == "__main__":
+    # Usage: python ticket_state.py [n_scans]   (uses OCCUPANCY_DSN)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    for key, value in benchmark(n).items():
+        print(f"{key}: {value}")